@@ -0,0 +1,314 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented, log, span
+from tracking import start_run
+
+BACKTEST_ROOT = "data/backtests"
+
+DATASETS = {
+    "model1": "data/processed/clean_matches.csv",
+    "model2": "data/processed/model2_training_dataset.csv",
+    # Both sources on one match key (match_keys.py), model-2 classifier
+    "unified": "data/processed/unified_matches.csv",
+}
+
+MIN_TRAIN_SEASONS = 3
+
+# Outcome order of the probability matrix (model-2 classes): ordinal for the RPS
+OUTCOMES = ["away_win", "draw", "home_win"]
+METRICS = ["accuracy", "log_loss", "brier", "rps"]
+PROBA_EPS = 1e-15
+
+
+# ----------------------------------------------------------
+# METRICS
+# ----------------------------------------------------------
+
+def probabilistic_metrics(proba, y, starts=(0,)):
+    """(n_segments, 4) accuracy, log loss, Brier and RPS of each row segment.
+
+    `proba` is the (n, K) probability matrix of every evaluated match, `y`
+    the outcome index, `starts` the first row of each segment (fold). All
+    metrics are computed per row in one pass, then summed per segment.
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+    n, k = proba.shape
+    rows = np.arange(n)
+
+    onehot = np.zeros_like(proba)
+    onehot[rows, y] = 1.0
+
+    per_row = np.column_stack([
+        proba.argmax(axis=1) == y,
+        -np.log(np.clip(proba[rows, y], PROBA_EPS, 1.0)),
+        ((proba - onehot) ** 2).sum(axis=1),
+        ((proba.cumsum(axis=1) - onehot.cumsum(axis=1))[:, :-1] ** 2).sum(axis=1) / (k - 1),
+    ])
+
+    starts = np.asarray(starts, dtype=np.int64)
+    counts = np.diff(np.r_[starts, n])
+    return np.add.reduceat(per_row, starts, axis=0) / counts[:, None]
+
+
+# ----------------------------------------------------------
+# DATA
+# ----------------------------------------------------------
+
+def load_dataset(model, path=None):
+    """Rows sorted by date: dates, seasons, X, fit targets, outcome index, row hashes."""
+    df = pd.read_csv(path or DATASETS[model])
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+
+    if model == "model1":
+        from train import FEATURES
+        required = ["date", "home_goals", "away_goals"]
+    elif model == "model2":
+        from features_model2 import MODEL2_FEATURES as FEATURES
+        required = ["date", "result_xgb"]
+    else:
+        from match_keys import UNIFIED_FEATURES as FEATURES
+        required = ["date", "result_xgb"]
+    df = df.dropna(subset=required).sort_values("date", kind="stable").reset_index(drop=True)
+
+    if model == "model1":
+        targets = df[["home_goals", "away_goals"]].to_numpy(dtype=np.float32)
+        y = (np.sign(targets[:, 0] - targets[:, 1]) + 1).astype(np.int64)
+    else:
+        y = df["result_xgb"].to_numpy(dtype=np.int64)
+        targets = y
+
+    features = [c for c in FEATURES if c in df.columns]
+    row_hash = pd.util.hash_pandas_object(df[["date", *features]], index=False).to_numpy()
+
+    return {
+        "dates": df["date"].to_numpy(),
+        "seasons": df["season"].astype(str).to_numpy(),
+        "features": features,
+        "X": df[features].to_numpy(dtype=np.float32),
+        "targets": targets,
+        "y": y,
+        "row_hash": row_hash,
+    }
+
+
+# ----------------------------------------------------------
+# FOLDS
+# ----------------------------------------------------------
+
+def make_folds(dates, seasons, mode="season", min_train_seasons=MIN_TRAIN_SEASONS):
+    """Walk-forward folds over date-sorted rows: train = [0, start), test = [start, end).
+
+    Seasons are ordered by their first match (codes such as "9394" / "0001"
+    do not sort chronologically). A test window runs from the start of its
+    season (or matchweek) to the start of the next one.
+    """
+    first = pd.Series(dates).groupby(seasons).min().sort_values()
+    if len(first) <= min_train_seasons:
+        return []
+
+    if mode == "season":
+        bounds = first.to_numpy()
+        labels = list(first.index)
+        edges = np.r_[bounds, dates[-1] + np.timedelta64(1, "D")]
+    else:
+        # Monday-based weeks from the first evaluated season on
+        start = pd.Timestamp(first.iloc[min_train_seasons]).to_period("W-SUN").start_time
+        weeks = pd.date_range(start, pd.Timestamp(dates[-1]) + pd.Timedelta(days=7), freq="7D")
+        edges = weeks.to_numpy()
+        season_of = np.asarray(first.index)[np.searchsorted(first.to_numpy(), edges[:-1], side="right") - 1]
+        labels = [f"{s}_{pd.Timestamp(w):%Y-%m-%d}" for s, w in zip(season_of, edges[:-1])]
+
+    idx = np.searchsorted(dates, edges, side="left")
+    folds = []
+    for i, label in enumerate(labels[:len(edges) - 1]):
+        if mode == "season" and i < min_train_seasons:
+            continue
+        start, end = int(idx[i]), int(idx[i + 1])
+        if end > start and start > 0:
+            folds.append({"fold": str(label), "start": start, "end": end})
+    return folds
+
+
+def fold_fingerprints(folds, row_hash, config):
+    """Per-fold hash of the config, the training rows and the test rows.
+
+    Wrapping prefix sums of the row hashes give every fold's train / test
+    digest without rehashing the rows.
+    """
+    cum = np.r_[np.uint64(0), np.cumsum(row_hash, dtype=np.uint64)]
+    base = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    starts = np.array([f["start"] for f in folds], dtype=np.int64)
+    ends = np.array([f["end"] for f in folds], dtype=np.int64)
+    train, test = cum[starts], cum[ends] - cum[starts]
+    return [
+        f"{base[:16]}-{f['start']}-{int(a):016x}-{f['end']}-{int(b):016x}"
+        for f, a, b in zip(folds, train, test)
+    ]
+
+
+# ----------------------------------------------------------
+# FIT / PREDICT ONE FOLD
+# ----------------------------------------------------------
+
+_WORKER = {}
+
+
+def _init_worker(model, X, targets, n_threads):
+    _WORKER.update(model=model, X=X, targets=targets, n_threads=n_threads)
+
+
+def _run_fold(fold):
+    model, X, targets = _WORKER["model"], _WORKER["X"], _WORKER["targets"]
+    start, end = fold["start"], fold["end"]
+
+    if model == "model1":
+        import xgboost as xgb
+        from scorelines import scoreline_grid, scoreline_summary
+        from train import XGB_PARAMS
+
+        rates = []
+        for side in range(2):
+            reg = xgb.XGBRegressor(**XGB_PARAMS, n_jobs=_WORKER["n_threads"])
+            reg.fit(X[:start], targets[:start, side])
+            rates.append(reg.predict(X[start:end]))
+        summary = scoreline_summary(scoreline_grid(rates[0], rates[1]))
+        proba = summary[["proba_away_win", "proba_draw", "proba_home_win"]].to_numpy()
+    else:
+        from xgboost import XGBClassifier
+        from train_model2 import XGB_PARAMS
+
+        clf = XGBClassifier(**XGB_PARAMS, n_jobs=_WORKER["n_threads"])
+        clf.fit(X[:start], targets[:start])
+        proba = clf.predict_proba(X[start:end])
+
+    return fold["fold"], proba.astype(np.float32)
+
+
+# ----------------------------------------------------------
+# PERSISTENCE
+# ----------------------------------------------------------
+
+def _fold_path(out_dir, fold):
+    return os.path.join(out_dir, f"{fold}.npz")
+
+
+def load_fold(out_dir, fold):
+    path = _fold_path(out_dir, fold)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def save_fold(out_dir, fold, proba, y, fingerprint, n_train):
+    path = _fold_path(out_dir, fold)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, proba=proba, y=y.astype(np.int8),
+             fingerprint=np.array(fingerprint), n_train=np.array(n_train))
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------
+# MAIN
+# ----------------------------------------------------------
+
+@instrumented("backtest")
+def main(model="model2", mode="season", jobs=None, min_train_seasons=MIN_TRAIN_SEASONS,
+         data_path=None):
+    jobs = jobs or os.cpu_count() or 1
+    out_dir = os.path.join(BACKTEST_ROOT, f"{model}_{mode}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    with span("load") as s:
+        data = load_dataset(model, data_path)
+        s.rows(rows_out=len(data["y"]))
+
+    folds = make_folds(data["dates"], data["seasons"], mode, min_train_seasons)
+    if not folds:
+        log(f"Not enough seasons for a walk-forward backtest (need > {min_train_seasons})")
+        return None
+
+    if model == "model1":
+        from train import XGB_PARAMS
+    else:
+        from train_model2 import XGB_PARAMS
+    config = {"model": model, "params": XGB_PARAMS, "features": data["features"]}
+    fingerprints = fold_fingerprints(folds, data["row_hash"], config)
+
+    todo = []
+    for fold, fp in zip(folds, fingerprints):
+        stored = load_fold(out_dir, fold["fold"])
+        if stored is None or str(stored["fingerprint"]) != fp:
+            todo.append((fold, fp))
+    log(f"{model} / {mode}: {len(folds)} folds, {len(folds) - len(todo)} up to date, {len(todo)} to evaluate")
+
+    if todo:
+        workers = max(1, min(jobs, len(todo)))
+        # xgboost threads split between the fold processes
+        n_threads = max(1, (os.cpu_count() or 1) // workers)
+        with span("evaluate_folds", rows_in=sum(f["end"] - f["start"] for f, _ in todo)) as s:
+            s.set(folds=len(todo), workers=workers)
+            by_name = {f["fold"]: (f, fp) for f, fp in todo}
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=(model, data["X"], data["targets"], n_threads),
+            ) as pool:
+                futures = [pool.submit(_run_fold, f) for f, _ in todo]
+                for done in as_completed(futures):
+                    name, proba = done.result()
+                    fold, fp = by_name[name]
+                    save_fold(out_dir, name, proba, data["y"][fold["start"]:fold["end"]], fp, fold["start"])
+                    log(f"  fold {name}: {fold['end'] - fold['start']} matches")
+
+    # Every fold's probability matrix stacked: metrics for all folds at once
+    with span("metrics") as s:
+        stored = [load_fold(out_dir, f["fold"]) for f in folds]
+        proba = np.concatenate([d["proba"] for d in stored])
+        y = np.concatenate([d["y"] for d in stored])
+        sizes = np.array([len(d["y"]) for d in stored])
+        starts = np.r_[0, np.cumsum(sizes)[:-1]]
+
+        per_fold = probabilistic_metrics(proba, y, starts)
+        overall = probabilistic_metrics(proba, y)[0]
+        s.rows(rows_in=len(y))
+
+    summary = pd.DataFrame(per_fold, columns=METRICS)
+    summary.insert(0, "fold", [f["fold"] for f in folds])
+    summary.insert(1, "n_train", [f["start"] for f in folds])
+    summary.insert(2, "n_test", sizes)
+    summary.loc[len(summary)] = ["all", None, int(sizes.sum()), *overall]
+
+    summary_path = os.path.join(BACKTEST_ROOT, f"{model}_{mode}_summary.csv")
+    summary.to_csv(summary_path, index=False)
+
+    print(f"\n=== WALK-FORWARD BACKTEST: {model} / {mode} ===")
+    print(summary.tail(11).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    log(f"Saved → {summary_path}")
+
+    with start_run(f"backtest_{model}_{mode}") as run:
+        run.log_params({"model": model, "mode": mode, "folds": len(folds),
+                        "min_train_seasons": min_train_seasons})
+        run.log_metrics({f"backtest_{m}": float(v) for m, v in zip(METRICS, overall)})
+        run.log_artifact(summary_path)
+
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest (train on the past, test on the next window)")
+    parser.add_argument("model", choices=list(DATASETS))
+    parser.add_argument("--mode", choices=["season", "matchweek"], default="season")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="folds evaluated in parallel")
+    parser.add_argument("--min-train-seasons", type=int, default=MIN_TRAIN_SEASONS)
+    args = parser.parse_args()
+
+    main(args.model, args.mode, args.jobs, args.min_train_seasons)
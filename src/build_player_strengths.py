@@ -1,59 +1,75 @@
-import pandas as pd
-from datetime import datetime
-from sklearn.preprocessing import MinMaxScaler
+import argparse
 
+from incremental_strengths import IncrementalStrengths
+from instrumentation import instrumented, log, span
+from player_schema import load_player_season_stats, normalized_stat_matrix, raw_stat_matrix
+from player_store import PLAYER_STORE_PATH, write_player_store
 
-def log(msg):
-    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now}] {msg}")
-
-
-def detect_numeric_cols(df):
-    """Detect valid numerical columns automatically."""
-    numeric_cols = []
-    for col in df.columns:
-        try:
-            pd.to_numeric(df[col], errors="raise")
-            numeric_cols.append(col)
-        except:
-            pass
-    return numeric_cols
+STATE_PATH = "data/processed/player_strengths_state.pkl"
 
 
 def compute_player_scores(df):
     log("Computing scores...")
 
-    df = df.copy()
-    df = df.fillna(0)
+    # Schema stat columns only, float32, min-max scaled in place
+    X = normalized_stat_matrix(df)
+
+    out = df[["team", "player", "pos"]].copy()
+    out["player_score"] = X.sum(axis=1)
+
+    return out
 
-    # Detect numeric stats
-    numeric_cols = detect_numeric_cols(df)
 
-    # Simple numeric-based score: sum of normalized stats
-    scaler = MinMaxScaler()
-    df[numeric_cols] = scaler.fit_transform(df[numeric_cols])
+def compute_player_scores_incremental(df, state_path=STATE_PATH):
+    """Same scores as compute_player_scores, only changed team-seasons are rescored."""
+    log("Computing scores (incremental)...")
 
-    df["player_score"] = df[numeric_cols].sum(axis=1)
+    engine = IncrementalStrengths(state_path)
+    scores, _ = engine.update(df, raw_stat_matrix(df))
+    engine.save()
 
-    return df[["team", "player", "pos", "player_score"]]
+    out = df[["team", "player", "pos"]].copy()
+    out["player_score"] = scores
 
+    return out
 
-def main():
+
+@instrumented("build_player_strengths")
+def main(incremental=False):
     log("Loading player stats...")
 
-    df = pd.read_csv("data/raw/player_season_stats_model2.csv")
+    with span("load_player_season_stats") as s:
+        df = load_player_season_stats("data/raw/player_season_stats_model2.csv")
+        s.rows(rows_out=len(df))
 
     # Fix team names
     log("Fixing team names...")
     df["team"] = df["team"].astype(str).str.strip()
 
-    df_scores = compute_player_scores(df)
+    with span("compute_player_scores", rows_in=len(df)) as s:
+        if incremental:
+            df_scores = compute_player_scores_incremental(df)
+        else:
+            df_scores = compute_player_scores(df)
+        s.rows(rows_out=len(df_scores))
 
     out_path = "data/processed/player_strengths.csv"
-    df_scores.to_csv(out_path, index=False)
+    with span("save", rows_in=len(df_scores)):
+        df_scores.to_csv(out_path, index=False)
+
+        log(f"Saved → {out_path}")
 
-    log(f"Saved → {out_path}")
+        # Binary store for the predictors (mmap, no CSV parsing)
+        write_player_store(df_scores, PLAYER_STORE_PATH)
+    log(f"Saved → {PLAYER_STORE_PATH}")
+
+    return df_scores
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Player strength scores from FBref season stats")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"reuse unchanged (league, season, team) partitions from {STATE_PATH}")
+    args = parser.parse_args()
+
+    main(args.incremental)
@@ -1,11 +1,7 @@
 import os
 import pandas as pd
-from datetime import datetime
 
-
-def log(msg: str):
-    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
+from instrumentation import log
 
 
 def extract_team_from_url(url):
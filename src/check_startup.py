@@ -0,0 +1,70 @@
+import argparse
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules imported before the first prompt, per interactive command
+STARTUP_IMPORTS = {
+    "predict --model 2": ["football", "predict_model2"],
+    "players": ["football", "predict_model2_players"],
+    "predict --model 1": ["football", "predict"],
+}
+
+# Cold-start budget in ms (pandas alone is ~250 ms of it)
+BUDGET_MS = 600
+
+# Only the code paths that use them may import these
+HEAVY_MODULES = {"xgboost", "sklearn", "mlflow", "scipy"}
+
+
+def import_profile(modules):
+    """(total ms, top-level packages imported) for a fresh interpreter importing `modules`."""
+    code = f"import sys; sys.path.insert(0, {SRC_DIR!r}); " + "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+    )
+
+    total_us, packages = 0, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():  # header line
+            continue
+        packages.add(name.strip().split(".")[0])
+        # Top-level entries (no indentation) add up to the whole import time
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, packages
+
+
+def check(budget_ms=BUDGET_MS, runs=3):
+    failures = []
+    for command, modules in STARTUP_IMPORTS.items():
+        # Best of a few runs: the first one also pays for a cold disk cache
+        profiles = [import_profile(modules) for _ in range(runs)]
+        total_ms = min(p[0] for p in profiles)
+        heavy = sorted(profiles[0][1] & HEAVY_MODULES)
+
+        ok = total_ms <= budget_ms and not heavy
+        print(f"{'OK  ' if ok else 'FAIL'} football {command:<18} {total_ms:7.1f} ms"
+              + (f"  heavy imports: {', '.join(heavy)}" if heavy else ""))
+        if not ok:
+            failures.append(command)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time budget of the interactive CLI commands")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = check(args.budget_ms, args.runs)
+    if failures:
+        print(f"Cold start over budget ({args.budget_ms:.0f} ms) or pulling heavy imports: "
+              f"{', '.join(failures)}")
+        sys.exit(1)
@@ -0,0 +1,90 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RUN_NAME = "check_tracking"
+N_PARAMS = 3
+N_METRICS = 1200
+
+# A run opened in the last lines of a script, as in every entry point
+SCRIPT = f"""
+import sys
+sys.path.insert(0, {SRC_DIR!r})
+from tracking import start_run
+
+with open("artifact.txt", "w") as f:
+    f.write("check")
+
+with start_run({RUN_NAME!r}) as run:
+    run.log_params({{f"p{{i}}": i for i in range({N_PARAMS})}})
+    run.log_metrics({{f"m{{i}}": float(i) for i in range({N_METRICS})}})
+    run.log_artifact("artifact.txt")
+"""
+
+
+def run_script(workdir, mode):
+    env = {
+        **os.environ,
+        "FOOTBALL_TRACKING": mode,
+        "MLFLOW_TRACKING_URI": f"file:{os.path.join(workdir, 'mlruns')}",
+        "MLFLOW_ALLOW_FILE_STORE": "true",
+    }
+    subprocess.run([sys.executable, "-c", SCRIPT], cwd=workdir, env=env, check=True,
+                   capture_output=True, text=True)
+
+
+def logged_run(workdir):
+    """Problems with the run the script logged (empty when it is complete)."""
+    from mlflow.tracking import MlflowClient
+    from tracking import EXPERIMENT
+
+    client = MlflowClient(tracking_uri=f"file:{os.path.join(workdir, 'mlruns')}")
+    experiment = client.get_experiment_by_name(EXPERIMENT)
+    runs = client.search_runs([experiment.experiment_id]) if experiment is not None else []
+    runs = [r for r in runs if r.info.run_name == RUN_NAME]
+    if len(runs) != 1:
+        return [f"{len(runs)} runs named {RUN_NAME}"]
+
+    run = runs[0]
+    problems = []
+    if run.info.status != "FINISHED":
+        problems.append(f"status {run.info.status}")
+    if len(run.data.params) != N_PARAMS:
+        problems.append(f"{len(run.data.params)}/{N_PARAMS} params")
+    if len(run.data.metrics) != N_METRICS:
+        problems.append(f"{len(run.data.metrics)}/{N_METRICS} metrics")
+    if [a.path for a in client.list_artifacts(run.info.run_id)] != ["artifact.txt"]:
+        problems.append("artifact missing")
+    return problems
+
+
+def check(modes=("async", "sync")):
+    # A throwaway file store, read back from this process too
+    os.environ.setdefault("MLFLOW_ALLOW_FILE_STORE", "true")
+    failures = []
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as workdir:
+            run_script(workdir, mode)
+            problems = logged_run(workdir)
+        print(f"{'OK  ' if not problems else 'FAIL'} FOOTBALL_TRACKING={mode}"
+              + (f"  {', '.join(problems)}" if problems else ""))
+        if problems:
+            failures.append(mode)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Log a run at the end of a script and check MLflow has all of it")
+    parser.add_argument("--mode", choices=["async", "sync"], action="append",
+                        help="tracking mode(s) to check (default: both)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, SRC_DIR)
+    failures = check(args.mode or ("async", "sync"))
+    if failures:
+        print(f"Runs lost or incomplete with FOOTBALL_TRACKING={', '.join(failures)}")
+        sys.exit(1)
@@ -1,7 +1,9 @@
 import soccerdata as sd
+from ..instrumentation import instrumented, span
 from .utils import log, safe_save
 from .config import LEAGUES, SEASONS
 
+@instrumented("extract_matches_model2")
 def extract_matches():
 
     log("Starting extraction of matches...")
@@ -9,7 +11,9 @@ def extract_matches():
     fbref = sd.FBref(leagues=LEAGUES, seasons=SEASONS)
 
     log("Reading schedule from FBref...")
-    schedule = fbref.read_schedule()
+    with span("read_schedule") as s:
+        schedule = fbref.read_schedule()
+        s.rows(rows_out=len(schedule))
 
     log(f"Extracted {len(schedule)} matches.")
 
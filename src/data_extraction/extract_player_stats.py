@@ -1,7 +1,9 @@
 import soccerdata as sd
+from ..instrumentation import instrumented, span
 from .utils import log, safe_save
 from .config import LEAGUES, SEASONS
 
+@instrumented("extract_player_stats_model2")
 def extract_player_stats():
 
     log("Starting extraction of player SEASON stats...")
@@ -11,7 +13,9 @@ def extract_player_stats():
 
     # Extraction directe des stats cumulées des joueurs
     log("Reading player season stats...")
-    player_season_stats = fbref.read_player_season_stats()
+    with span("read_player_season_stats") as s:
+        player_season_stats = fbref.read_player_season_stats()
+        s.rows(rows_out=len(player_season_stats))
     # Reset index pour transformer Player / Team / League / Season en colonnes
     player_season_stats = player_season_stats.reset_index()
 
@@ -1,17 +1,23 @@
 import soccerdata as sd
 
+from ..instrumentation import instrumented, span
 from .utils import log, safe_save
 from .config import LEAGUES, SEASONS
 
+@instrumented("extract_team_stats_model2")
 def extract_team_stats():
 
     fbref = sd.FBref(leagues=LEAGUES, seasons=SEASONS)
 
     log("Extracting team match stats...")
-    team_match = fbref.read_team_match_stats()
+    with span("read_team_match_stats") as s:
+        team_match = fbref.read_team_match_stats()
+        s.rows(rows_out=len(team_match))
 
     log("Extracting team season stats...")
-    team_season = fbref.read_team_season_stats()
+    with span("read_team_season_stats") as s:
+        team_season = fbref.read_team_season_stats()
+        s.rows(rows_out=len(team_season))
 
     safe_save(team_match, "data/raw/team_match_stats_model2.csv")
     safe_save(team_season, "data/raw/team_season_stats_model2.csv")
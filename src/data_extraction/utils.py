@@ -1,12 +1,10 @@
 import os
 import pandas as pd
-from datetime import datetime
 
-def log(msg):
-    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
+from ..instrumentation import log, span
 
 def safe_save(df, path):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    df.to_csv(path, index=False)
+    with span(f"save_{os.path.basename(path)}", rows_in=len(df)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path, index=False)
     log(f"Saved → {path}")
@@ -0,0 +1,188 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+SKETCH_SIZE = 20_000
+N_BINS = 10
+PSI_EPS = 1e-4
+CHUNK_ROWS = 65_536
+
+
+# ----------------------------------------------------------
+# REFERENCE SKETCHES
+# ----------------------------------------------------------
+# One sketch per reference dataset, per numeric column:
+#   values[offsets[c]:offsets[c + 1]]  sorted float32 sample (all values, or
+#                                      SKETCH_SIZE evenly spaced quantiles)
+#   n_obs[c]                           non-null values in the reference
+#   edges[c], ref_bins[c]              PSI decile edges and reference shares
+
+def sketch_path(reference_path):
+    return reference_path.replace(".csv", "_sketch.npz")
+
+
+def _numeric_matrix(df, columns):
+    return np.ascontiguousarray(df[columns].to_numpy(dtype=np.float32, na_value=np.nan))
+
+
+def _bin_counts(X, edges):
+    """(C, N_BINS) counts of X's non-null values in each column's bins."""
+    n_cols = X.shape[1]
+    counts = np.zeros(n_cols * N_BINS, dtype=np.int64)
+    col_ids = np.arange(n_cols) * N_BINS
+
+    for start in range(0, len(X), CHUNK_ROWS):
+        chunk = X[start:start + CHUNK_ROWS]
+        bins = (chunk[:, :, None] >= edges[None, :, :]).sum(axis=2) + col_ids
+        counts += np.bincount(bins[~np.isnan(chunk)], minlength=n_cols * N_BINS)
+
+    return counts.reshape(n_cols, N_BINS)
+
+
+def build_sketch(reference_df, max_samples=SKETCH_SIZE):
+    columns = list(reference_df.select_dtypes(include="number").columns)
+    X = _numeric_matrix(reference_df, columns)
+
+    samples, n_obs, edges = [], [], []
+    probs = np.linspace(0, 1, N_BINS + 1)[1:-1]
+    for j in range(len(columns)):
+        col = np.sort(X[:, j][~np.isnan(X[:, j])])
+        n_obs.append(len(col))
+        edges.append(np.quantile(col, probs).astype(np.float32) if len(col) else np.full(N_BINS - 1, np.nan, np.float32))
+        if len(col) > max_samples:
+            ranks = ((np.arange(max_samples) + 0.5) * len(col) / max_samples).astype(np.int64)
+            col = col[ranks]
+        samples.append(col)
+
+    edges = np.array(edges, dtype=np.float32).reshape(len(columns), N_BINS - 1)
+    bins = _bin_counts(X, edges)
+    offsets = np.zeros(len(columns) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in samples])
+
+    return {
+        "columns": np.array(columns, dtype=object),
+        "values": np.concatenate(samples) if samples else np.empty(0, np.float32),
+        "offsets": offsets,
+        "n_obs": np.array(n_obs, dtype=np.int64),
+        "edges": edges,
+        "ref_bins": bins / np.maximum(bins.sum(axis=1, keepdims=True), 1),
+    }
+
+
+def save_sketch(sketch, path):
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **{**sketch, "columns": sketch["columns"].astype(str)})
+    os.replace(tmp_path, path)
+
+
+def load_sketch(path):
+    with np.load(path) as data:
+        sketch = {k: data[k] for k in data.files}
+    sketch["columns"] = sketch["columns"].astype(object)
+    return sketch
+
+
+def ensure_sketch(reference_path):
+    """Sketch for a reference CSV, built from it once and then reused."""
+    path = sketch_path(reference_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(reference_path):
+        return load_sketch(path)
+
+    sketch = build_sketch(pd.read_csv(reference_path))
+    save_sketch(sketch, path)
+    return sketch
+
+
+# ----------------------------------------------------------
+# STATISTICS
+# ----------------------------------------------------------
+
+def _ragged_columns(X):
+    """Non-null values of every column, concatenated column after column."""
+    mask = ~np.isnan(X)
+    return X.T[mask.T], mask.sum(axis=0)
+
+
+def _cdf_statistics(ref_vals, ref_sizes, cur_vals, cur_sizes):
+    """KS distance and Wasserstein-1 for all columns from one merged sort."""
+    n_cols = len(ref_sizes)
+    sizes = ref_sizes + cur_sizes
+    col_ids = np.r_[np.repeat(np.arange(n_cols), ref_sizes), np.repeat(np.arange(n_cols), cur_sizes)]
+    vals = np.r_[ref_vals, cur_vals].astype(np.float64)
+    is_ref = np.r_[np.ones(len(ref_vals)), np.zeros(len(cur_vals))]
+
+    order = np.lexsort((vals, col_ids))
+    vals, col_ids, is_ref = vals[order], col_ids[order], is_ref[order]
+
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+    cum_ref = np.cumsum(is_ref)
+    cum_cur = np.arange(1, len(vals) + 1) - cum_ref
+    # Running counts restart at every column
+    cum_ref -= np.repeat(np.r_[0, cum_ref[starts[1:] - 1]], sizes)
+    cum_cur -= np.repeat(np.r_[0, cum_cur[starts[1:] - 1]], sizes)
+
+    gap = np.abs(cum_ref / ref_sizes[col_ids] - cum_cur / cur_sizes[col_ids])
+
+    # The empirical CDFs only jump after the last of a run of equal values
+    boundary = np.r_[(vals[1:] != vals[:-1]) | (col_ids[1:] != col_ids[:-1]), True]
+    ks = np.maximum.reduceat(np.where(boundary, gap, 0.0), starts)
+
+    width = np.r_[np.diff(vals), 0.0]
+    width[~np.r_[col_ids[1:] == col_ids[:-1], False]] = 0.0
+    wasserstein = np.add.reduceat(gap * width, starts)
+
+    return ks, wasserstein
+
+
+def drift_statistics(current_df, sketch, alpha=0.05):
+    """KS, PSI and Wasserstein of every common numeric column against a sketch."""
+    ref_columns = {c: j for j, c in enumerate(sketch["columns"])}
+    columns = [
+        c for c in current_df.select_dtypes(include="number").columns if c in ref_columns
+    ]
+    idx = np.array([ref_columns[c] for c in columns], dtype=np.int64)
+
+    X = _numeric_matrix(current_df, columns)
+    cur_vals, cur_sizes = _ragged_columns(X)
+
+    ref_sizes = np.diff(sketch["offsets"])[idx]
+    ref_vals = np.concatenate(
+        [sketch["values"][sketch["offsets"][j]:sketch["offsets"][j + 1]] for j in idx]
+    ) if len(idx) else np.empty(0, np.float32)
+
+    # Columns empty on either side carry no distribution to compare
+    keep = (ref_sizes > 0) & (cur_sizes > 0)
+    if not keep.all():
+        ref_vals = ref_vals[np.repeat(keep, ref_sizes)]
+        cur_vals = cur_vals[np.repeat(keep, cur_sizes)]
+        columns = [c for c, k in zip(columns, keep) if k]
+        idx, ref_sizes, cur_sizes, X = idx[keep], ref_sizes[keep], cur_sizes[keep], X[:, keep]
+
+    if not columns:
+        return pd.DataFrame(columns=[
+            "feature", "ks_statistic", "p_value", "psi", "wasserstein", "drift_detected"
+        ])
+
+    ks, wasserstein = _cdf_statistics(ref_vals, ref_sizes, cur_vals, cur_sizes)
+
+    from scipy.stats import distributions
+
+    # Asymptotic two-sample KS p-value on the full reference size
+    n_ref = sketch["n_obs"][idx]
+    en = np.round(n_ref * cur_sizes / (n_ref + cur_sizes))
+    p_value = np.clip(distributions.kstwo.sf(ks, en), 0, 1)
+
+    cur_bins = _bin_counts(X, sketch["edges"][idx])
+    cur_share = np.clip(cur_bins / cur_bins.sum(axis=1, keepdims=True), PSI_EPS, None)
+    ref_share = np.clip(sketch["ref_bins"][idx], PSI_EPS, None)
+    psi = ((cur_share - ref_share) * np.log(cur_share / ref_share)).sum(axis=1)
+
+    return pd.DataFrame({
+        "feature": columns,
+        "ks_statistic": ks.round(4),
+        "p_value": p_value.round(4),
+        "psi": psi.round(4),
+        "wasserstein": wasserstein.round(4),
+        "drift_detected": p_value < alpha,
+    })
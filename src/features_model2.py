@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+from form import MODEL2_FORM_FEATURES, load_form_table
+from head_to_head import H2H_FEATURES, load_h2h_index
+from ratings import MODEL2_RATINGS_PATH, current_ratings
+
+
+MODEL2_FEATURES = [
+    "home_strength", "away_strength", "strength_diff",
+    "home_goals_for", "away_goals_for",
+    "home_goals_against", "away_goals_against",
+    "goals_for_diff", "goals_against_diff",
+    "matches_played_diff",
+    "home_xg", "away_xg",
+    "home_elo", "away_elo", "elo_diff",
+    "h2h_matches", "h2h_wins", "h2h_draws", "h2h_goal_diff",
+    *MODEL2_FORM_FEATURES,
+]
+
+
+# ----------------------------------------------------------
+# LATEST TEAM ROWS
+# ----------------------------------------------------------
+
+def latest_side_rows(df_train):
+    """Last home-side row per home team and last away-side row per away team."""
+    home_side = df_train.groupby("home_team_clean").tail(1).set_index("home_team_clean")
+    away_side = df_train.groupby("away_team_clean").tail(1).set_index("away_team_clean")
+    return home_side, away_side
+
+
+# ----------------------------------------------------------
+# FEATURE ASSEMBLY
+# ----------------------------------------------------------
+
+def assemble_features(home_rows, away_rows):
+    """Model-2 feature rows from aligned home-side and away-side rows."""
+    h = home_rows.reset_index(drop=True)
+    a = away_rows.reset_index(drop=True)
+
+    return pd.DataFrame({
+        "home_strength": h["home_strength"],
+        "away_strength": a["away_strength"],
+        "strength_diff": h["home_strength"] - a["away_strength"],
+
+        "home_goals_for": h["home_goals_for"],
+        "away_goals_for": a["away_goals_for"],
+
+        "home_goals_against": h["home_goals_against"],
+        "away_goals_against": a["away_goals_against"],
+
+        "goals_for_diff": h["home_goals_for"] - a["away_goals_for"],
+        "goals_against_diff": h["home_goals_against"] - a["away_goals_against"],
+
+        "matches_played_diff": h["home_matches_played"] - a["away_matches_played"],
+
+        "home_xg": h["home_xg"],
+        "away_xg": a["away_xg"],
+
+        "home_elo": h["home_elo"],
+        "away_elo": a["away_elo"],
+        "elo_diff": h["home_elo"] - a["away_elo"],
+    })
+
+
+# ----------------------------------------------------------
+# UPCOMING FIXTURES
+# ----------------------------------------------------------
+
+def apply_current_ratings(X, homes, aways, ratings):
+    """Latest Elo of each team instead of its rating before its last home / away game."""
+    if not ratings:
+        return X
+    X["home_elo"] = [ratings.get(t, r) for t, r in zip(homes, X["home_elo"])]
+    X["away_elo"] = [ratings.get(t, r) for t, r in zip(aways, X["away_elo"])]
+    X["elo_diff"] = X["home_elo"] - X["away_elo"]
+    return X
+
+
+def apply_head_to_head(X, homes, aways, index):
+    """Whole head-to-head record of each fixture, gathered from the index (0 without one)."""
+    if index is None:
+        X[H2H_FEATURES] = 0
+        return X
+    h2h = index.lookup(homes, aways)
+    for col in H2H_FEATURES:
+        X[col] = h2h[col].to_numpy()
+    return X
+
+
+def apply_form(X, homes, aways, table):
+    """Current rolling form of both teams (NaN without a form table)."""
+    if table is None:
+        X[MODEL2_FORM_FEATURES] = np.nan
+        return X
+    form = table.features(homes, aways)
+    for col in MODEL2_FORM_FEATURES:
+        X[col] = form[col].to_numpy()
+    return X
+
+
+def fixture_features(home_rows, away_rows, homes, aways):
+    """Model-2 rows of upcoming fixtures: side rows + latest Elo, full head-to-head, current form."""
+    X = assemble_features(home_rows, away_rows)
+    X = apply_current_ratings(X, homes, aways, current_ratings(MODEL2_RATINGS_PATH))
+    X = apply_head_to_head(X, homes, aways, load_h2h_index())
+    return apply_form(X, homes, aways, load_form_table())
@@ -7,6 +7,8 @@ from datetime import datetime
 from pathlib import Path
 from io import StringIO
 
+from instrumentation import instrumented, span
+
 # ===============================
 # CONFIGURATION
 # ===============================
@@ -23,6 +25,13 @@ LEAGUES = {
 
 BASE_URL = "https://www.football-data.co.uk/mmz4281"
 
+# Cotes 1X2 : moyenne du marché (Avg, BbAv avant 2019), sinon Bet365
+ODDS_COLUMNS = {
+    "odds_home": ["AvgH", "BbAvH", "B365H"],
+    "odds_draw": ["AvgD", "BbAvD", "B365D"],
+    "odds_away": ["AvgA", "BbAvA", "B365A"],
+}
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -88,11 +97,17 @@ def fetch_league_data(league_name, code, season):
     })
     df["league"] = league_name
     df["season"] = season
-    return df[["date", "homeTeam", "awayTeam", "homeScore", "awayScore", "league", "season"]]
+
+    for col, candidates in ODDS_COLUMNS.items():
+        present = [c for c in candidates if c in df.columns]
+        df[col] = pd.to_numeric(df[present[0]], errors="coerce") if present else float("nan")
+
+    return df[["date", "homeTeam", "awayTeam", "homeScore", "awayScore", "league", "season", *ODDS_COLUMNS]]
 
 # ===============================
 # MAIN
 # ===============================
+@instrumented("fetch_data")
 def main():
     print("⚽ Début collecte Football-Data —", datetime.now().isoformat())
 
@@ -104,7 +119,9 @@ def main():
 
     for league_name, code in LEAGUES.items():
         for season in seasons:
-            df = fetch_league_data(league_name, code, season)
+            with span(f"fetch_{code}_{season}") as s:
+                df = fetch_league_data(league_name, code, season)
+                s.rows(rows_out=len(df))
             if df.empty:
                 continue
             all_matches.append(df)
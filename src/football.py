@@ -0,0 +1,159 @@
+import argparse
+import importlib
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FBREF_EXTRACTORS = {
+    "matches": ("src.data_extraction.extract_matches", "extract_matches"),
+    "players": ("src.data_extraction.extract_player_stats", "extract_player_stats"),
+    "team-stats": ("src.data_extraction.extract_team_stats", "extract_team_stats"),
+}
+
+
+# ----------------------------------------------------------
+# COMMANDS
+# ----------------------------------------------------------
+# Each command imports its stage module on call: `football predict` must not
+# pay for mlflow / xgboost / sklearn before its prompts show up.
+
+def cmd_fetch(args):
+    if args.source == "football-data":
+        import fetch_data_universal
+        fetch_data_universal.main()
+        return
+
+    # The FBref extractors are a package run as `python -m src.data_extraction.*`
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    for what in args.what or list(FBREF_EXTRACTORS):
+        module, func = FBREF_EXTRACTORS[what]
+        getattr(importlib.import_module(module), func)()
+
+
+def cmd_preprocess(args):
+    if args.model == "1":
+        import preprocess
+        preprocess.main()
+    else:
+        import preprocess_model2
+        preprocess_model2.main(args.incremental)
+
+
+def cmd_train(args):
+    if args.model == "1":
+        import train
+        train.main()
+    else:
+        import train_model2
+        train_model2.main()
+
+
+def cmd_predict(args):
+    if args.model == "1":
+        import predict
+        if args.stream:
+            predict.main_streaming(args.chunksize, args.scorelines, args.rho)
+        else:
+            predict.main(args.scorelines, args.rho)
+    else:
+        import predict_model2
+        predict_model2.main()
+
+
+def cmd_players(args):
+    if args.build:
+        import build_player_strengths
+        build_player_strengths.main(args.incremental)
+    else:
+        import predict_model2_players
+        predict_model2_players.main()
+
+
+def cmd_drift(args):
+    import monitor_drift
+    monitor_drift.main(args.jobs)
+
+
+def cmd_unify(args):
+    import match_keys
+    match_keys.main(args.tolerance)
+
+
+def cmd_backtest(args):
+    import backtest
+    model = args.model if args.model == "unified" else f"model{args.model}"
+    backtest.main(model, args.mode, args.jobs, args.min_train_seasons)
+
+
+# ----------------------------------------------------------
+# PARSER
+# ----------------------------------------------------------
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="football", description="Football prediction pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fetch", help="download raw data")
+    p.add_argument("--source", choices=["football-data", "fbref"], default="football-data")
+    p.add_argument("--what", nargs="+", choices=list(FBREF_EXTRACTORS),
+                   help="FBref tables to extract (default: all)")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("preprocess", help="build the training dataset")
+    p.add_argument("--model", choices=["1", "2"], default="1")
+    p.add_argument("--incremental", action="store_true",
+                   help="model 2: reuse unchanged team-season player scores")
+    p.set_defaults(func=cmd_preprocess)
+
+    p = sub.add_parser("train", help="train a model")
+    p.add_argument("--model", choices=["1", "2"], default="1")
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser("predict", help="model 1 batch predictions, model 2 interactive fixture")
+    p.add_argument("--model", choices=["1", "2"], default="1")
+    p.add_argument("--stream", action="store_true", help="model 1: predict chunk by chunk")
+    p.add_argument("--chunksize", type=int, default=50_000)
+    p.add_argument("--scorelines", action="store_true", help="model 1: add scoreline probabilities")
+    p.add_argument("--rho", type=float, default=0.0, help="model 1: Dixon-Coles correction")
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser("players", help="interactive lineup prediction (player mode)")
+    p.add_argument("--build", action="store_true",
+                   help="build the player strengths instead of predicting")
+    p.add_argument("--incremental", action="store_true",
+                   help="with --build: reuse unchanged (league, season, team) partitions")
+    p.set_defaults(func=cmd_players)
+
+    p = sub.add_parser("drift", help="data drift monitoring")
+    p.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                   help="maximum number of datasets checked in parallel")
+    p.set_defaults(func=cmd_drift)
+
+    p = sub.add_parser("unify", help="join football-data and FBref fixtures into one match table")
+    p.add_argument("--tolerance", type=int, default=3,
+                   help="maximum date difference (days) for the same fixture")
+    p.set_defaults(func=cmd_unify)
+
+    p = sub.add_parser("backtest", help="walk-forward backtest (season or matchweek folds)")
+    p.add_argument("--model", choices=["1", "2", "unified"], default="2",
+                   help="unified: model-2 classifier on the unified match table")
+    p.add_argument("--mode", choices=["season", "matchweek"], default="season")
+    p.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                   help="folds evaluated in parallel")
+    p.add_argument("--min-train-seasons", type=int, default=3)
+    p.set_defaults(func=cmd_backtest)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Stage scripts use paths relative to the repository root
+    os.chdir(REPO_ROOT)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
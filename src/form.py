@@ -0,0 +1,241 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import log
+from ratings import DAY_SPAN, day_numbers
+
+MODEL1_FORM_PATH = "data/processed/model1_form_state.pkl"
+MODEL2_FORM_PATH = "data/processed/model2_form_state.pkl"
+
+# Last-N matches windows, all computed in the same pass
+FORM_WINDOWS = (3, 5, 10)
+
+BASE_STATS = ["points", "goals_for", "goals_against"]
+XG_STATS = ["xg_for", "xg_against"]
+
+
+def form_columns(stats, windows=FORM_WINDOWS):
+    return [f"form{n}_{s}" for n in windows for s in stats]
+
+
+def form_feature_names(stats, windows=FORM_WINDOWS):
+    return [f"{side}_{c}" for side in ("home", "away") for c in form_columns(stats, windows)]
+
+
+MODEL1_FORM_FEATURES = form_feature_names(BASE_STATS)
+MODEL2_FORM_FEATURES = form_feature_names(BASE_STATS + XG_STATS)
+
+
+# ----------------------------------------------------------
+# LONG TEAM-MATCH TABLE
+# ----------------------------------------------------------
+
+def team_match_table(dates, homes, aways, home_goals, away_goals, home_xg=None, away_xg=None):
+    """One row per team and played match: (team, day) and that team's stats in the match."""
+    days = day_numbers(dates)
+    homes = pd.Series(homes).astype(str).to_numpy()
+    aways = pd.Series(aways).astype(str).to_numpy()
+    hg = pd.to_numeric(pd.Series(home_goals), errors="coerce").to_numpy(dtype=np.float64)
+    ag = pd.to_numeric(pd.Series(away_goals), errors="coerce").to_numpy(dtype=np.float64)
+    played = (days >= 0) & ~np.isnan(hg) & ~np.isnan(ag)
+
+    def side(team, goals_for, goals_against, xg_for, xg_against):
+        cols = {
+            "team": team[played],
+            "day": days[played],
+            "points": np.select([goals_for > goals_against, goals_for == goals_against], [3.0, 1.0], 0.0)[played],
+            "goals_for": goals_for[played],
+            "goals_against": goals_against[played],
+        }
+        if xg_for is not None:
+            cols["xg_for"] = xg_for[played]
+            cols["xg_against"] = xg_against[played]
+        return pd.DataFrame(cols)
+
+    xg = None
+    if home_xg is not None:
+        xg = (pd.to_numeric(pd.Series(home_xg), errors="coerce").to_numpy(dtype=np.float64),
+              pd.to_numeric(pd.Series(away_xg), errors="coerce").to_numpy(dtype=np.float64))
+
+    long = pd.concat([
+        side(homes, hg, ag, *(xg if xg else (None, None))),
+        side(aways, ag, hg, *(xg[::-1] if xg else (None, None))),
+    ], ignore_index=True)
+    return long.sort_values(["team", "day"], kind="stable").reset_index(drop=True)
+
+
+def grouped_rolling_means(values, groups, windows=FORM_WINDOWS):
+    """Means over the last N rows of each group, every N at once, NaN-aware.
+
+    `values` is (rows, stats) sorted by group; the window of row i runs from
+    max(i - N + 1, start of its group) to i. Windows are differences of one
+    cumulative sum of the values and one of their non-missing counts.
+    """
+    n = len(values)
+    valid = ~np.isnan(values)
+    cum_sum = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    cum_cnt = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(valid, axis=0)])
+
+    rows = np.arange(n)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if n else np.empty(0, dtype=np.int64)
+    group_start = np.repeat(starts, np.diff(np.r_[starts, n]))
+
+    out = []
+    for w in windows:
+        lo = np.maximum(rows - w + 1, group_start)
+        sums = cum_sum[rows + 1] - cum_sum[lo]
+        counts = cum_cnt[rows + 1] - cum_cnt[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out.append(np.where(counts > 0, sums / counts, np.nan))
+    return np.hstack(out) if out else np.empty((n, 0))
+
+
+# ----------------------------------------------------------
+# CHECKPOINTED FORM TABLE
+# ----------------------------------------------------------
+
+class FormTable:
+    """Rolling form of every team after each of its matches, checkpointed between runs.
+
+    The state holds the long team-match table sorted by (team, day) with
+    the rolled means after every match. New matches dated after the
+    checkpoint are rolled with only the last max(N) - 1 rows of their
+    teams as context; an edit at or before the checkpoint rebuilds the
+    table. The form before a match (the shifted window) is the row of the
+    team's last match on an earlier day, found by an as-of join.
+    """
+
+    def __init__(self, state_path, windows=FORM_WINDOWS):
+        self.state_path = state_path
+        self.windows = tuple(windows)
+        self.state = pd.read_pickle(state_path) if os.path.exists(state_path) else None
+        if self.state is not None and self.state["windows"] != self.windows:
+            log("Form windows changed → full rebuild")
+            self.state = None
+
+    def save(self):
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        pd.to_pickle(self.state, self.state_path + ".tmp")
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    @property
+    def columns(self):
+        return form_columns(self.state["stats"], self.windows)
+
+    # ------------------------------------------------------
+
+    def update(self, long):
+        """Roll the team-match rows not in the checkpoint (`long` from team_match_table)."""
+        stats = [c for c in long.columns if c not in ("team", "day")]
+        row_hash = pd.util.hash_pandas_object(long, index=False).to_numpy()
+
+        prev = self.state
+        if prev is not None:
+            old = long["day"].to_numpy() <= prev["last_day"]
+            if (prev["stats"] != stats or old.sum() != prev["n_rows"]
+                    or int(row_hash[old].sum()) != prev["digest"]):
+                log("Matches before the form checkpoint changed → full rebuild")
+                prev = None
+
+        if prev is None:
+            new, context = long, long.iloc[:0]
+            table = None
+        else:
+            new = long[~old]
+            table = prev["table"]
+            # Last max(N) - 1 matches of the teams that played since the checkpoint
+            context = (
+                table[table["team"].isin(new["team"].unique())]
+                .groupby("team", sort=False).tail(max(self.windows) - 1)[["team", "day", *stats]]
+            )
+
+        work = pd.concat([context.assign(_new=False), new.assign(_new=True)], ignore_index=True)
+        work = work.sort_values(["team", "day"], kind="stable").reset_index(drop=True)
+
+        rolled = grouped_rolling_means(
+            work[stats].to_numpy(dtype=np.float64), work["team"].to_numpy(), self.windows
+        )
+        columns = form_columns(stats, self.windows)
+        added = pd.concat(
+            [work[["team", "day", *stats]], pd.DataFrame(rolled, columns=columns)], axis=1
+        )[work["_new"].to_numpy()]
+
+        table = added if table is None else pd.concat([table, added], ignore_index=True)
+        table = table.sort_values(["team", "day"], kind="stable").reset_index(drop=True)
+
+        self.state = {
+            "windows": self.windows,
+            "stats": stats,
+            "table": table,
+            "last_day": int(long["day"].max()) if len(long) else -1,
+            "n_rows": len(long),
+            "digest": int(row_hash.sum()),
+        }
+        log(f"Form: {len(new)} team-matches rolled, {len(table)} in table, windows {list(self.windows)}")
+        return len(new)
+
+    def _lookup_arrays(self):
+        # (team index, sorted (team, day) keys, rolled values), built once per state
+        if getattr(self, "_arrays", (None,))[0] is not self.state:
+            table = self.state["table"]
+            team_index = pd.Index(pd.unique(table["team"].to_numpy()))
+            keys = team_index.get_indexer(table["team"]) * DAY_SPAN + table["day"].to_numpy()
+            self._arrays = (self.state, team_index, keys, table[self.columns].to_numpy())
+        return self._arrays[1:]
+
+    def as_of(self, teams, dates=None):
+        """Form columns of each team before `dates` (latest form if None; NaN without history)."""
+        team_index, keys, values = self._lookup_arrays()
+        ids = team_index.get_indexer(pd.Series(teams).astype(str))
+        days = np.full(len(ids), DAY_SPAN - 1) if dates is None else day_numbers(dates)
+
+        pos = np.searchsorted(keys, ids * DAY_SPAN + days, side="left") - 1
+        found = (pos >= 0) & (ids >= 0) & (days >= 0)
+        found[found] = keys[pos[found]] // DAY_SPAN == ids[found]
+
+        out = np.full((len(ids), values.shape[1]), np.nan)
+        out[found] = values[pos[found]]
+        return pd.DataFrame(out, columns=self.columns)
+
+    def features(self, homes, aways, dates=None):
+        home = self.as_of(homes, dates).add_prefix("home_")
+        away = self.as_of(aways, dates).add_prefix("away_")
+        return pd.concat([home, away], axis=1)
+
+
+# ----------------------------------------------------------
+# PIPELINE HELPERS
+# ----------------------------------------------------------
+
+def add_form_features(df, state_path, home_col, away_col, home_goals_col, away_goals_col,
+                      date_col="date", xg_cols=None):
+    """Bring the checkpoint up to date with df's played matches and add each row's form before its date."""
+    xg = (df[xg_cols[0]], df[xg_cols[1]]) if xg_cols else (None, None)
+    long = team_match_table(df[date_col], df[home_col], df[away_col], df[home_goals_col], df[away_goals_col], *xg)
+
+    table = FormTable(state_path)
+    table.update(long)
+    table.save()
+
+    features = table.features(df[home_col], df[away_col], df[date_col])
+    for col in features.columns:
+        df[col] = features[col].to_numpy()
+    return df
+
+
+_LOADED = {}
+
+
+def load_form_table(state_path=MODEL2_FORM_PATH):
+    """Saved form table (None when there is none), reloaded when the file changes."""
+    if not os.path.exists(state_path):
+        return None
+    stat = os.stat(state_path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _LOADED.get(state_path)
+    if cached is None or cached[0] != stamp:
+        _LOADED[state_path] = (stamp, FormTable(state_path))
+    return _LOADED[state_path][1]
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import log
+from ratings import DAY_SPAN, day_numbers
+
+MODEL2_H2H_PATH = "data/processed/model2_h2h_index.npz"
+
+H2H_FEATURES = ["h2h_matches", "h2h_wins", "h2h_draws", "h2h_goal_diff"]
+
+# Later than any match day: the whole record, for upcoming fixtures
+_ALL_DAYS = DAY_SPAN - 1
+
+
+# ----------------------------------------------------------
+# INDEX
+# ----------------------------------------------------------
+
+class HeadToHeadIndex:
+    """Cumulative head-to-head record of every ordered team pair, as of any date.
+
+    Each played match is stored twice: once for (home, away) and once for
+    (away, home), each seen from the first team. Only pairs that met have
+    rows. Rows are sorted by (pair, day) and carry the running totals of
+    matches, wins, draws and goal difference within their pair, so the
+    record of a pair before a date is the row found by one searchsorted.
+    """
+
+    def __init__(self, teams, keys, totals):
+        self.teams = list(teams)
+        self.team_index = pd.Index(self.teams)
+        self.keys = keys
+        self.totals = totals
+
+    @classmethod
+    def build(cls, dates, homes, aways, home_goals, away_goals):
+        days = day_numbers(dates)
+        homes = pd.Series(homes).astype(str).to_numpy()
+        aways = pd.Series(aways).astype(str).to_numpy()
+        home_goals = pd.to_numeric(pd.Series(home_goals), errors="coerce").to_numpy()
+        away_goals = pd.to_numeric(pd.Series(away_goals), errors="coerce").to_numpy()
+
+        played = (days >= 0) & ~np.isnan(home_goals) & ~np.isnan(away_goals)
+        teams = sorted(set(homes[played]) | set(aways[played]))
+        index = pd.Index(teams)
+        n = len(teams)
+
+        h = index.get_indexer(homes[played])
+        a = index.get_indexer(aways[played])
+        goal_diff = (home_goals - away_goals)[played]
+        day = days[played]
+
+        # Both points of view: (h vs a) and (a vs h)
+        pair = np.r_[h * n + a, a * n + h]
+        goal_diff = np.r_[goal_diff, -goal_diff]
+        keys = pair * DAY_SPAN + np.r_[day, day]
+
+        order = np.argsort(keys, kind="stable")
+        keys, pair, goal_diff = keys[order], pair[order], goal_diff[order]
+
+        events = np.column_stack([
+            np.ones(len(keys)), goal_diff > 0, goal_diff == 0, goal_diff,
+        ]).astype(np.int64)
+
+        # Running totals restarted at every pair
+        totals = np.cumsum(events, axis=0)
+        starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]]) if len(pair) else np.empty(0, dtype=np.int64)
+        if len(starts):
+            before = totals[starts] - events[starts]
+            totals -= np.repeat(before, np.diff(np.r_[starts, len(pair)]), axis=0)
+
+        log(f"Head-to-head index: {len(starts)} team pairs, {int(played.sum())} matches")
+        return cls(teams, keys, totals)
+
+    # ------------------------------------------------------
+
+    def save(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, teams=np.array(self.teams, dtype=str), keys=self.keys, totals=self.totals)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["teams"].tolist(), data["keys"], data["totals"])
+
+    def lookup(self, homes, aways, dates=None):
+        """H2H_FEATURES of each (home, away) fixture before `dates` (whole record if None).
+
+        Vectorized gather: the fixture keys are searched in the sorted pair
+        keys at once; pairs that never met, or only from that date on, get 0.
+        """
+        h = self.team_index.get_indexer(pd.Series(homes).astype(str))
+        a = self.team_index.get_indexer(pd.Series(aways).astype(str))
+        days = np.full(len(h), _ALL_DAYS) if dates is None else day_numbers(dates)
+
+        pair = h * len(self.teams) + a
+        pos = np.searchsorted(self.keys, pair * DAY_SPAN + days, side="left") - 1
+
+        found = (pos >= 0) & (h >= 0) & (a >= 0) & (days >= 0)
+        found[found] = self.keys[pos[found]] // DAY_SPAN == pair[found]
+
+        values = np.zeros((len(h), len(H2H_FEATURES)), dtype=np.int64)
+        values[found] = self.totals[pos[found]]
+        return pd.DataFrame(values, columns=H2H_FEATURES)
+
+
+# ----------------------------------------------------------
+# PIPELINE HELPERS
+# ----------------------------------------------------------
+
+def add_h2h_features(df, home_col, away_col, home_goals_col, away_goals_col,
+                     date_col="date", index_path=None):
+    """Add each match's head-to-head record before its date; save the index if `index_path`."""
+    index = HeadToHeadIndex.build(df[date_col], df[home_col], df[away_col], df[home_goals_col], df[away_goals_col])
+    if index_path is not None:
+        index.save(index_path)
+
+    features = index.lookup(df[home_col], df[away_col], df[date_col])
+    for col in H2H_FEATURES:
+        df[col] = features[col].to_numpy()
+    return df
+
+
+_LOADED = {}
+
+
+def load_h2h_index(path=MODEL2_H2H_PATH):
+    """Saved index (None when there is none), reloaded when the file changes."""
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _LOADED.get(path)
+    if cached is None or cached[0] != stamp:
+        _LOADED[path] = (stamp, HeadToHeadIndex.load(path))
+    return _LOADED[path][1]
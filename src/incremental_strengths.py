@@ -0,0 +1,189 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import log
+
+PARTITION_COLS = ["league", "season", "team"]
+
+
+def _reduce_segments(ufunc, X, starts):
+    if len(starts) == 0:
+        return np.empty((0, X.shape[1]), dtype=X.dtype)
+    return ufunc.reduceat(X, starts, axis=0)
+
+
+def normalized_sum(X, mins, maxs):
+    """Sum over columns of min-max scaled values (constant columns count as 0)."""
+    ranges = maxs - mins
+    ranges[ranges == 0] = 1
+    return ((X - mins) / ranges).sum(axis=1)
+
+
+# ----------------------------------------------------------
+# INCREMENTAL ENGINE
+# ----------------------------------------------------------
+
+class IncrementalStrengths:
+    """Player scores kept up to date partition by partition.
+
+    Rows are grouped into (league, season, team) partitions. Each partition
+    keeps a content digest, its per-stat min/max and its scores. On update,
+    only partitions whose digest changed are reduced and rescored; the global
+    bounds are rebuilt from the per-partition bounds, and all rows are
+    rescaled only when one of those bounds actually moved. Team strengths
+    (mean player score) are adjusted from per-partition sums.
+    """
+
+    def __init__(self, state_path, partition_cols=PARTITION_COLS):
+        self.state_path = state_path
+        self.partition_cols = list(partition_cols)
+        self.state = pd.read_pickle(state_path) if os.path.exists(state_path) else None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        pd.to_pickle(self.state, self.state_path + ".tmp")
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    # ------------------------------------------------------
+
+    def _partition(self, df, X):
+        cols = [c for c in self.partition_cols if c in df.columns]
+        # str() per value, so missing identifiers become "nan" instead of breaking the join
+        parts = [df[c].astype(object).map(str) for c in cols]
+        keys = parts[0].str.cat(parts[1:], sep="\x1f").to_numpy(dtype=object)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        part_keys = sorted_keys[starts]
+
+        # Order-sensitive content digest of every partition
+        row_hash = pd.util.hash_pandas_object(pd.DataFrame(X), index=False).to_numpy()[order]
+        pos = np.arange(len(order), dtype=np.uint64) - np.repeat(
+            starts, np.diff(np.r_[starts, len(order)])
+        ).astype(np.uint64)
+        with np.errstate(over="ignore"):
+            mixed = row_hash * (pos * np.uint64(2) + np.uint64(1))
+        digests = np.add.reduceat(mixed, starts) if len(starts) else np.empty(0, dtype=np.uint64)
+
+        return order, starts, part_keys, digests
+
+    def update(self, df, X, team_col="team"):
+        """Scores aligned with df's rows and a team → strength Series."""
+        X = np.asarray(X)
+        n_cols = X.shape[1]
+        order, starts, part_keys, digests = self._partition(df, X)
+        Xs = X[order]
+        ends = np.r_[starts[1:], len(order)]
+
+        prev = self.state
+        if prev is not None and prev["n_cols"] != n_cols:
+            prev = None
+        prev_parts = prev["partitions"] if prev is not None else {}
+
+        changed = np.array(
+            [prev_parts.get(k, {}).get("digest") != d for k, d in zip(part_keys, digests)],
+            dtype=bool,
+        )
+
+        # Per-partition bounds: reuse unchanged ones, reduce only changed rows
+        mins = np.empty((len(part_keys), n_cols), dtype=X.dtype)
+        maxs = np.empty((len(part_keys), n_cols), dtype=X.dtype)
+        for i in np.flatnonzero(~changed):
+            mins[i] = prev_parts[part_keys[i]]["min"]
+            maxs[i] = prev_parts[part_keys[i]]["max"]
+
+        changed_idx = np.flatnonzero(changed)
+        if len(changed_idx):
+            rows = np.concatenate([np.arange(starts[i], ends[i]) for i in changed_idx])
+            seg_starts = np.r_[0, np.cumsum(ends[changed_idx] - starts[changed_idx])[:-1]]
+            mins[changed_idx] = _reduce_segments(np.minimum, Xs[rows], seg_starts)
+            maxs[changed_idx] = _reduce_segments(np.maximum, Xs[rows], seg_starts)
+
+        g_min = mins.min(axis=0) if len(mins) else np.zeros(n_cols, dtype=X.dtype)
+        g_max = maxs.max(axis=0) if len(maxs) else np.zeros(n_cols, dtype=X.dtype)
+
+        bounds_moved = (
+            prev is None
+            or not np.array_equal(g_min, prev["min"])
+            or not np.array_equal(g_max, prev["max"])
+        )
+
+        scores_sorted = np.empty(len(order), dtype=X.dtype)
+        if bounds_moved:
+            scores_sorted[:] = normalized_sum(Xs, g_min, g_max)
+            rescored = np.ones(len(part_keys), dtype=bool)
+        else:
+            for i in np.flatnonzero(~changed):
+                scores_sorted[starts[i]:ends[i]] = prev_parts[part_keys[i]]["scores"]
+            if len(changed_idx):
+                scores_sorted[rows] = normalized_sum(Xs[rows], g_min, g_max)
+            rescored = changed
+
+        removed = len(set(prev_parts) - set(part_keys))
+        log(
+            f"{len(part_keys)} partitions: {int(changed.sum())} changed, {removed} removed, "
+            + ("global bounds moved → full rescale" if bounds_moved and prev is not None
+               else "full build" if prev is None else "bounds unchanged")
+        )
+
+        # Team strengths from per-partition sums, adjusted in place
+        teams_sorted = df[team_col].to_numpy()[order][starts] if len(starts) else np.array([])
+        team_sum = dict(prev["team_sum"]) if prev is not None and not bounds_moved else {}
+        team_count = dict(prev["team_count"]) if prev is not None and not bounds_moved else {}
+
+        partitions = {}
+        for i, key in enumerate(part_keys):
+            seg = scores_sorted[starts[i]:ends[i]]
+            old = prev_parts.get(key)
+            total = float(seg.sum()) if rescored[i] else old["sum"]
+            # Rows without a team keep their scores but, as in a groupby, no team strength
+            team = None if pd.isna(teams_sorted[i]) else teams_sorted[i]
+
+            # Off the team the partition counted for last time: a new team mapping moves it
+            if not bounds_moved and old is not None and old["team"] is not None:
+                team_sum[old["team"]] = team_sum.get(old["team"], 0.0) - old["sum"]
+                team_count[old["team"]] = team_count.get(old["team"], 0) - old["count"]
+            if team is not None:
+                team_sum[team] = team_sum.get(team, 0.0) + total
+                team_count[team] = team_count.get(team, 0) + len(seg)
+
+            partitions[key] = {
+                "digest": digests[i],
+                "min": mins[i],
+                "max": maxs[i],
+                "scores": seg.copy(),
+                "sum": total,
+                "count": len(seg),
+                "team": team,
+            }
+
+        # Partitions that disappeared from the source
+        if not bounds_moved:
+            for key in set(prev_parts) - set(part_keys):
+                old = prev_parts[key]
+                if old["team"] is None:
+                    continue
+                team_sum[old["team"]] -= old["sum"]
+                team_count[old["team"]] -= old["count"]
+
+        team_count = {t: c for t, c in team_count.items() if c > 0}
+        team_sum = {t: team_sum[t] for t in team_count}
+
+        self.state = {
+            "n_cols": n_cols,
+            "min": g_min,
+            "max": g_max,
+            "partitions": partitions,
+            "team_sum": team_sum,
+            "team_count": team_count,
+        }
+
+        scores = np.empty_like(scores_sorted)
+        scores[order] = scores_sorted
+        team_strength = pd.Series(
+            {t: team_sum[t] / team_count[t] for t in team_count}, name="team_strength"
+        )
+        return scores, team_strength
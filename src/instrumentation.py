@@ -0,0 +1,196 @@
+import functools
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, peak RSS is not reported
+    resource = None
+
+TRACE_DIR = "traces"
+
+# Opt-in extras: tracemalloc slows allocation-heavy code down noticeably
+TRACE_MLFLOW = os.environ.get("FOOTBALL_TRACE_MLFLOW", "0") == "1"
+TRACE_TRACEMALLOC = os.environ.get("FOOTBALL_TRACE_TRACEMALLOC", "0") == "1"
+
+_stack = []
+
+
+def log(msg):
+    """Timestamped line, prefixed with the current span path when inside one."""
+    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
+    where = f" [{_stack[-1].path}]" if _stack else ""
+    print(f"{now}{where} {msg}")
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _fold_py_peak():
+    peak = tracemalloc.get_traced_memory()[1]
+    for s in _stack:
+        s._py_seen = max(s._py_seen, peak)
+
+
+# ----------------------------------------------------------
+# SPANS
+# ----------------------------------------------------------
+
+class Span:
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.path = f"{parent.path}/{name}" if parent is not None else name
+        self.children = []
+        self.rows_in = None
+        self.rows_out = None
+        self.attrs = {}
+
+    def rows(self, rows_in=None, rows_out=None):
+        """Record how many rows the step consumed / produced."""
+        if rows_in is not None:
+            self.rows_in = int(rows_in)
+        if rows_out is not None:
+            self.rows_out = int(rows_out)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def adopt(self, child):
+        """Attach a span finished in another process (e.g. a pool worker)."""
+        self.children.append(child)
+
+    def _start(self):
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._rss = _peak_rss_mb()
+        self._py_seen = 0
+        if tracemalloc.is_tracing():
+            self._py_base = tracemalloc.get_traced_memory()[0]
+            # reset_peak is global: fold the peak so far into the open spans first
+            _fold_py_peak()
+            tracemalloc.reset_peak()
+
+    def _stop(self):
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        self.peak_rss_mb = _peak_rss_mb()
+        self.rss_growth_mb = (
+            self.peak_rss_mb - self._rss if self.peak_rss_mb is not None else None
+        )
+        self.py_peak_mb = None
+        if tracemalloc.is_tracing():
+            _fold_py_peak()
+            self._py_seen = max(self._py_seen, tracemalloc.get_traced_memory()[1])
+            self.py_peak_mb = (self._py_seen - self._py_base) / 2**20
+
+    def to_dict(self):
+        rows = max(r for r in (self.rows_in, self.rows_out, 0) if r is not None)
+        out = {
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "peak_rss_mb": None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1),
+            "rss_growth_mb": None if self.rss_growth_mb is None else round(self.rss_growth_mb, 1),
+            "py_peak_mb": None if self.py_peak_mb is None else round(self.py_peak_mb, 1),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_s": round(rows / self.wall_s, 1) if rows and self.wall_s > 0 else None,
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.children:
+            out["children"] = [c.to_dict() for c in self.children]
+        return out
+
+    def flat_metrics(self):
+        """{"<path>.wall_s": ..., ...} for this span and all nested ones."""
+        metrics = {f"{self.path}.wall_s": self.wall_s, f"{self.path}.cpu_s": self.cpu_s}
+        if self.peak_rss_mb is not None:
+            metrics[f"{self.path}.peak_rss_mb"] = self.peak_rss_mb
+        for child in self.children:
+            metrics.update(child.flat_metrics())
+        return metrics
+
+
+@contextmanager
+def span(name, rows_in=None):
+    """Time a step; nests under the enclosing span, if any.
+
+    The outermost span is the trace root: on exit it is written to
+    traces/<name>.json and, with FOOTBALL_TRACE_MLFLOW=1, logged to MLflow.
+    """
+    parent = _stack[-1] if _stack else None
+    s = Span(name, parent)
+    s.rows(rows_in=rows_in)
+
+    root = parent is None
+    if root and TRACE_TRACEMALLOC and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    _stack.append(s)
+    s._start()
+    try:
+        yield s
+    finally:
+        s._stop()
+        _stack.pop()
+        if parent is not None:
+            parent.children.append(s)
+        else:
+            write_trace(s)
+            if TRACE_MLFLOW:
+                log_trace_to_mlflow(s)
+
+
+def instrumented(name=None):
+    """Decorator form of span(); the function runs inside a span named after it."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    return _stack[-1] if _stack else None
+
+
+# ----------------------------------------------------------
+# SINKS
+# ----------------------------------------------------------
+
+def write_trace(root, trace_dir=TRACE_DIR):
+    os.makedirs(trace_dir, exist_ok=True)
+    path = os.path.join(trace_dir, f"{root.name}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(root.to_dict(), f, indent=2)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def log_trace_to_mlflow(root):
+    try:
+        import tracking
+    except ImportError:  # imported as src.instrumentation (python -m src.data_extraction.*)
+        from . import tracking
+
+    metrics = {k.replace("/", "."): v for k, v in root.flat_metrics().items()}
+    run = tracking.active_run()
+    if run is not None:
+        run.log_metrics(metrics)
+        return
+
+    with tracking.start_run(f"trace_{root.name}") as run:
+        run.log_metrics(metrics)
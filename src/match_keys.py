@@ -0,0 +1,350 @@
+import argparse
+import os
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from form import MODEL2_FORM_FEATURES, add_form_features
+from head_to_head import H2H_FEATURES, add_h2h_features
+from instrumentation import instrumented, log, span
+from ratings import DAY_SPAN, RATING_FEATURES, add_rating_features, day_numbers
+
+FOOTBALL_DATA_PATH = "data/processed/clean_matches.csv"
+FBREF_PATH = "data/processed/model2_preprocessed.csv"
+UNIFIED_PATH = "data/processed/unified_matches.csv"
+TEAM_KEYS_PATH = "data/processed/team_key_mapping.csv"
+UNIFIED_RATINGS_PATH = "data/processed/unified_elo_state.pkl"
+UNIFIED_FORM_PATH = "data/processed/unified_form_state.pkl"
+
+# Same fixture dated up to this many days apart in the two sources
+# (kick-off time zones, postponements recorded differently)
+DATE_TOLERANCE_DAYS = 3
+
+# Fixture-based name resolution: shared opponents needed, share of the votes
+MIN_VOTES = 3
+MIN_SHARE = 0.8
+
+# Tokens that carry no identity once names are normalized
+STOPWORDS = {"fc", "cf", "afc", "ac", "sc", "ssc", "as", "us", "club", "calcio", "de", "the"}
+
+# Normalized football-data spelling → normalized FBref spelling, for names
+# too far apart to be told apart by shared fixtures on too few matches
+ALIASES = {
+    "man united": "manchester utd",
+    "man city": "manchester city",
+    "nott m forest": "nott ham forest",
+    "newcastle": "newcastle utd",
+    "sheffield united": "sheffield utd",
+    "ath madrid": "atletico madrid",
+    "ath bilbao": "athletic",
+    "sociedad": "real sociedad",
+    "vallecano": "rayo vallecano",
+    "espanol": "espanyol",
+    "celta": "celta vigo",
+    "m gladbach": "gladbach",
+    "ein frankfurt": "eint frankfurt",
+    "fc koln": "koln",
+    "paris sg": "paris s g",
+    "st etienne": "saint etienne",
+    "verona": "hellas verona",
+}
+
+FOOTBALL_DATA_COLUMNS = [
+    "date", "league", "season", "home_team", "away_team",
+    "home_goals", "away_goals", "odds_home", "odds_draw", "odds_away",
+]
+FBREF_COLUMNS = [
+    "date", "league", "season", "home_team", "away_team", "home_team_clean", "away_team_clean",
+    "home_score", "away_score", "home_xg", "away_xg", "home_strength", "away_strength",
+]
+
+# Bookmaker probabilities with the margin taken out
+ODDS_FEATURES = ["implied_home", "implied_draw", "implied_away"]
+
+# Everything known before kick-off: odds, squad strengths, and as-of
+# ratings, head-to-head and form (xG form where FBref has the match)
+UNIFIED_FEATURES = [
+    *ODDS_FEATURES,
+    "home_strength", "away_strength",
+    *RATING_FEATURES,
+    *H2H_FEATURES,
+    *MODEL2_FORM_FEATURES,
+]
+
+
+# ----------------------------------------------------------
+# TEAM KEYS
+# ----------------------------------------------------------
+
+def normalize_team(name):
+    """Lower-case ASCII words without punctuation or club-type tokens ("1. FC Köln" → "koln")."""
+    s = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii").lower()
+    words = re.sub(r"[^a-z0-9]+", " ", s).split()
+    kept = [w for w in words if w not in STOPWORDS and not w.isdigit()]
+    return " ".join(kept or words)
+
+
+def _long_fixtures(days, homes, aways):
+    return pd.DataFrame({
+        "team": np.r_[homes, aways],
+        "opponent": np.r_[aways, homes],
+        "home": np.r_[np.ones(len(homes), bool), np.zeros(len(aways), bool)],
+        "day": np.r_[days, days],
+    })
+
+
+def resolve_by_fixtures(fd, fb, tolerance=DATE_TOLERANCE_DAYS, rounds=3):
+    """football-data key → FBref key for keys found in only one source.
+
+    An unmatched team is paired with the FBref team that played the same
+    (already resolved) opponents, at the same venue, within the date
+    tolerance. Pairs must be mutual best matches with enough votes; each
+    round's pairs become opponents the next round can resolve from.
+    """
+    fd_long = _long_fixtures(fd["day"], fd["home_key"], fd["away_key"])
+    fb_long = _long_fixtures(fb["day"], fb["home_key"], fb["away_key"])
+
+    resolved = {}
+    for _ in range(rounds):
+        fb_keys = set(fb_long["team"])
+        fd_keys = set(fd_long["team"]) - set(resolved)
+        pending_fd = fd_keys - fb_keys
+        pending_fb = fb_keys - fd_keys - set(resolved.values())
+        if not pending_fd or not pending_fb:
+            break
+
+        left = fd_long[fd_long["team"].isin(pending_fd)].copy()
+        left["opponent"] = left["opponent"].replace(resolved)
+        right = fb_long[fb_long["team"].isin(pending_fb)]
+
+        pairs = left.merge(right, on=["opponent", "home"], suffixes=("_fd", "_fb"))
+        pairs = pairs[(pairs["day_fd"] - pairs["day_fb"]).abs() <= tolerance]
+        if pairs.empty:
+            break
+
+        votes = pairs.groupby(["team_fd", "team_fb"]).size().rename("votes").reset_index()
+        total = votes.groupby("team_fd")["votes"].transform("sum")
+        votes = votes[(votes["votes"] >= MIN_VOTES) & (votes["votes"] >= MIN_SHARE * total)]
+        best_fb = votes.sort_values("votes", ascending=False).drop_duplicates("team_fb")
+        found = dict(zip(best_fb["team_fd"], best_fb["team_fb"]))
+        if not found:
+            break
+        resolved.update(found)
+
+    return resolved
+
+
+def team_keys(fd, fb):
+    """Canonical key columns for both sources and the name → key table."""
+    fd = fd.assign(
+        home_key=fd["home_team"].map(normalize_team).replace(ALIASES),
+        away_key=fd["away_team"].map(normalize_team).replace(ALIASES),
+    )
+    fb = fb.assign(
+        home_key=fb["home_team"].map(normalize_team),
+        away_key=fb["away_team"].map(normalize_team),
+    )
+
+    by_fixtures = resolve_by_fixtures(fd, fb)
+    fd["home_key"] = fd["home_key"].replace(by_fixtures)
+    fd["away_key"] = fd["away_key"].replace(by_fixtures)
+
+    fb_keys = set(fb["home_key"]) | set(fb["away_key"])
+    rows = []
+    for source, df in (("football-data", fd), ("fbref", fb)):
+        names = pd.concat([
+            df[["home_team", "home_key"]].set_axis(["name", "key"], axis=1),
+            df[["away_team", "away_key"]].set_axis(["name", "key"], axis=1),
+        ]).drop_duplicates("name")
+        for name, key in zip(names["name"], names["key"]):
+            normalized = normalize_team(name)
+            if source == "fbref":
+                how = "normalized"
+            elif key not in fb_keys:
+                how = "unmatched"
+            elif ALIASES.get(normalized, normalized) in by_fixtures:
+                how = "fixtures"
+            elif normalized in ALIASES:
+                how = "alias"
+            else:
+                how = "normalized"
+            rows.append({"source": source, "name": name, "key": key, "resolved_by": how})
+
+    return fd, fb, pd.DataFrame(rows).sort_values(["source", "key", "name"]).reset_index(drop=True)
+
+
+# ----------------------------------------------------------
+# HASH JOIN
+# ----------------------------------------------------------
+
+def date_offsets(tolerance):
+    """0, -1, +1, -2, +2, ...: exact dates are matched first."""
+    return [0] + [sign * d for d in range(1, tolerance + 1) for sign in (-1, 1)]
+
+
+def match_key_join(left_pairs, left_days, right_pairs, right_days, tolerance=DATE_TOLERANCE_DAYS):
+    """Right row matched by each left row (-1 if none) and the date offset used.
+
+    Keys are (team pair, day) packed in one int64; the right keys go in a
+    hash index (pd.Index) probed with the left keys shifted by each offset
+    of the tolerance window, closest first. A right row is matched once.
+    """
+    left_keys = left_pairs * DAY_SPAN + left_days
+    right_keys = right_pairs * DAY_SPAN + right_days
+
+    match = np.full(len(left_keys), -1, dtype=np.int64)
+    offset = np.zeros(len(left_keys), dtype=np.int64)
+    free = np.ones(len(right_keys), dtype=bool)
+
+    for off in date_offsets(tolerance):
+        todo = np.flatnonzero(match < 0)
+        available = np.flatnonzero(free)
+        if not len(todo) or not len(available):
+            break
+
+        index = pd.Index(right_keys[available])
+        unique = ~index.duplicated()
+        available, index = available[unique], index[unique]
+
+        pos = index.get_indexer(left_keys[todo] + off)
+        hit = np.flatnonzero(pos >= 0)
+        right_rows, first = np.unique(available[pos[hit]], return_index=True)
+
+        left_rows = todo[hit[first]]
+        match[left_rows] = right_rows
+        offset[left_rows] = off
+        free[right_rows] = False
+
+    return match, offset
+
+
+# ----------------------------------------------------------
+# UNIFIED TABLE
+# ----------------------------------------------------------
+
+def unify(fd, fb, tolerance=DATE_TOLERANCE_DAYS):
+    """One row per fixture: football-data results and odds next to FBref xG and strengths."""
+    fd = fd.reindex(columns=FOOTBALL_DATA_COLUMNS).reset_index(drop=True)
+    fb = fb.reindex(columns=FBREF_COLUMNS).reset_index(drop=True)
+    fd["date"] = pd.to_datetime(fd["date"], errors="coerce")
+    fb["date"] = pd.to_datetime(fb["date"], errors="coerce")
+    fd = fd.dropna(subset=["date"]).reset_index(drop=True)
+    fb = fb.dropna(subset=["date"]).reset_index(drop=True)
+    fd["day"], fb["day"] = day_numbers(fd["date"]), day_numbers(fb["date"])
+
+    fd, fb, keys = team_keys(fd, fb)
+
+    teams = pd.Index(sorted(set(fd["home_key"]) | set(fd["away_key"]) | set(fb["home_key"]) | set(fb["away_key"])))
+    n = len(teams)
+
+    def pairs(df):
+        return teams.get_indexer(df["home_key"]) * n + teams.get_indexer(df["away_key"])
+
+    match, offset = match_key_join(pairs(fd), fd["day"].to_numpy(), pairs(fb), fb["day"].to_numpy(), tolerance)
+    matched = match >= 0
+
+    fb_side = fb.drop(columns=["day", "home_key", "away_key"]).rename(columns={
+        "date": "date_fbref", "league": "league_fbref", "season": "season_fbref",
+        "home_team": "home_team_fbref", "away_team": "away_team_fbref",
+    })
+    # reindex on -1 gives all-NaN rows for fixtures FBref does not have
+    left = pd.concat([fd.drop(columns=["day"]), fb_side.reindex(match).reset_index(drop=True)], axis=1)
+    left["date_offset"] = np.where(matched, offset, np.nan)
+    left["source"] = np.where(matched, "both", "football-data")
+
+    # FBref-only fixtures (other leagues, cups, seasons football-data lacks)
+    rest = np.setdiff1d(np.arange(len(fb)), match[matched])
+    right = fb_side.iloc[rest].assign(
+        date=fb["date"].iloc[rest].to_numpy(),
+        league=fb["league"].iloc[rest].to_numpy(),
+        season=fb["season"].iloc[rest].to_numpy(),
+        home_key=fb["home_key"].iloc[rest].to_numpy(),
+        away_key=fb["away_key"].iloc[rest].to_numpy(),
+        home_goals=fb["home_score"].iloc[rest].to_numpy(),
+        away_goals=fb["away_score"].iloc[rest].to_numpy(),
+        source="fbref",
+    )
+
+    unified = pd.concat([left, right], ignore_index=True)
+
+    # Canonical match key: hash of the normalized (day, home, away)
+    key_frame = pd.DataFrame({
+        "day": day_numbers(unified["date"]), "home": unified["home_key"], "away": unified["away_key"],
+    })
+    unified.insert(0, "match_key", [
+        f"{h:016x}" for h in pd.util.hash_pandas_object(key_frame, index=False).to_numpy()
+    ])
+    unified["score_agrees"] = np.where(
+        unified["source"] == "both",
+        (unified["home_goals"] == pd.to_numeric(unified["home_score"], errors="coerce"))
+        & (unified["away_goals"] == pd.to_numeric(unified["away_score"], errors="coerce")),
+        np.nan,
+    )
+    unified = unified.sort_values(["date", "match_key"], kind="stable").reset_index(drop=True)
+
+    n_both = int(matched.sum())
+    shifted = int((matched & (offset != 0)).sum())
+    log(f"{n_both} fixtures in both sources ({shifted} with shifted dates), "
+        f"{len(fd) - n_both} football-data only, {len(rest)} FBref only")
+    disagree = int((unified["score_agrees"] == 0).sum())
+    if disagree:
+        log(f"⚠️ {disagree} matched fixtures with different scores in the two sources")
+    return unified, keys
+
+
+# ----------------------------------------------------------
+# TRAINING FEATURES
+# ----------------------------------------------------------
+
+def add_training_features(unified):
+    """result_xgb and UNIFIED_FEATURES on the canonical team keys, so both sources feed one history."""
+    unified["result_xgb"] = np.sign(unified["home_goals"] - unified["away_goals"]) + 1
+
+    inverse = 1.0 / unified[["odds_home", "odds_draw", "odds_away"]].where(lambda o: o > 1.0)
+    implied = inverse.div(inverse.sum(axis=1, min_count=3), axis=0)
+    unified[ODDS_FEATURES] = implied.to_numpy()
+
+    keys = ("home_key", "away_key", "home_goals", "away_goals")
+    unified = add_rating_features(unified, UNIFIED_RATINGS_PATH, *keys)
+    unified = add_h2h_features(unified, *keys)
+    return add_form_features(unified, UNIFIED_FORM_PATH, *keys, xg_cols=("home_xg", "away_xg"))
+
+
+@instrumented("unify_matches")
+def main(tolerance=DATE_TOLERANCE_DAYS):
+    with span("load") as s:
+        fd = pd.read_csv(FOOTBALL_DATA_PATH)
+        fb = pd.read_csv(FBREF_PATH)
+        s.rows(rows_out=len(fd) + len(fb))
+
+    with span("join", rows_in=len(fd) + len(fb)) as s:
+        unified, keys = unify(fd, fb, tolerance)
+        s.rows(rows_out=len(unified))
+
+    with span("features", rows_in=len(unified)):
+        unified = add_training_features(unified)
+
+    unmatched = keys[keys["resolved_by"] == "unmatched"]
+    if len(unmatched):
+        log(f"{len(unmatched)} football-data teams without an FBref counterpart: "
+            + ", ".join(unmatched["name"].astype(str).head(10)) + ("…" if len(unmatched) > 10 else ""))
+
+    with span("save", rows_in=len(unified)):
+        os.makedirs(os.path.dirname(UNIFIED_PATH), exist_ok=True)
+        unified.to_csv(UNIFIED_PATH, index=False)
+        keys.to_csv(TEAM_KEYS_PATH, index=False)
+
+    log(f"Saved → {UNIFIED_PATH}")
+    log(f"Saved → {TEAM_KEYS_PATH}")
+    return unified
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join football-data and FBref fixtures on a canonical match key")
+    parser.add_argument("--tolerance", type=int, default=DATE_TOLERANCE_DAYS,
+                        help="maximum date difference (days) for the same fixture")
+    args = parser.parse_args()
+
+    main(args.tolerance)
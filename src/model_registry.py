@@ -0,0 +1,218 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from instrumentation import log
+from tree_predictor import load_predictor
+
+HOME_MODEL_PATH = "app/models/home_model.json"
+AWAY_MODEL_PATH = "app/models/away_model.json"
+MODEL2_PATH = "models/model2_xgb.json"
+
+SMOKE_ROWS = 16
+
+
+def _stat_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+# ----------------------------------------------------------
+# LOADERS / WARM-UP
+# ----------------------------------------------------------
+
+def load_regressor(path):
+    model = xgb.XGBRegressor()
+    model.load_model(path)
+    return model
+
+
+def load_compiled(path):
+    """Classifier as flattened NumPy trees: same probabilities, no DMatrix per call."""
+    return load_predictor(path)
+
+
+def smoke_batch(model, rows=SMOKE_ROWS):
+    if hasattr(model, "get_booster"):
+        booster = model.get_booster()
+        names, n_features = booster.feature_names, booster.num_features()
+    else:
+        names, n_features = model.feature_names, model.num_feature
+    names = names or [f"f{i}" for i in range(n_features)]
+    return pd.DataFrame(np.zeros((rows, len(names)), dtype=np.float32), columns=names)
+
+
+def warm_model(model):
+    """Run a smoke batch so the first real request does not pay for lazy setup."""
+    X = smoke_batch(model)
+    out = model.predict_proba(X) if hasattr(model, "predict_proba") else model.predict(X)
+    if not np.isfinite(out).all():
+        raise ValueError("Smoke batch produced non-finite predictions")
+
+
+# ----------------------------------------------------------
+# REGISTRY
+# ----------------------------------------------------------
+
+class HotModelRegistry:
+    """Serves models and reloads them in the background when their file changes.
+
+    Readers get models from an immutable snapshot dict; a reload builds and
+    warms the new model first, then replaces the whole snapshot in a single
+    assignment, so a request sees either the old or the new model, never a
+    half-loaded one. A file is only reloaded once its size/mtime has been
+    stable for one poll. A failed load keeps the previous model and is not
+    retried until the file changes again.
+    """
+
+    def __init__(self, poll_interval=30.0):
+        self.poll_interval = poll_interval
+        self._specs = {}
+        self._snapshot = {}
+        self._versions = {}
+        self._pending = {}
+        self._failed = {}
+        self._listeners = {}
+        self._reload_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, name, path, loader, warm=warm_model):
+        self._specs[name] = (path, loader, warm)
+        self._reload(name, _stat_stamp(path))
+        return self
+
+    def serve(self, name, path, loader, warm=warm_model):
+        """Model `name`, watching `path` from the first call on."""
+        with self._watch_lock:
+            if name not in self._specs:
+                self.watch(name, path, loader, warm)
+        return self.get(name)
+
+    def on_swap(self, name, callback):
+        """Call `callback()` each time model `name` is swapped in."""
+        with self._watch_lock:
+            listeners = self._listeners.setdefault(name, [])
+            if callback not in listeners:
+                listeners.append(callback)
+        return self
+
+    # ------------------------------------------------------
+    # READ PATH
+    # ------------------------------------------------------
+
+    def get(self, name):
+        try:
+            return self._snapshot[name]
+        except KeyError:
+            path = self._specs[name][0] if name in self._specs else None
+            raise LookupError(f"{name}: no model loaded from {path}") from None
+
+    def snapshot(self):
+        return self._snapshot
+
+    def versions(self):
+        return dict(self._versions)
+
+    # ------------------------------------------------------
+    # RELOAD
+    # ------------------------------------------------------
+
+    def _reload(self, name, stamp):
+        path, loader, warm = self._specs[name]
+        if stamp is None:
+            log(f"⚠️ {name}: {path} not found, keeping current model")
+            return False
+
+        try:
+            model = loader(path)
+            if warm is not None:
+                warm(model)
+        except Exception as e:
+            # Not retried until the file changes again
+            self._failed[name] = stamp
+            log(f"⚠️ {name}: reload of {path} failed ({e}), keeping current model")
+            return False
+
+        with self._reload_lock:
+            self._snapshot = {**self._snapshot, name: model}
+            self._versions[name] = stamp
+            self._failed.pop(name, None)
+        log(f"✅ {name}: loaded {path}")
+
+        # e.g. prediction caches, whose entries came from the previous model
+        for callback in self._listeners.get(name, ()):
+            callback()
+        return True
+
+    def check_now(self):
+        """Reload every model whose file changed and has been stable since the last check."""
+        reloaded = []
+        for name, (path, _, _) in list(self._specs.items()):
+            stamp = _stat_stamp(path)
+            if stamp is None or stamp in (self._versions.get(name), self._failed.get(name)):
+                self._pending.pop(name, None)
+                continue
+
+            # Wait for the writer to finish: same stamp on two consecutive polls
+            if self._pending.get(name) != stamp:
+                self._pending[name] = stamp
+                continue
+
+            self._pending.pop(name, None)
+            if self._reload(name, stamp):
+                reloaded.append(name)
+        return reloaded
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check_now()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def default_registry(poll_interval=30.0):
+    """Registry over the goal regressors (model 1) and the model-2 classifier."""
+    registry = HotModelRegistry(poll_interval=poll_interval)
+    registry.watch("home_model", HOME_MODEL_PATH, load_regressor)
+    registry.watch("away_model", AWAY_MODEL_PATH, load_regressor)
+    registry.watch("model2", MODEL2_PATH, load_compiled)
+    return registry
+
+
+_SHARED = None
+_SHARED_LOCK = threading.Lock()
+
+
+def shared_registry(poll_interval=30.0):
+    """Process-wide registry the predictors load their models from, polling in the background."""
+    global _SHARED
+    with _SHARED_LOCK:
+        if _SHARED is None:
+            _SHARED = HotModelRegistry(poll_interval=poll_interval).start()
+    return _SHARED
+
+
+def serve_classifier(path=MODEL2_PATH, name="model2", on_swap=None):
+    registry = shared_registry()
+    if on_swap is not None:
+        registry.on_swap(name, on_swap)
+    return registry.serve(name, path, load_compiled)
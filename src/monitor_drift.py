@@ -1,46 +1,29 @@
+import argparse
 import os
+import time
 import pandas as pd
-from scipy.stats import ks_2samp
-import mlflow
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import shutil
 
+from instrumentation import current_span, instrumented, span
+from drift_engine import build_sketch, ensure_sketch, save_sketch, sketch_path, drift_statistics
+from reference_snapshots import apply_retention, list_snapshots, save_snapshot
+from tracking import start_run
 
-def detect_drift(current_df, reference_df, report_prefix, reports_path):
-    """Generate a drift report for a pair of datasets."""
+
+def detect_drift(current_df, reference_sketch, report_prefix, reports_path):
+    """Generate a drift report for a dataset against its reference sketch."""
 
     csv_report_path = os.path.join(reports_path, f"{report_prefix}_drift_report.csv")
     html_report_path = os.path.join(reports_path, f"{report_prefix}_drift_report.html")
 
-    # Colonnes numériques communes
-    common_cols = list(
-        set(current_df.select_dtypes(include="number").columns)
-        & set(reference_df.select_dtypes(include="number").columns)
-    )
+    # KS / PSI / Wasserstein sur toutes les colonnes numériques communes
+    drift_df = drift_statistics(current_df, reference_sketch)
 
-    if not common_cols:
+    if drift_df.empty:
         print(f"⚠️ Aucune colonne numérique commune pour {report_prefix}")
         return None
 
-    results = []
-    for col in common_cols:
-        ref_col = reference_df[col].dropna()
-        cur_col = current_df[col].dropna()
-
-        if len(ref_col) == 0 or len(cur_col) == 0:
-            continue
-
-        stat, p_value = ks_2samp(ref_col, cur_col)
-        drift = p_value < 0.05
-
-        results.append({
-            "feature": col,
-            "ks_statistic": round(stat, 4),
-            "p_value": round(p_value, 4),
-            "drift_detected": drift
-        })
-
-    drift_df = pd.DataFrame(results)
     drift_df.to_csv(csv_report_path, index=False)
 
     drift_count = drift_df["drift_detected"].sum()
@@ -71,8 +54,84 @@ def detect_drift(current_df, reference_df, report_prefix, reports_path):
     return drift_rate, csv_report_path, html_report_path
 
 
-def main():
+THRESHOLD = 0.3
+
+
+def check_dataset(report_prefix, current_path, reports_path):
+    """Drift job for one dataset; returns what has to be logged to MLflow.
+
+    The finished span is returned too, so that the parent process can attach
+    the spans of its pool workers to its own trace.
+    """
+    with span(f"drift_{report_prefix}") as s:
+        result = _check_dataset(report_prefix, current_path, reports_path)
+        s.rows(rows_in=result.pop("n_rows", None))
+    result["span"] = s
+    return result
+
+
+def _check_dataset(report_prefix, current_path, reports_path):
+    start = time.perf_counter()
+    result = {"dataset": report_prefix, "drift_rate": None, "artifacts": []}
+
+    print(f"🔍 Vérification du drift pour : {report_prefix}")
+
+    if not os.path.exists(current_path):
+        print(f"❌ Fichier manquant : {current_path}, skip...")
+        result["wall_time"] = time.perf_counter() - start
+        return result
+
+    current_df = pd.read_csv(current_path)
+    result["n_rows"] = len(current_df)
+    reference_path = current_path.replace(".csv", "_reference.csv")
+
+    # Si référence absente → création
+    if not os.path.exists(reference_path):
+        current_df.to_csv(reference_path, index=False)
+        save_sketch(build_sketch(current_df), sketch_path(reference_path))
+        save_snapshot(current_df, report_prefix)
+        print(f"🆕 Référence créée : {reference_path}")
+        result["wall_time"] = time.perf_counter() - start
+        return result
+
+    # Résumé compact de la référence (construit une seule fois)
+    reference_sketch = ensure_sketch(reference_path)
+
+    # Drift
+    drift = detect_drift(current_df, reference_sketch, report_prefix, reports_path)
+    if drift is not None:
+        drift_rate, csv_report, html_report = drift
+        result["drift_rate"] = drift_rate
+        result["artifacts"] = [csv_report, html_report]
+
+        # Refresh auto
+        if drift_rate > THRESHOLD:
+            # Référence créée avant l'historique : on la conserve d'abord
+            if not list_snapshots(report_prefix):
+                save_snapshot(
+                    pd.read_csv(reference_path), report_prefix,
+                    timestamp=datetime.fromtimestamp(os.path.getmtime(reference_path)),
+                )
+
+            current_df.to_csv(reference_path, index=False)
+            save_sketch(build_sketch(current_df), sketch_path(reference_path))
+            snapshot_path, written = save_snapshot(current_df, report_prefix)
+            expired, _ = apply_retention(report_prefix)
+
+            print(f"🔁 Mise à jour référence ({report_prefix}) car drift > {THRESHOLD:.0%}")
+            print(f"📦 Snapshot : {snapshot_path} ({written}/{len(current_df.columns)} colonnes nouvelles, "
+                  f"{expired} snapshots expirés)")
+        else:
+            print(f"✅ Pas de drift majeur pour {report_prefix}")
+
+    result["wall_time"] = time.perf_counter() - start
+    return result
+
+
+@instrumented("data_drift")
+def main(jobs=None):
     print("📊 Début du monitoring Data Drift...")
+    start = time.perf_counter()
 
     processed_path = "data/processed"
     raw_path = "data/raw"
@@ -91,57 +150,49 @@ def main():
         "team_season_stats": os.path.join(raw_path, "team_season_stats_model2.csv"),
     }
 
-    mlflow.set_experiment("football_prediction_mlops")
-
-    with mlflow.start_run(run_name="data_drift_monitoring"):
-
-        for report_prefix, current_path in datasets.items():
-
-            print(f"\n🔍 Vérification du drift pour : {report_prefix}")
-
-            if not os.path.exists(current_path):
-                print(f"❌ Fichier manquant : {current_path}, skip...")
-                continue
-
-            current_df = pd.read_csv(current_path)
-            reference_path = current_path.replace(".csv", "_reference.csv")
-
-            # Si référence absente → création
-            if not os.path.exists(reference_path):
-                current_df.to_csv(reference_path, index=False)
-                print(f"🆕 Référence créée : {reference_path}")
-                continue
-
-            reference_df = pd.read_csv(reference_path)
-
-            # Drift
-            result = detect_drift(current_df, reference_df, report_prefix, reports_path)
-            if result is None:
-                continue
-
-            drift_rate, csv_report, html_report = result
-
-            mlflow.log_metric(f"{report_prefix}_drift_rate", drift_rate)
-            mlflow.log_artifact(csv_report)
-            mlflow.log_artifact(html_report)
-
-            # Refresh auto
-            THRESHOLD = 0.3
-            if drift_rate > THRESHOLD:
-                backup_path = reference_path.replace(
-                    ".csv",
-                    f"_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-                )
-                shutil.copy(reference_path, backup_path)
-                current_df.to_csv(reference_path, index=False)
-
-                print(f"🔁 Mise à jour référence ({report_prefix}) car drift > {THRESHOLD:.0%}")
-                print(f"📦 Ancienne référence sauvegardée : {backup_path}")
-            else:
-                print(f"✅ Pas de drift majeur pour {report_prefix}")
+    # Un job par dataset, nombre de workers borné
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(datasets)))
+    if jobs == 1:
+        results = [check_dataset(name, path, reports_path) for name, path in datasets.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(check_dataset, name, path, reports_path)
+                for name, path in datasets.items()
+            ]
+            results = [f.result() for f in futures]
+        for r in results:
+            current_span().adopt(r["span"])
+
+    total_time = time.perf_counter() - start
+
+    print("\n⏱️ Temps par dataset :")
+    for r in results:
+        print(f"   {r['dataset']:<20} {r['wall_time']:.2f}s")
+    print(f"   {'total':<20} {total_time:.2f}s ({jobs} workers)")
+
+    # Un seul run MLflow, métriques envoyées en un batch (thread de fond)
+    metrics = {f"{r['dataset']}_drift_seconds": r["wall_time"] for r in results}
+    metrics.update({
+        f"{r['dataset']}_drift_rate": r["drift_rate"]
+        for r in results if r["drift_rate"] is not None
+    })
+    metrics["drift_total_seconds"] = total_time
+
+    with start_run("data_drift_monitoring") as run:
+        run.log_param("drift_workers", jobs)
+        run.log_metrics(metrics)
+        for r in results:
+            for artifact in r["artifacts"]:
+                run.log_artifact(artifact)
 
     print("\n🎯 Monitoring terminé.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Data drift monitoring")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="maximum number of datasets checked in parallel")
+    args = parser.parse_args()
+
+    main(args.jobs)
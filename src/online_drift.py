@@ -0,0 +1,240 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from drift_engine import PSI_EPS, build_sketch
+from instrumentation import log
+
+MONITOR_STATE_PATH = "data/monitoring/model2_online_drift.npz"
+
+WINDOW = 500
+PSI_THRESHOLD = 0.2
+PH_DELTA = 0.1
+PH_LAMBDA = 50.0
+
+
+def psi(counts, ref_share):
+    """PSI of each row of window counts against the reference shares."""
+    total = np.maximum(counts.sum(axis=-1, keepdims=True), 1)
+    cur = np.clip(counts / total, PSI_EPS, None)
+    ref = np.clip(ref_share, PSI_EPS, None)
+    return ((cur - ref) * np.log(cur / ref)).sum(axis=-1)
+
+
+# ----------------------------------------------------------
+# ONLINE MONITOR
+# ----------------------------------------------------------
+
+class OnlineDriftMonitor:
+    """Sliding-window drift statistics updated per served prediction.
+
+    Per input feature: PSI over the last `window` values, binned on the
+    training deciles, and a two-sided Page-Hinkley test on the value
+    standardized by the training mean/std. For the predicted class: PSI of
+    the windowed class counts against the training label shares.
+
+    Only bin indices are kept in the window (never the raw requests), and
+    every update touches a fixed number of cells, whatever the traffic.
+    """
+
+    def __init__(self, features, edges, ref_bins, mean, std, class_shares,
+                 window=WINDOW, psi_threshold=PSI_THRESHOLD,
+                 ph_delta=PH_DELTA, ph_lambda=PH_LAMBDA, on_alert=None):
+        self.features = list(features)
+        self.edges = np.asarray(edges, dtype=np.float32)
+        self.ref_bins = np.asarray(ref_bins, dtype=np.float64)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.where(np.asarray(std) > 0, std, 1.0).astype(np.float64)
+        self.class_shares = np.asarray(class_shares, dtype=np.float64)
+
+        self.window = window
+        self.psi_threshold = psi_threshold
+        self.ph_delta = ph_delta
+        self.ph_lambda = ph_lambda
+        self.on_alert = on_alert
+        self.alerts = []
+
+        n_features, n_bins = self.ref_bins.shape
+        n_classes = len(self.class_shares)
+
+        # Ring buffers of bin / class indices, -1 = empty slot
+        self.feature_ring = np.full((window, n_features), -1, dtype=np.int16)
+        self.feature_counts = np.zeros((n_features, n_bins), dtype=np.int64)
+        self.feature_pos = 0
+        self.class_ring = np.full(window, -1, dtype=np.int16)
+        self.class_counts = np.zeros(n_classes, dtype=np.int64)
+        self.class_pos = 0
+
+        # Page-Hinkley cumulative sums and running minima (upward, downward)
+        self.ph_sum = np.zeros((2, n_features))
+        self.ph_min = np.zeros((2, n_features))
+        self.ph_last_fire = np.full(n_features, -window - 1, dtype=np.int64)
+
+        self.feature_alarm = np.zeros(n_features, dtype=bool)
+        self.class_alarm = False
+        self.n_features_seen = 0
+        self.n_classes_seen = 0
+
+    @classmethod
+    def from_reference(cls, reference_df, features, labels, n_classes=3, **kwargs):
+        """Reference bins and moments from the training set, label shares from its target."""
+        sketch = build_sketch(reference_df[features])
+        values = reference_df[features].to_numpy(dtype=np.float64)
+        shares = np.bincount(np.asarray(labels, dtype=np.int64), minlength=n_classes)
+
+        return cls(
+            features,
+            sketch["edges"],
+            sketch["ref_bins"],
+            np.nanmean(values, axis=0),
+            np.nanstd(values, axis=0),
+            shares / max(shares.sum(), 1),
+            **kwargs,
+        )
+
+    # ------------------------------------------------------
+    # UPDATES
+    # ------------------------------------------------------
+
+    def observe_features(self, row):
+        """One served feature row (in self.features order)."""
+        x = np.asarray(row, dtype=np.float32).reshape(-1)
+        valid = ~np.isnan(x)
+        cols = np.arange(len(x))
+
+        bins = (x[:, None] >= self.edges).sum(axis=1).astype(np.int16)
+        bins[~valid] = -1
+
+        old = self.feature_ring[self.feature_pos]
+        leaving = old >= 0
+        self.feature_counts[cols[leaving], old[leaving]] -= 1
+        self.feature_counts[cols[valid], bins[valid]] += 1
+        self.feature_ring[self.feature_pos] = bins
+        self.feature_pos = (self.feature_pos + 1) % self.window
+        self.n_features_seen += 1
+
+        # Page-Hinkley on the standardized value, both directions
+        z = np.where(valid, (x - self.mean) / self.std, 0.0)
+        step = np.where(valid, 1.0, 0.0)
+        self.ph_sum[0] += (z - self.ph_delta) * step
+        self.ph_sum[1] += (-z - self.ph_delta) * step
+        np.minimum(self.ph_min, self.ph_sum, out=self.ph_min)
+
+        ph_fired = (self.ph_sum - self.ph_min > self.ph_lambda).any(axis=0)
+        # A sustained shift keeps firing: alert once per window
+        quiet = self.n_features_seen - self.ph_last_fire > self.window
+        for j in np.flatnonzero(ph_fired & quiet):
+            self._alert("page_hinkley", self.features[j],
+                        float((self.ph_sum[:, j] - self.ph_min[:, j]).max()))
+        self.ph_last_fire[ph_fired] = self.n_features_seen
+        # Restart the test where it fired
+        self.ph_sum[:, ph_fired] = 0
+        self.ph_min[:, ph_fired] = 0
+
+        if self.n_features_seen >= self.window:
+            values = psi(self.feature_counts, self.ref_bins)
+            drifting = values > self.psi_threshold
+            for j in np.flatnonzero(drifting & ~self.feature_alarm):
+                self._alert("psi", self.features[j], float(values[j]))
+            # Hysteresis: an alarm clears only well below the threshold
+            self.feature_alarm = (self.feature_alarm | drifting) & (values > self.psi_threshold / 2)
+
+    def observe_prediction(self, pred_class):
+        old = self.class_ring[self.class_pos]
+        if old >= 0:
+            self.class_counts[old] -= 1
+        self.class_counts[pred_class] += 1
+        self.class_ring[self.class_pos] = pred_class
+        self.class_pos = (self.class_pos + 1) % self.window
+        self.n_classes_seen += 1
+
+        if self.n_classes_seen >= self.window:
+            value = float(psi(self.class_counts, self.class_shares))
+            drifting = value > self.psi_threshold
+            if drifting and not self.class_alarm:
+                self._alert("psi", "predicted_class", value)
+            self.class_alarm = (self.class_alarm or drifting) and value > self.psi_threshold / 2
+
+    def observe(self, row, pred_class):
+        if row is not None:
+            self.observe_features(row)
+        self.observe_prediction(pred_class)
+
+    def _alert(self, kind, feature, value):
+        alert = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "kind": kind,
+            "feature": feature,
+            "value": round(value, 4),
+        }
+        self.alerts.append(alert)
+        log(f"⚠️ Online drift ({kind}) on {feature}: {value:.3f}")
+        if self.on_alert is not None:
+            self.on_alert(alert)
+
+    # ------------------------------------------------------
+    # STATUS & PERSISTENCE
+    # ------------------------------------------------------
+
+    def status(self):
+        return {
+            "feature_psi": dict(zip(self.features, psi(self.feature_counts, self.ref_bins).round(4))),
+            "class_psi": round(float(psi(self.class_counts, self.class_shares)), 4),
+            "class_window": self.class_counts.tolist(),
+            "alerts": len(self.alerts),
+        }
+
+    _STATE = [
+        "edges", "ref_bins", "mean", "std", "class_shares",
+        "feature_ring", "feature_counts", "class_ring", "class_counts",
+        "ph_sum", "ph_min", "ph_last_fire", "feature_alarm",
+    ]
+    _SCALARS = [
+        "window", "psi_threshold", "ph_delta", "ph_lambda",
+        "feature_pos", "class_pos", "class_alarm", "n_features_seen", "n_classes_seen",
+    ]
+
+    def save(self, path=MONITOR_STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            features=np.array(self.features, dtype=str),
+            **{k: getattr(self, k) for k in self._STATE},
+            **{k: np.array(getattr(self, k)) for k in self._SCALARS},
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MONITOR_STATE_PATH, on_alert=None):
+        with np.load(path) as data:
+            monitor = cls(
+                data["features"].tolist(), data["edges"], data["ref_bins"],
+                data["mean"], data["std"], data["class_shares"],
+                window=int(data["window"]),
+                psi_threshold=float(data["psi_threshold"]),
+                ph_delta=float(data["ph_delta"]),
+                ph_lambda=float(data["ph_lambda"]),
+                on_alert=on_alert,
+            )
+            for k in cls._STATE:
+                setattr(monitor, k, data[k].copy())
+            for k in cls._SCALARS:
+                setattr(monitor, k, data[k].item())
+        return monitor
+
+
+def open_online_monitor(reference_df, features, labels, reference_path=None,
+                        path=MONITOR_STATE_PATH):
+    """Persisted monitor when it still matches the reference, else a fresh one."""
+    if os.path.exists(path):
+        monitor = OnlineDriftMonitor.load(path)
+        newer_reference = (
+            reference_path is not None
+            and os.path.getmtime(reference_path) > os.path.getmtime(path)
+        )
+        if monitor.features == list(features) and not newer_reference:
+            return monitor
+        log("Online drift state outdated (new reference), starting a new window")
+    return OnlineDriftMonitor.from_reference(reference_df, features, labels)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from features_model2 import fixture_features, latest_side_rows
+from form import MODEL2_FORM_PATH
+from head_to_head import MODEL2_H2H_PATH
+from instrumentation import instrumented, log, span
+from ratings import MODEL2_RATINGS_PATH
+
+MODEL_PATH = "models/model2_xgb.json"
+TRAINING_DATASET_PATH = "data/processed/model2_training_dataset.csv"
+PAIR_TABLE_PATH = "data/processed/model2_pair_table.npy"
+PAIR_INDEX_PATH = "data/processed/model2_pair_table.json"
+
+# Also read by fixture_features: latest Elo, head-to-head record, current form
+FEATURE_STATE_PATHS = {
+    "elo_md5": MODEL2_RATINGS_PATH,
+    "h2h_md5": MODEL2_H2H_PATH,
+    "form_md5": MODEL2_FORM_PATH,
+}
+
+
+def file_md5(path, chunk_size=1 << 20):
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def current_fingerprint(model_path=MODEL_PATH, dataset_path=TRAINING_DATASET_PATH):
+    return {
+        "model_md5": file_md5(model_path),
+        "features_md5": file_md5(dataset_path),
+        # None while a state file does not exist (fixture_features then skips it)
+        **{key: file_md5(path) if os.path.exists(path) else None
+           for key, path in FEATURE_STATE_PATHS.items()},
+    }
+
+
+# ----------------------------------------------------------
+# LOOKUP TABLE
+# ----------------------------------------------------------
+
+class PairTable:
+    """Memory-mapped (home, away, outcome) probability table for model 2.
+
+    The outcome axis follows the model classes: 0 = away win, 1 = draw,
+    2 = home win. Pairs without home-side or away-side history hold NaN.
+    """
+
+    def __init__(self, proba, teams, fingerprint):
+        self.proba = proba
+        self.teams = teams
+        self.team_index = {t: i for i, t in enumerate(teams)}
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def open(cls, table_path=PAIR_TABLE_PATH, index_path=PAIR_INDEX_PATH):
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        proba = np.load(table_path, mmap_mode="r")
+        return cls(proba, index["teams"], index["fingerprint"])
+
+    def is_fresh(self, model_path=MODEL_PATH, dataset_path=TRAINING_DATASET_PATH):
+        return self.fingerprint == current_fingerprint(model_path, dataset_path)
+
+    def lookup(self, home, away):
+        if home not in self.team_index:
+            raise ValueError(f"No history found for HOME team: {home}")
+        if away not in self.team_index:
+            raise ValueError(f"No history found for AWAY team: {away}")
+
+        proba = np.array(self.proba[self.team_index[home], self.team_index[away]])
+        if np.isnan(proba).any():
+            raise ValueError(f"No home/away history for fixture: {home} vs {away}")
+        return proba
+
+    def lookup_many(self, homes, aways):
+        h = np.fromiter((self.team_index.get(t, -1) for t in homes), dtype=np.int64)
+        a = np.fromiter((self.team_index.get(t, -1) for t in aways), dtype=np.int64)
+        known = (h >= 0) & (a >= 0)
+
+        out = np.full((len(h), self.proba.shape[2]), np.nan, dtype=np.float32)
+        out[known] = self.proba[h[known], a[known]]
+        return out
+
+
+def open_pair_table(table_path=PAIR_TABLE_PATH, index_path=PAIR_INDEX_PATH):
+    """Open the table if it exists and matches the current model and features."""
+    if not (os.path.exists(table_path) and os.path.exists(index_path)):
+        return None
+
+    table = PairTable.open(table_path, index_path)
+    if not table.is_fresh():
+        log("Pair table is stale, ignoring it.")
+        return None
+    return table
+
+
+# ----------------------------------------------------------
+# BUILD
+# ----------------------------------------------------------
+
+def build_pair_table(model, df_train):
+    home_side, away_side = latest_side_rows(df_train)
+    teams = sorted(set(home_side.index) | set(away_side.index))
+    n = len(teams)
+
+    home_rows = home_side.reindex(teams)
+    away_rows = away_side.reindex(teams)
+
+    # Every ordered pair: home i (row-major) against away j
+    home_idx = np.repeat(np.arange(n), n)
+    away_idx = np.tile(np.arange(n), n)
+    valid = (
+        pd.Index(teams).isin(home_side.index)[home_idx]
+        & pd.Index(teams).isin(away_side.index)[away_idx]
+    )
+
+    team_names = np.asarray(teams, dtype=object)
+    X = fixture_features(
+        home_rows.iloc[home_idx[valid]], away_rows.iloc[away_idx[valid]],
+        team_names[home_idx[valid]], team_names[away_idx[valid]],
+    )
+
+    proba = np.full((n * n, 3), np.nan, dtype=np.float32)
+    if valid.any():
+        proba[valid] = model.predict_proba(X)
+
+    return proba.reshape(n, n, 3), teams
+
+
+def save_pair_table(proba, teams, fingerprint,
+                    table_path=PAIR_TABLE_PATH, index_path=PAIR_INDEX_PATH):
+    os.makedirs(os.path.dirname(table_path), exist_ok=True)
+
+    # Write next to the target then rename, so readers never map a partial file
+    tmp_path = table_path + ".tmp"
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=proba.shape)
+    out[:] = proba
+    out.flush()
+    del out
+    os.replace(tmp_path, table_path)
+
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"teams": teams, "fingerprint": fingerprint}, f, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+
+
+@instrumented("build_pair_table_model2")
+def main(model=None, df_train=None):
+    fingerprint = current_fingerprint()
+
+    if os.path.exists(PAIR_TABLE_PATH) and os.path.exists(PAIR_INDEX_PATH):
+        if PairTable.open().fingerprint == fingerprint:
+            log("Pair table up to date, nothing to rebuild.")
+            return
+
+    if model is None:
+        from tree_predictor import load_predictor
+
+        log("Loading model...")
+        model = load_predictor(MODEL_PATH)
+    if df_train is None:
+        log("Loading training dataset...")
+        df_train = pd.read_csv(TRAINING_DATASET_PATH)
+
+    log("Scoring every ordered team pair...")
+    with span("build_pair_table", rows_in=len(df_train)) as s:
+        proba, teams = build_pair_table(model, df_train)
+        s.rows(rows_out=len(teams) ** 2)
+    log(f"Scored {len(teams)}x{len(teams)} pairs ({int((~np.isnan(proba[..., 0])).sum())} with history)")
+
+    save_pair_table(proba, teams, fingerprint)
+    log(f"Saved → {PAIR_TABLE_PATH}")
+    log(f"Saved → {PAIR_INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import log
+
+# ----------------------------------------------------------
+# FBREF PLAYER-SEASON SCHEMA
+# ----------------------------------------------------------
+# soccerdata returns two-level columns; once written with to_csv and read
+# back, level 0 becomes the header ("Performance", "Performance.1", ...)
+# and level 1 ("Gls", "Ast", ...) is left as the first data row.
+
+IDENTIFIER_COLUMNS = {
+    "league": "string",
+    "season": "string",
+    "team": "string",
+    "player": "string",
+    "nation": "string",
+    "pos": "string",
+    "age": "string",
+    "born": "string",
+}
+
+STAT_GROUPS = {
+    "Playing Time": ["MP", "Starts", "Min", "90s"],
+    "Performance": ["Gls", "Ast", "G+A", "G-PK", "PK", "PKatt", "CrdY", "CrdR"],
+    "Expected": ["xG", "npxG", "xAG", "npxG+xAG"],
+    "Progression": ["PrgC", "PrgP", "PrgR"],
+    "Per 90 Minutes": ["Gls", "Ast", "G+A", "G-PK", "G+A-PK", "xG", "xAG", "xG+xAG", "npxG", "npxG+xAG"],
+}
+
+
+def _flattened(group, i):
+    return group if i == 0 else f"{group}.{i}"
+
+
+# CSV column name -> readable stat name, e.g. "Performance.1" -> "Performance/Ast"
+STAT_COLUMNS = {
+    _flattened(group, i): f"{group}/{stat}"
+    for group, stats in STAT_GROUPS.items()
+    for i, stat in enumerate(stats)
+}
+
+STAT_DTYPE = np.float32
+
+
+# ----------------------------------------------------------
+# TYPED LOADING
+# ----------------------------------------------------------
+
+def _has_subheader(path):
+    """True when the second line is the level-1 header left by to_csv."""
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()
+        second = f.readline()
+    return second.startswith(",")
+
+
+def load_player_season_stats(path):
+    """Read only the declared columns, with their declared dtypes."""
+    header = pd.read_csv(path, nrows=0).columns
+    ids = [c for c in IDENTIFIER_COLUMNS if c in header]
+    stats = [c for c in STAT_COLUMNS if c in header]
+
+    if not stats:
+        raise ValueError(f"No declared stat column found in {path}")
+    missing = [c for c in STAT_COLUMNS if c not in header]
+    if missing:
+        log(f"⚠️ {len(missing)} declared stat columns absent from {path}: {missing}")
+
+    dtypes = {c: IDENTIFIER_COLUMNS[c] for c in ids}
+    dtypes.update({c: STAT_DTYPE for c in stats})
+
+    return pd.read_csv(
+        path,
+        usecols=ids + stats,
+        dtype=dtypes,
+        skiprows=[1] if _has_subheader(path) else None,
+    )
+
+
+def stat_columns(df):
+    return [c for c in STAT_COLUMNS if c in df.columns]
+
+
+def raw_stat_matrix(df):
+    """Stat columns as one row-major float32 matrix, NaN → 0."""
+    X = np.ascontiguousarray(df[stat_columns(df)].to_numpy(dtype=STAT_DTYPE, copy=True))
+    np.nan_to_num(X, copy=False, nan=0.0)
+    return X
+
+
+def normalized_stat_matrix(df):
+    """raw_stat_matrix min-max scaled in place.
+
+    Same result as MinMaxScaler on those columns: constant columns map to 0.
+    """
+    X = raw_stat_matrix(df)
+
+    mins = X.min(axis=0)
+    ranges = X.max(axis=0) - mins
+    ranges[ranges == 0] = 1
+
+    X -= mins
+    X /= ranges
+    return X
+
+
+# ----------------------------------------------------------
+# BENCHMARK
+# ----------------------------------------------------------
+
+def benchmark(path, repeats=3):
+    """Legacy inference-by-exception scoring vs the schema-driven one."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    def legacy():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", pd.errors.DtypeWarning)
+            df = pd.read_csv(path).fillna(0)
+        numeric_cols = []
+        for col in df.columns:
+            try:
+                pd.to_numeric(df[col], errors="raise")
+                numeric_cols.append(col)
+            except (ValueError, TypeError):
+                pass
+        df[numeric_cols] = MinMaxScaler().fit_transform(df[numeric_cols])
+        return df[numeric_cols].sum(axis=1)
+
+    def schema():
+        df = load_player_season_stats(path)
+        return normalized_stat_matrix(df).sum(axis=1)
+
+    results = {}
+    for name, fn in [("legacy", legacy), ("schema", schema)]:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        results[name] = min(timings)
+        log(f"{name:>6}: {results[name] * 1000:.1f} ms (best of {repeats})")
+
+    log(f"Speed-up: {results['legacy'] / results['schema']:.1f}x")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark("data/raw/player_season_stats_model2.csv")
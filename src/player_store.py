@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+PLAYER_STORE_PATH = "data/processed/player_strengths_store"
+FORMAT_VERSION = 1
+
+# scores[i] belongs to player i; players of team t are rows team_rows[t]:team_rows[t + 1]
+ARRAYS = ["scores", "player_blob", "player_offsets", "team_blob", "team_offsets", "team_rows"]
+
+
+# ----------------------------------------------------------
+# STRING TABLES
+# ----------------------------------------------------------
+
+def encode_strings(values):
+    """UTF-8 blob + (n + 1) offsets; string i is blob[offsets[i]:offsets[i + 1]]."""
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def decode_strings(blob, offsets, start=0, stop=None):
+    stop = len(offsets) - 1 if stop is None else stop
+    raw = bytes(blob[offsets[start]:offsets[stop]])
+    base = offsets[start]
+    return [
+        raw[offsets[i] - base:offsets[i + 1] - base].decode("utf-8")
+        for i in range(start, stop)
+    ]
+
+
+# ----------------------------------------------------------
+# WRITE
+# ----------------------------------------------------------
+
+def build_arrays(df_scores):
+    """(team, player, player_score) rows as arrays grouped by team."""
+    df = df_scores[["team", "player", "player_score"]].dropna(subset=["team"])
+    df = df.assign(team=df["team"].astype(str), player=df["player"].astype(str))
+    # Stable sort keeps the original player order inside each team
+    df = df.sort_values("team", kind="mergesort")
+
+    teams, counts = np.unique(df["team"].to_numpy(), return_counts=True)
+    team_rows = np.zeros(len(teams) + 1, dtype=np.int64)
+    team_rows[1:] = np.cumsum(counts)
+
+    player_blob, player_offsets = encode_strings(df["player"])
+    team_blob, team_offsets = encode_strings(teams)
+
+    return {
+        "scores": df["player_score"].to_numpy(dtype=np.float32),
+        "player_blob": player_blob,
+        "player_offsets": player_offsets,
+        "team_blob": team_blob,
+        "team_offsets": team_offsets,
+        "team_rows": team_rows,
+    }
+
+
+def write_player_store(df_scores, path=PLAYER_STORE_PATH):
+    """Publish player scores as mmap-able .npy arrays plus a small meta.json."""
+    arrays = build_arrays(df_scores)
+
+    # Build next to the target and swap directories, so readers never see a mix
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), arr)
+    with open(os.path.join(tmp_path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": FORMAT_VERSION,
+            "n_players": len(arrays["scores"]),
+            "n_teams": len(arrays["team_rows"]) - 1,
+        }, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ----------------------------------------------------------
+# READ
+# ----------------------------------------------------------
+
+class PlayerStrengthStore:
+    """Read-only view over the binary store; only the touched pages are read."""
+
+    def __init__(self, arrays):
+        self.scores = arrays["scores"]
+        self.player_blob = arrays["player_blob"]
+        self.player_offsets = arrays["player_offsets"]
+        self.team_rows = arrays["team_rows"]
+
+        self.teams = decode_strings(arrays["team_blob"], arrays["team_offsets"])
+        self.team_index = {t: i for i, t in enumerate(self.teams)}
+
+    @classmethod
+    def open(cls, path=PLAYER_STORE_PATH):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported player store version: {meta['version']}")
+
+        return cls({
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ARRAYS
+        })
+
+    @classmethod
+    def from_frame(cls, df_scores):
+        """In-memory store built from player_strengths.csv rows (fallback path)."""
+        return cls(build_arrays(df_scores))
+
+    def _rows(self, team):
+        t = self.team_index[team]
+        return int(self.team_rows[t]), int(self.team_rows[t + 1])
+
+    def team_players(self, team):
+        """Player names (one per row, in source order) and their scores for a team."""
+        start, stop = self._rows(team)
+        names = decode_strings(self.player_blob, self.player_offsets, start, stop)
+        return names, np.asarray(self.scores[start:stop])
+
+    def lineup_strength(self, team, selected):
+        names, scores = self.team_players(team)
+        chosen = set(selected)
+        mask = np.fromiter((n in chosen for n in names), dtype=bool, count=len(names))
+        return float(scores[mask].mean()) if mask.any() else float("nan")
+
+
+def open_player_store(path=PLAYER_STORE_PATH):
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return PlayerStrengthStore.open(path)
@@ -1,10 +1,166 @@
+import argparse
+import numpy as np
 import pandas as pd
-import xgboost as xgb
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import mlflow
 import os
 
-def main():
+from instrumentation import instrumented, span
+from tracking import start_run
+from scorelines import scoreline_grid, scoreline_summary
+from train import FEATURES
+
+KEYS = ["date", "league", "season", "home_team", "away_team"]
+TARGETS = ["home_goals", "away_goals"]
+
+
+class StreamingRegressionMetrics:
+    """MSE / MAE / R² accumulées chunk par chunk (sommes suffisantes)."""
+
+    def __init__(self):
+        self.n = 0
+        self.sum_abs = 0.0
+        self.sum_sq = 0.0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+
+    def update(self, y_true, y_pred):
+        y_true = np.asarray(y_true, dtype=np.float64)
+        err = y_true - np.asarray(y_pred, dtype=np.float64)
+        self.n += len(y_true)
+        self.sum_abs += np.abs(err).sum()
+        self.sum_sq += (err ** 2).sum()
+        self.sum_y += y_true.sum()
+        self.sum_y2 += (y_true ** 2).sum()
+
+    # NaN tant qu'aucune ligne n'a été vue (ou si y est constant pour le R²)
+    def mse(self):
+        return self.sum_sq / self.n if self.n else float("nan")
+
+    def mae(self):
+        return self.sum_abs / self.n if self.n else float("nan")
+
+    def r2(self):
+        if not self.n:
+            return float("nan")
+        ss_tot = self.sum_y2 - self.sum_y ** 2 / self.n
+        return 1 - self.sum_sq / ss_tot if ss_tot > 0 else float("nan")
+
+
+def predict_result_vectorized(pred_home, pred_away):
+    return np.select(
+        [pred_home > pred_away, pred_home < pred_away],
+        ["Home Win", "Away Win"],
+        default="Draw",
+    )
+
+
+def add_scorelines(df, rho=0.0):
+    """Grilles 0..10 × 0..10 (Poisson, Dixon–Coles si rho ≠ 0) à partir des buts prédits."""
+    grid = scoreline_grid(df["pred_home_goals"].to_numpy(), df["pred_away_goals"].to_numpy(), rho=rho)
+    summary = scoreline_summary(grid)
+    summary.index = df.index
+    return pd.concat([df, summary], axis=1)
+
+
+def load_models(model_path):
+    import xgboost as xgb
+
+    home_model = xgb.XGBRegressor()
+    away_model = xgb.XGBRegressor()
+    home_model.load_model(os.path.join(model_path, "home_model.json"))
+    away_model.load_model(os.path.join(model_path, "away_model.json"))
+    return home_model, away_model
+
+
+def iter_chunks(source, chunksize):
+    """Blocs de lignes d'un CSV ou d'un DataFrame déjà en mémoire."""
+    if isinstance(source, pd.DataFrame):
+        source = source[KEYS + TARGETS + FEATURES]
+        # Au moins un bloc, même vide, pour que la sortie ait son en-tête
+        for start in range(0, max(len(source), 1), chunksize):
+            yield source.iloc[start:start + chunksize]
+    else:
+        yield from pd.read_csv(source, usecols=KEYS + TARGETS + FEATURES, chunksize=chunksize,
+                               dtype=dict.fromkeys(TARGETS + FEATURES, "float64"))
+
+
+def predict_streaming(input_file, output_file, home_model, away_model, chunksize,
+                      scorelines=False, rho=0.0):
+    """Prédit par blocs de `chunksize` lignes et n'écrit que clés + prédictions.
+
+    `input_file` peut aussi être le DataFrame produit en mémoire par preprocess.
+    """
+    metrics_home = StreamingRegressionMetrics()
+    metrics_away = StreamingRegressionMetrics()
+    n_rows = 0
+
+    tmp_file = output_file + ".tmp"
+    with span("predict_chunks") as s:
+        s.set(chunksize=chunksize)
+        for i, chunk in enumerate(iter_chunks(input_file, chunksize)):
+            X = chunk[FEATURES]
+            out = chunk[KEYS + TARGETS].copy()
+            out["pred_home_goals"] = home_model.predict(X)
+            out["pred_away_goals"] = away_model.predict(X)
+            out["predicted_result"] = predict_result_vectorized(
+                out["pred_home_goals"].to_numpy(), out["pred_away_goals"].to_numpy()
+            )
+            if scorelines:
+                out = add_scorelines(out, rho)
+
+            metrics_home.update(out["home_goals"], out["pred_home_goals"])
+            metrics_away.update(out["away_goals"], out["pred_away_goals"])
+
+            out.to_csv(tmp_file, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+            n_rows += len(out)
+        s.rows(rows_out=n_rows)
+
+    os.replace(tmp_file, output_file)
+    print(f"✅ {n_rows} matchs prédits en flux (chunks de {chunksize})")
+
+    return {
+        "mse_home": metrics_home.mse(),
+        "mae_home": metrics_home.mae(),
+        "r2_home": metrics_home.r2(),
+        "mse_away": metrics_away.mse(),
+        "mae_away": metrics_away.mae(),
+        "r2_away": metrics_away.r2(),
+    }
+
+
+def log_to_mlflow(metrics, output_file):
+    with start_run("xgboost_predictions") as run:
+        run.log_metrics(metrics)
+        run.log_artifact(output_file)
+
+
+@instrumented("predict")
+def main_streaming(chunksize, scorelines=False, rho=0.0, data=None, models=None):
+    print("🔮 Début des prédictions (mode streaming)...")
+
+    processed_path = "data/processed"
+    model_path = "app/models"
+    pred_path = "data/predictions"
+    os.makedirs(pred_path, exist_ok=True)
+
+    home_model, away_model = models if models is not None else load_models(model_path)
+
+    input_file = data if data is not None else os.path.join(processed_path, "clean_matches.csv")
+    output_file = os.path.join(pred_path, "predicted_matches.csv")
+    metrics = predict_streaming(input_file, output_file, home_model, away_model, chunksize,
+                                scorelines, rho)
+
+    print(f"📊 MSE Home: {metrics['mse_home']:.3f}, MAE Home: {metrics['mae_home']:.3f}, R² Home: {metrics['r2_home']:.3f}")
+    print(f"📊 MSE Away: {metrics['mse_away']:.3f}, MAE Away: {metrics['mae_away']:.3f}, R² Away: {metrics['r2_away']:.3f}")
+    print(f"✅ Prédictions enregistrées dans {output_file}")
+
+    log_to_mlflow(metrics, output_file)
+
+    print("🎯 Prédiction terminée avec succès !")
+    return metrics
+
+
+@instrumented("predict")
+def main(scorelines=False, rho=0.0):
     print("🔮 Début des prédictions...")
 
     processed_path = "data/processed"
@@ -15,23 +171,17 @@ def main():
     # 1️⃣ Charger les données et les modèles
     data = pd.read_csv(os.path.join(processed_path, "clean_matches.csv"))
 
-    home_model = xgb.XGBRegressor()
-    away_model = xgb.XGBRegressor()
-    home_model.load_model(os.path.join(model_path, "home_model.json"))
-    away_model.load_model(os.path.join(model_path, "away_model.json"))
+    home_model, away_model = load_models(model_path)
 
     print(f"✅ Données chargées : {len(data)} matchs")
 
     # 2️⃣ Préparer les features (identiques à celles de train.py)
-    features = [
-        "home_matches_played", "home_goals_for", "home_goals_against", "home_goals_diff",
-        "away_matches_played", "away_goals_for", "away_goals_against", "away_goals_diff"
-    ]
-    X = data[features]
+    X = data[FEATURES]
 
     # 3️⃣ Faire les prédictions
-    data["pred_home_goals"] = home_model.predict(X)
-    data["pred_away_goals"] = away_model.predict(X)
+    with span("predict", rows_in=len(X)):
+        data["pred_home_goals"] = home_model.predict(X)
+        data["pred_away_goals"] = away_model.predict(X)
 
     # 4️⃣ Déterminer le résultat prédit
     def predict_result(row):
@@ -44,7 +194,13 @@ def main():
 
     data["predicted_result"] = data.apply(predict_result, axis=1)
 
+    # Probabilités de score exact / 1N2 / over-under à partir des buts prédits
+    if scorelines:
+        data = add_scorelines(data, rho)
+
     # 5️⃣ Calculer les métriques globales
+    from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
     mse_home = mean_squared_error(data["home_goals"], data["pred_home_goals"])
     mae_home = mean_absolute_error(data["home_goals"], data["pred_home_goals"])
     r2_home = r2_score(data["home_goals"], data["pred_home_goals"])
@@ -62,17 +218,29 @@ def main():
     print(f"✅ Prédictions enregistrées dans {output_file}")
 
     # 7️⃣ Enregistrer dans MLflow
-    mlflow.set_experiment("football_prediction_mlops")
-    with mlflow.start_run(run_name="xgboost_predictions"):
-        mlflow.log_metric("mse_home", mse_home)
-        mlflow.log_metric("mae_home", mae_home)
-        mlflow.log_metric("r2_home", r2_home)
-        mlflow.log_metric("mse_away", mse_away)
-        mlflow.log_metric("mae_away", mae_away)
-        mlflow.log_metric("r2_away", r2_away)
-        mlflow.log_artifact(output_file)
+    log_to_mlflow({
+        "mse_home": mse_home,
+        "mae_home": mae_home,
+        "r2_home": r2_home,
+        "mse_away": mse_away,
+        "mae_away": mae_away,
+        "r2_away": r2_away,
+    }, output_file)
 
     print("🎯 Prédiction terminée avec succès !")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Prédictions des buts domicile / extérieur")
+    parser.add_argument("--stream", action="store_true",
+                        help="prédire par blocs et n'écrire que clés + prédictions")
+    parser.add_argument("--chunksize", type=int, default=50_000)
+    parser.add_argument("--scorelines", action="store_true",
+                        help="ajouter les probabilités de score (Poisson) à chaque match")
+    parser.add_argument("--rho", type=float, default=0.0,
+                        help="correction Dixon–Coles des petits scores (0 = Poisson indépendant)")
+    args = parser.parse_args()
+
+    if args.stream:
+        main_streaming(args.chunksize, args.scorelines, args.rho)
+    else:
+        main(args.scorelines, args.rho)
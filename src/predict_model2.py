@@ -1,21 +1,21 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime
-from xgboost import XGBClassifier
-from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, mean_absolute_error, r2_score
 import os
 
+from features_model2 import MODEL2_FEATURES, fixture_features
+from instrumentation import instrumented, log, span
+from online_drift import open_online_monitor
+from pair_table import open_pair_table
+from prediction_cache import MODEL2_ARTIFACTS, PredictionCache
+from tracking import start_run
+
 import warnings
 warnings.filterwarnings("ignore")
 
+# Shared by every caller in the process (CLI, batch jobs, services)
+PREDICTION_CACHE = PredictionCache(MODEL2_ARTIFACTS)
 
-# ----------------------------------------------------------
-# UTILS
-# ----------------------------------------------------------
-
-def log(msg):
-    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
+TRAINING_DATASET_PATH = "data/processed/model2_training_dataset.csv"
 
 
 # ----------------------------------------------------------
@@ -23,12 +23,15 @@ def log(msg):
 # ----------------------------------------------------------
 
 def load_artifacts():
+    from model_registry import serve_classifier
+
     log("Loading model & datasets...")
 
-    model = XGBClassifier()
-    model.load_model("models/model2_xgb.json")
+    # Process-wide registry: reloaded in the background when the file changes,
+    # dropping the predictions of the previous model
+    model = serve_classifier("models/model2_xgb.json", on_swap=PREDICTION_CACHE.clear)
 
-    df_train = pd.read_csv("data/processed/model2_training_dataset.csv")
+    df_train = pd.read_csv(TRAINING_DATASET_PATH)
 
     return model, df_train
 
@@ -48,35 +51,45 @@ def build_input_features(df_train, home, away):
         raise ValueError(f"No history found for AWAY team: {away}")
 
     # Build the row
-    row = pd.DataFrame({
-        "home_strength": home_row["home_strength"].values[0],
-        "away_strength": away_row["away_strength"].values[0],
-        "strength_diff": home_row["home_strength"].values[0] - away_row["away_strength"].values[0],
+    return fixture_features(home_row, away_row, [home], [away])
 
-        "home_goals_for": home_row["home_goals_for"].values[0],
-        "away_goals_for": away_row["away_goals_for"].values[0],
 
-        "home_goals_against": home_row["home_goals_against"].values[0],
-        "away_goals_against": away_row["away_goals_against"].values[0],
+# ----------------------------------------------------------
+# PREDICT
+# ----------------------------------------------------------
 
-        "goals_for_diff": home_row["home_goals_for"].values[0] - away_row["away_goals_for"].values[0],
-        "goals_against_diff": home_row["home_goals_against"].values[0] - away_row["away_goals_against"].values[0],
+def predict(model, features, home, away):
+    proba = model.predict_proba(features)[0]
+    return label_outcome(proba, home, away)
 
-        "matches_played_diff": home_row["home_matches_played"].values[0] - away_row["away_matches_played"].values[0],
 
-        "home_xg": home_row["home_xg"].values[0],
-        "away_xg": away_row["away_xg"].values[0],
-    }, index=[0])
+def predict_from_table(table, home, away):
+    proba = table.lookup(home, away)
+    return label_outcome(proba, home, away)
 
-    return row
 
+def predict_fixture(model, df_train, home, away, table=None, cache=PREDICTION_CACHE, monitor=None):
+    # Features are only built when the model has to run or a drift monitor
+    # wants the inputs; a pair-table answer needs neither
+    features = None
 
-# ----------------------------------------------------------
-# PREDICT
-# ----------------------------------------------------------
+    def compute():
+        nonlocal features
+        if table is not None:
+            return predict_from_table(table, home, away)
+        features = build_input_features(df_train, home, away)
+        return predict(model, features, home, away)
 
-def predict(model, features, home, away):
-    proba = model.predict_proba(features)[0]
+    result = compute() if cache is None else cache.get_or_compute(home, away, compute)
+
+    if monitor is not None:
+        if features is None:
+            features = build_input_features(df_train, home, away)
+        monitor.observe(features[MODEL2_FEATURES].iloc[0].to_numpy(dtype=np.float32), result[2])
+    return result
+
+
+def label_outcome(proba, home, away):
     pred = np.argmax(proba)
 
     mapping = {
@@ -92,16 +105,26 @@ def predict(model, features, home, away):
 # MAIN
 # ----------------------------------------------------------
 
+@instrumented("predict_model2")
 def main():
-    model, df_train = load_artifacts()
-
+    # Prompt first: the model and the training set load after the input
     print("\n=== FOOTBALL MATCH PREDICTION ===\n")
     home = input("Home team: ").strip()
     away = input("Away team: ").strip()
 
-    features = build_input_features(df_train, home, away)
+    model, df_train = load_artifacts()
+
+    # Precomputed all-pairs table when it matches the current model
+    table = open_pair_table()
 
-    outcome, proba, pred_class = predict(model, features, home, away)
+    # Online drift window, kept across runs until the training set changes
+    monitor = open_online_monitor(
+        df_train, MODEL2_FEATURES, df_train["result_xgb"], reference_path=TRAINING_DATASET_PATH
+    )
+    outcome, proba, pred_class = predict_fixture(
+        model, df_train, home, away, table=table, monitor=monitor
+    )
+    monitor.save()
 
     print("\n================= RESULT =================")
     print(f"Prediction: {outcome}")
@@ -117,27 +140,30 @@ def main():
 
     # Load true labels & preds to compute metrics
     y_true = df_train["result_xgb"]       # True labels 0/1/2
-    features_all = df_train[features.columns]  # X for all dataset
+    features_all = df_train[MODEL2_FEATURES]  # X for all dataset
+
+    from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, mean_absolute_error, r2_score
 
-    y_pred_all = model.predict(features_all)
+    with span("evaluate", rows_in=len(df_train)):
+        y_pred_all = model.predict(features_all)
 
-    acc = accuracy_score(y_true, y_pred_all)
-    f1 = f1_score(y_true, y_pred_all, average="macro")
+        acc = accuracy_score(y_true, y_pred_all)
+        f1 = f1_score(y_true, y_pred_all, average="macro")
 
-    # For classification, we adapt regression metrics using mean of probabilities
-    mse_home = mean_squared_error([1 if y==2 else 0 for y in y_true],
-                                  [p[2] for p in model.predict_proba(features_all)])
-    mae_home = mean_absolute_error([1 if y==2 else 0 for y in y_true],
-                                   [p[2] for p in model.predict_proba(features_all)])
-    r2_home = r2_score([1 if y==2 else 0 for y in y_true],
-                       [p[2] for p in model.predict_proba(features_all)])
+        # For classification, we adapt regression metrics using mean of probabilities
+        mse_home = mean_squared_error([1 if y==2 else 0 for y in y_true],
+                                      [p[2] for p in model.predict_proba(features_all)])
+        mae_home = mean_absolute_error([1 if y==2 else 0 for y in y_true],
+                                       [p[2] for p in model.predict_proba(features_all)])
+        r2_home = r2_score([1 if y==2 else 0 for y in y_true],
+                           [p[2] for p in model.predict_proba(features_all)])
 
-    mse_away = mean_squared_error([1 if y==0 else 0 for y in y_true],
-                                  [p[0] for p in model.predict_proba(features_all)])
-    mae_away = mean_absolute_error([1 if y==0 else 0 for y in y_true],
-                                   [p[0] for p in model.predict_proba(features_all)])
-    r2_away = r2_score([1 if y==0 else 0 for y in y_true],
-                       [p[0] for p in model.predict_proba(features_all)])
+        mse_away = mean_squared_error([1 if y==0 else 0 for y in y_true],
+                                      [p[0] for p in model.predict_proba(features_all)])
+        mae_away = mean_absolute_error([1 if y==0 else 0 for y in y_true],
+                                       [p[0] for p in model.predict_proba(features_all)])
+        r2_away = r2_score([1 if y==0 else 0 for y in y_true],
+                           [p[0] for p in model.predict_proba(features_all)])
 
     print("\n📊 === MODEL 2 METRICS ===")
     print(f"Accuracy : {acc:.4f}")
@@ -167,6 +193,18 @@ def main():
 
     print(f"📝 Saved to {path}")
 
+    status = monitor.status()
+    with start_run("model2_predictions") as run:
+        run.log_params({"home_team": home, "away_team": away, "prediction": outcome})
+        run.log_metrics({
+            "accuracy": acc, "f1_macro": f1,
+            "mse_home": mse_home, "mae_home": mae_home, "r2_home": r2_home,
+            "mse_away": mse_away, "mae_away": mae_away, "r2_away": r2_away,
+            "online_class_psi": status["class_psi"],
+            "online_drift_alerts": status["alerts"],
+        })
+        run.log_artifact(path)
+
 
 if __name__ == "__main__":
     main()
@@ -1,25 +1,30 @@
 import pandas as pd
 import numpy as np
-import xgboost as xgb
-from datetime import datetime
 import os
-from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, mean_absolute_error, r2_score
+
+from features_model2 import MODEL2_FEATURES
+from form import MODEL2_FORM_FEATURES, load_form_table
+from head_to_head import H2H_FEATURES, load_h2h_index
+from player_store import PlayerStrengthStore, open_player_store
+from instrumentation import instrumented, log, span
+from prediction_cache import PLAYER_MODE_ARTIFACTS, PredictionCache, lineup_fingerprint
+from ratings import ELO_PARAMS, MODEL2_RATINGS_PATH, current_ratings
+from tracking import start_run
 
 MODEL_PATH = "models/model2_xgb.json"
 PLAYER_STRENGTH_PATH = "data/processed/player_strengths.csv"
 TEAM_STATS_PATH = "data/raw/team_stats_multi_leagues.csv"
 MATCH_STATS_PATH = "data/raw/team_match_stats_model2.csv"
 
-def log(msg):
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
-
+# Shared by every caller in the process (CLI, batch jobs, services)
+PREDICTION_CACHE = PredictionCache(PLAYER_MODE_ARTIFACTS)
 
 # --------------------------------------------------------------
 # TEAM SELECTION
 # --------------------------------------------------------------
 
-def select_team(players_df, label):
-    teams = sorted(players_df["team"].dropna().unique())
+def select_team(players, label):
+    teams = players.teams
     print("\n=== AVAILABLE TEAMS ===")
     for t in teams:
         print(" -", t)
@@ -36,11 +41,11 @@ def select_team(players_df, label):
 # PLAYER SELECTION (11 players)
 # --------------------------------------------------------------
 
-def select_players(players_df, team):
-    team_players = players_df[players_df["team"] == team]
+def select_players(players, team):
+    team_players, _ = players.team_players(team)
 
     print(f"\n=== PLAYERS OF {team} ===")
-    for p in team_players["player"].unique():
+    for p in dict.fromkeys(team_players):
         print(" -", p)
 
     selected = []
@@ -48,50 +53,98 @@ def select_players(players_df, team):
 
     while len(selected) < 11:
         p = input(f"Player {len(selected)+1}/11: ").strip()
-        if p in team_players["player"].values and p not in selected:
+        if p in team_players and p not in selected:
             selected.append(p)
         else:
             print("❌ Invalid or duplicate player.")
 
-    strength = team_players[team_players["player"].isin(selected)]["player_score"].mean()
-    return strength
+    return selected
+
+
+def lineup_strength(players, team, selected):
+    return players.lineup_strength(team, selected)
+
+
+def load_players():
+    """Binary player store when published, player_strengths.csv otherwise."""
+    players = open_player_store()
+    if players is None:
+        players = PlayerStrengthStore.from_frame(pd.read_csv(PLAYER_STRENGTH_PATH))
+    return players
 
 
 # --------------------------------------------------------------
-# BUILD THE 12 FEATURES FOR THE MODEL
+# BUILD THE MODEL FEATURES
 # --------------------------------------------------------------
 
-def build_features(home_team, away_team):
-    team_stats = pd.read_csv(TEAM_STATS_PATH)
-    match_stats = pd.read_csv(MATCH_STATS_PATH)
+class TeamStatsIndex:
+    """Team stats and mean xG per team, loaded once and keyed by team name."""
+
+    STAT_COLS = [
+        "goals_for_home", "goals_for_away",
+        "goals_against_home", "goals_against_away",
+        "matches_played", "goals_for",
+    ]
+
+    def __init__(self, team_stats, match_stats):
+        # First row per team, as the former team_stats[...].iloc[0] lookup
+        first = team_stats.drop_duplicates("team", keep="first")
+        self.stats = dict(zip(
+            first["team"],
+            first[self.STAT_COLS].itertuples(index=False, name=None),
+        ))
+        self.xg = match_stats.groupby("opponent")["xG"].mean().to_dict()
+
+    @classmethod
+    def load(cls, team_stats_path=TEAM_STATS_PATH, match_stats_path=MATCH_STATS_PATH):
+        return cls(pd.read_csv(team_stats_path), pd.read_csv(match_stats_path))
+
+    def team_stats(self, team):
+        return self.stats.get(team, (0, 0, 0, 0, 0, 0))
 
-    def get_team_stats(team):
-        row = team_stats[team_stats["team"] == team]
+    def team_xg(self, team):
+        return self.xg.get(team, 0)
 
-        if row.empty:
-            return 0, 0, 0, 0, 0, 0
 
-        rf = row.iloc[0]
-        return (
-            rf["goals_for_home"],
-            rf["goals_for_away"],
-            rf["goals_against_home"],
-            rf["goals_against_away"],
-            rf["matches_played"],
-            rf["goals_for"],
-        )
+_STATS_INDEX = None
+_STATS_STAMP = None
 
-    h_gf_home, h_gf_away, h_ga_home, h_ga_away, h_mp, h_gf_total = get_team_stats(home_team)
-    a_gf_home, a_gf_away, a_ga_home, a_ga_away, a_mp, a_gf_total = get_team_stats(away_team)
 
-    def get_team_xg(team):
-        df = match_stats[match_stats["opponent"] == team]
-        if df.empty:
-            return 0
-        return df["xG"].mean()
+def get_stats_index():
+    """Process-wide TeamStatsIndex, reloaded only when one of the CSVs changes."""
+    global _STATS_INDEX, _STATS_STAMP
 
-    home_xg = get_team_xg(home_team)
-    away_xg = get_team_xg(away_team)
+    stamp = tuple(
+        (os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in (TEAM_STATS_PATH, MATCH_STATS_PATH)
+    )
+    if _STATS_INDEX is None or stamp != _STATS_STAMP:
+        _STATS_INDEX = TeamStatsIndex.load()
+        _STATS_STAMP = stamp
+    return _STATS_INDEX
+
+
+def build_features(home_team, away_team, stats=None):
+    stats = stats if stats is not None else get_stats_index()
+
+    h_gf_home, h_gf_away, h_ga_home, h_ga_away, h_mp, h_gf_total = stats.team_stats(home_team)
+    a_gf_home, a_gf_away, a_ga_home, a_ga_away, a_mp, a_gf_total = stats.team_stats(away_team)
+
+    home_xg = stats.team_xg(home_team)
+    away_xg = stats.team_xg(away_team)
+
+    ratings = current_ratings(MODEL2_RATINGS_PATH)
+    home_elo = ratings.get(home_team, ELO_PARAMS["initial"])
+    away_elo = ratings.get(away_team, ELO_PARAMS["initial"])
+
+    index = load_h2h_index()
+    h2h = [0] * len(H2H_FEATURES)
+    if index is not None:
+        h2h = index.lookup([home_team], [away_team]).iloc[0].tolist()
+
+    table = load_form_table()
+    form = [np.nan] * len(MODEL2_FORM_FEATURES)
+    if table is not None:
+        form = table.features([home_team], [away_team])[MODEL2_FORM_FEATURES].iloc[0].tolist()
 
     return {
         "home_goals_for": h_gf_total,
@@ -103,45 +156,69 @@ def build_features(home_team, away_team):
         "matches_played_diff": h_mp - a_mp,
         "home_xg": home_xg,
         "away_xg": away_xg,
+        "home_elo": home_elo,
+        "away_elo": away_elo,
+        "elo_diff": home_elo - away_elo,
+        **dict(zip(H2H_FEATURES, h2h)),
+        **dict(zip(MODEL2_FORM_FEATURES, form)),
     }
 
 
+# --------------------------------------------------------------
+# PREDICT
+# --------------------------------------------------------------
+
+def predict_lineup(model, players, home_team, away_team, home_players, away_players,
+                   cache=PREDICTION_CACHE):
+    def compute():
+        home_strength = lineup_strength(players, home_team, home_players)
+        away_strength = lineup_strength(players, away_team, away_players)
+
+        X = pd.DataFrame([{
+            "home_strength": home_strength,
+            "away_strength": away_strength,
+            "strength_diff": home_strength - away_strength,
+            **build_features(home_team, away_team)
+        }])
+
+        return model.predict(X)[0], model.predict_proba(X)[0], home_strength, away_strength
+
+    if cache is None:
+        return compute()
+    lineup = lineup_fingerprint(home_players, away_players)
+    return cache.get_or_compute(home_team, away_team, compute, lineup=lineup)
+
+
 # --------------------------------------------------------------
 # MAIN
 # --------------------------------------------------------------
 
+@instrumented("predict_model3_players")
 def main():
-    log("Loading model...")
-    model = xgb.XGBClassifier()
-    model.load_model(MODEL_PATH)
-
     log("Loading player strengths...")
-    players_df = pd.read_csv(PLAYER_STRENGTH_PATH)
+    players = load_players()
 
     print("\n======= FOOTBALL MATCH PREDICTION (PLAYER MODE) ========\n")
 
-    home_team = select_team(players_df, "Home")
-    away_team = select_team(players_df, "Away")
+    home_team = select_team(players, "Home")
+    away_team = select_team(players, "Away")
 
     print("\n---- SELECT HOME PLAYERS ----")
-    home_strength = select_players(players_df, home_team)
+    home_players = select_players(players, home_team)
 
     print("\n---- SELECT AWAY PLAYERS ----")
-    away_strength = select_players(players_df, away_team)
+    away_players = select_players(players, away_team)
 
-    strength_diff = home_strength - away_strength
+    # Loaded once the lineups are in, so the prompts show up straight away
+    from model_registry import serve_classifier
 
-    extra = build_features(home_team, away_team)
-
-    X = pd.DataFrame([{
-        "home_strength": home_strength,
-        "away_strength": away_strength,
-        "strength_diff": strength_diff,
-        **extra
-    }])
+    log("Loading model...")
+    model = serve_classifier(MODEL_PATH, on_swap=PREDICTION_CACHE.clear)
 
-    y_pred = model.predict(X)[0]
-    y_proba = model.predict_proba(X)[0]
+    y_pred, y_proba, home_strength, away_strength = predict_lineup(
+        model, players, home_team, away_team, home_players, away_players
+    )
+    strength_diff = home_strength - away_strength
 
     mapping = {0: "HOME WIN", 1: "DRAW", 2: "AWAY WIN"}
 
@@ -159,33 +236,26 @@ def main():
     df_train = pd.read_csv("data/processed/model2_training_dataset.csv")
 
     y_true = df_train["result_xgb"]
-    X_all = df_train[[
-        "home_strength", "away_strength", "strength_diff",
-        "home_goals_for", "away_goals_for",
-        "home_goals_against", "away_goals_against",
-        "goals_for_diff", "goals_against_diff",
-        "matches_played_diff",
-        "home_xg", "away_xg"
-    ]]
-
-    y_pred_all = model.predict(X_all)
-
-    acc = accuracy_score(y_true, y_pred_all)
-    f1 = f1_score(y_true, y_pred_all, average="macro")
-
-    mse_home = mean_squared_error([1 if y==2 else 0 for y in y_true],
-                                  [p[2] for p in model.predict_proba(X_all)])
-    mae_home = mean_absolute_error([1 if y==2 else 0 for y in y_true],
-                                   [p[2] for p in model.predict_proba(X_all)])
-    r2_home = r2_score([1 if y==2 else 0 for y in y_true],
-                       [p[2] for p in model.predict_proba(X_all)])
-
-    mse_away = mean_squared_error([1 if y==0 else 0 for y in y_true],
-                                  [p[0] for p in model.predict_proba(X_all)])
-    mae_away = mean_absolute_error([1 if y==0 else 0 for y in y_true],
-                                   [p[0] for p in model.predict_proba(X_all)])
-    r2_away = r2_score([1 if y==0 else 0 for y in y_true],
-                       [p[0] for p in model.predict_proba(X_all)])
+    X_all = df_train[MODEL2_FEATURES]
+
+    from sklearn.metrics import accuracy_score, f1_score, mean_squared_error, mean_absolute_error, r2_score
+
+    with span("evaluate", rows_in=len(df_train)):
+        proba_all = model.predict_proba(X_all)
+        y_pred_all = proba_all.argmax(axis=1)
+
+        acc = accuracy_score(y_true, y_pred_all)
+        f1 = f1_score(y_true, y_pred_all, average="macro")
+
+        home_win = (y_true == 2).astype(int)
+        mse_home = mean_squared_error(home_win, proba_all[:, 2])
+        mae_home = mean_absolute_error(home_win, proba_all[:, 2])
+        r2_home = r2_score(home_win, proba_all[:, 2])
+
+        away_win = (y_true == 0).astype(int)
+        mse_away = mean_squared_error(away_win, proba_all[:, 0])
+        mae_away = mean_absolute_error(away_win, proba_all[:, 0])
+        r2_away = r2_score(away_win, proba_all[:, 0])
 
     print("\n📊 === MODEL 3 (PLAYER MODE) METRICS ===")
     print(f"Accuracy : {acc:.4f}")
@@ -218,6 +288,20 @@ def main():
 
     print(f"\n📝 Output saved to: {output_path}")
 
+    with start_run("model3_players_predictions") as run:
+        run.log_params({
+            "home_team": home_team, "away_team": away_team, "prediction": mapping[y_pred],
+            "home_lineup": home_players, "away_lineup": away_players,
+        })
+        run.log_metrics({
+            "accuracy": acc, "f1_macro": f1,
+            "mse_home": mse_home, "mae_home": mae_home, "r2_home": r2_home,
+            "mse_away": mse_away, "mae_away": mae_away, "r2_away": r2_away,
+            "home_strength": home_strength, "away_strength": away_strength,
+            "strength_diff": strength_diff,
+        })
+        run.log_artifact(output_path)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from pair_table import file_md5
+from player_store import ARRAYS, PLAYER_STORE_PATH
+
+MODEL_PATH = "models/model2_xgb.json"
+
+# Artifacts whose content determines a prediction, per predictor
+MODEL2_ARTIFACTS = (
+    MODEL_PATH,
+    "data/processed/model2_training_dataset.csv",
+    "data/processed/model2_elo_state.pkl",
+    "data/processed/model2_h2h_index.npz",
+    "data/processed/model2_form_state.pkl",
+)
+PLAYER_MODE_ARTIFACTS = (
+    MODEL_PATH,
+    # Binary store the predictor reads, and the CSV it falls back to without one
+    *(os.path.join(PLAYER_STORE_PATH, f"{name}.npy") for name in ARRAYS),
+    "data/processed/player_strengths.csv",
+    "data/raw/team_stats_multi_leagues.csv",
+    "data/raw/team_match_stats_model2.csv",
+    "data/processed/model2_elo_state.pkl",
+    "data/processed/model2_h2h_index.npz",
+    "data/processed/model2_form_state.pkl",
+)
+
+
+def lineup_fingerprint(home_players=None, away_players=None):
+    """Order-independent hash of both starting elevens (None without lineups)."""
+    if home_players is None and away_players is None:
+        return None
+
+    h = hashlib.md5()
+    for side in (home_players or (), away_players or ()):
+        h.update("\x1f".join(sorted(side)).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+# ----------------------------------------------------------
+# CACHE
+# ----------------------------------------------------------
+
+class PredictionCache:
+    """Size-bounded LRU cache of predictions.
+
+    Keys are (model content hash, home, away, lineup fingerprint). The
+    watched artifacts are stat()-ed on each access and re-hashed only when
+    their size or mtime moves; a new content hash drops every entry. A
+    value computed across a clear() (e.g. by the model just swapped out)
+    is returned but not stored.
+    """
+
+    def __init__(self, watched_paths=MODEL2_ARTIFACTS, maxsize=1024):
+        self.watched_paths = tuple(watched_paths)
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._version = None
+        self._generation = 0
+
+    # ------------------------------------------------------
+    # VERSIONING
+    # ------------------------------------------------------
+
+    def _stat_stamp(self):
+        stamp = []
+        for path in self.watched_paths:
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                stamp.append((path, None, None))
+        return tuple(stamp)
+
+    def version(self):
+        stamp = self._stat_stamp()
+        if stamp == self._stamp:
+            return self._version
+
+        h = hashlib.md5()
+        for path, size, _ in stamp:
+            h.update(path.encode("utf-8"))
+            h.update((file_md5(path) if size is not None else "missing").encode("utf-8"))
+        version = h.hexdigest()
+
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._entries.clear()
+                self._generation += 1
+                self.invalidations += 1
+            self._stamp = stamp
+            self._version = version
+        return version
+
+    # ------------------------------------------------------
+    # ACCESS
+    # ------------------------------------------------------
+
+    def get_or_compute(self, home, away, compute, lineup=None):
+        key = (self.version(), home, away, lineup)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            if generation != self._generation:
+                return value
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -1,7 +1,13 @@
 import pandas as pd
 import os
 
-def main():
+from instrumentation import instrumented, span
+from form import MODEL1_FORM_PATH, add_form_features
+from head_to_head import add_h2h_features
+from ratings import MODEL1_RATINGS_PATH, add_rating_features
+
+@instrumented("preprocess")
+def main(schedule=None, team_stats=None):
     print("🧹 Début du prétraitement des données multi-ligues...")
 
     # 1️⃣ Définir les chemins
@@ -13,8 +19,12 @@ def main():
     schedule_file = os.path.join(raw_path, "schedule_multi_leagues.csv")
     team_stats_file = os.path.join(raw_path, "team_stats_multi_leagues.csv")
 
-    schedule = pd.read_csv(schedule_file)
-    team_stats = pd.read_csv(team_stats_file)
+    with span("load") as s:
+        if schedule is None:
+            schedule = pd.read_csv(schedule_file)
+        if team_stats is None:
+            team_stats = pd.read_csv(team_stats_file)
+        s.rows(rows_out=len(schedule))
 
     print(f"✅ Fichiers chargés : {len(schedule)} matchs, {len(team_stats)} lignes de stats")
 
@@ -57,30 +67,50 @@ def main():
     home_stats = team_stats.add_prefix("home_")
     away_stats = team_stats.add_prefix("away_")
 
-    merged = schedule.merge(
-        home_stats,
-        left_on=["home_team", "league", "season"],
-        right_on=["home_team_name", "home_league", "home_season"],
-        how="left"
-    ).merge(
-        away_stats,
-        left_on=["away_team", "league", "season"],
-        right_on=["away_team_name", "away_league", "away_season"],
-        how="left"
-    )
+    with span("merge", rows_in=len(schedule)) as s:
+        merged = schedule.merge(
+            home_stats,
+            left_on=["home_team", "league", "season"],
+            right_on=["home_team_name", "home_league", "home_season"],
+            how="left"
+        ).merge(
+            away_stats,
+            left_on=["away_team", "league", "season"],
+            right_on=["away_team_name", "away_league", "away_season"],
+            how="left"
+        )
+        s.rows(rows_out=len(merged))
 
     # 6️⃣ Nettoyage final
     merged = merged.dropna(subset=["home_goals", "away_goals"])
     merged = merged.sort_values("date").reset_index(drop=True)
 
+    # Elo de chaque équipe avant le match (seuls les nouveaux matchs sont rejoués)
+    with span("ratings", rows_in=len(merged)):
+        merged = add_rating_features(
+            merged, MODEL1_RATINGS_PATH, "home_team", "away_team", "home_goals", "away_goals"
+        )
+
+    # Confrontations directes avant chaque match
+    with span("head_to_head", rows_in=len(merged)):
+        merged = add_h2h_features(merged, "home_team", "away_team", "home_goals", "away_goals")
+
+    # Forme récente (3, 5, 10 derniers matchs) avant chaque match
+    with span("form", rows_in=len(merged)):
+        merged = add_form_features(
+            merged, MODEL1_FORM_PATH, "home_team", "away_team", "home_goals", "away_goals"
+        )
+
     print(f"📊 Données fusionnées : {merged.shape[0]} matchs, {merged.shape[1]} colonnes")
 
     # 7️⃣ Sauvegarder le fichier propre
     output_file = os.path.join(processed_path, "clean_matches.csv")
-    merged.to_csv(output_file, index=False)
+    with span("save", rows_in=len(merged)):
+        merged.to_csv(output_file, index=False)
 
     print(f"✅ Fichier final enregistré : {output_file}")
     print("🎯 Prétraitement terminé avec succès !")
+    return merged
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,17 @@
+import argparse
 import os
-from datetime import datetime
 
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
+from incremental_strengths import IncrementalStrengths
+from instrumentation import instrumented, log, span
+from form import MODEL2_FORM_PATH, add_form_features
+from head_to_head import MODEL2_H2H_PATH, add_h2h_features
+from ratings import MODEL2_RATINGS_PATH, add_rating_features
 
-def log(msg: str):
-    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
+STATE_PATH = "data/processed/model2_player_scores_state.pkl"
 
 
 def load_raw_data():
@@ -71,9 +74,8 @@ def prepare_schedule(schedule: pd.DataFrame) -> pd.DataFrame:
 
 # ------------------------ PLAYER SCORING ----------------------------
 
-def compute_player_scores(players: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
-    log("Computing player scores...")
-
+def raw_player_scores(players: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
+    """Position-weighted player scores before normalization."""
     df = players.copy()
     df = df.loc[:, ~df.columns.duplicated()]
 
@@ -134,6 +136,14 @@ def compute_player_scores(players: pd.DataFrame, mapping: pd.DataFrame) -> pd.Da
         df[col_xg] * 2
     )
 
+    return df
+
+
+def compute_player_scores(players: pd.DataFrame, mapping: pd.DataFrame) -> pd.DataFrame:
+    log("Computing player scores...")
+
+    df = raw_player_scores(players, mapping)
+
     # normalize
     scaler = MinMaxScaler()
     df["player_score"] = scaler.fit_transform(df[["player_score"]])
@@ -158,6 +168,27 @@ def aggregate_team_strength(player_scores: pd.DataFrame) -> pd.DataFrame:
     return team_strength
 
 
+def incremental_team_strength(players: pd.DataFrame, mapping: pd.DataFrame,
+                              state_path: str = STATE_PATH) -> pd.DataFrame:
+    """Team strengths where only changed (league, season, team) partitions are rescored."""
+    log("Computing player scores (incremental)...")
+
+    df = raw_player_scores(players, mapping)
+
+    engine = IncrementalStrengths(state_path)
+    _, strengths = engine.update(df, df[["player_score"]].to_numpy(), team_col="team_clean")
+    engine.save()
+
+    team_strength = (
+        strengths.sort_index()
+        .rename_axis("team")
+        .reset_index()
+    )
+
+    log(team_strength.head())
+    return team_strength
+
+
 # ---------------------- APPLY MAPPING ------------------------------
 
 def apply_mapping(schedule, mapping):
@@ -197,22 +228,58 @@ def build_final_dataset(schedule, team_strength):
     return df
 
 
-def main():
-    schedule, players, mapping = load_raw_data()
-
-    schedule = prepare_schedule(schedule)
-    schedule = apply_mapping(schedule, mapping)
-
-    player_scores = compute_player_scores(players, mapping)
-    team_strength = aggregate_team_strength(player_scores)
-
-    dataset = build_final_dataset(schedule, team_strength)
-
-    os.makedirs("data/processed", exist_ok=True)
-    dataset.to_csv("data/processed/model2_preprocessed.csv", index=False)
+@instrumented("preprocess_model2")
+def main(incremental=False):
+    with span("load_raw_data") as s:
+        schedule, players, mapping = load_raw_data()
+        s.rows(rows_out=len(schedule) + len(players))
+
+    with span("prepare_schedule", rows_in=len(schedule)) as s:
+        schedule = prepare_schedule(schedule)
+        schedule = apply_mapping(schedule, mapping)
+        s.rows(rows_out=len(schedule))
+
+    with span("team_strength", rows_in=len(players)) as s:
+        if incremental:
+            team_strength = incremental_team_strength(players, mapping)
+        else:
+            player_scores = compute_player_scores(players, mapping)
+            team_strength = aggregate_team_strength(player_scores)
+        s.rows(rows_out=len(team_strength))
+
+    with span("build_final_dataset", rows_in=len(schedule)) as s:
+        dataset = build_final_dataset(schedule, team_strength)
+        s.rows(rows_out=len(dataset))
+
+    with span("ratings", rows_in=len(dataset)):
+        dataset = add_rating_features(
+            dataset, MODEL2_RATINGS_PATH, "home_team_clean", "away_team_clean", "home_score", "away_score"
+        )
+
+    with span("head_to_head", rows_in=len(dataset)):
+        dataset = add_h2h_features(
+            dataset, "home_team_clean", "away_team_clean", "home_score", "away_score",
+            index_path=MODEL2_H2H_PATH,
+        )
+
+    with span("form", rows_in=len(dataset)):
+        dataset = add_form_features(
+            dataset, MODEL2_FORM_PATH, "home_team_clean", "away_team_clean", "home_score", "away_score",
+            xg_cols=("home_xg", "away_xg"),
+        )
+
+    with span("save", rows_in=len(dataset)):
+        os.makedirs("data/processed", exist_ok=True)
+        dataset.to_csv("data/processed/model2_preprocessed.csv", index=False)
 
     log("Saved → data/processed/model2_preprocessed.csv")
+    return dataset
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Model 2 preprocessing")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"reuse unchanged team-season player scores from {STATE_PATH}")
+    args = parser.parse_args()
+
+    main(args.incremental)
@@ -0,0 +1,255 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import log
+
+MODEL1_RATINGS_PATH = "data/processed/model1_elo_state.pkl"
+MODEL2_RATINGS_PATH = "data/processed/model2_elo_state.pkl"
+
+RATING_FEATURES = ["home_elo", "away_elo", "elo_diff"]
+
+# Elo with home advantage and a goal-difference multiplier (World Football Elo)
+ELO_PARAMS = {
+    "initial": 1500.0,
+    "k": 20.0,
+    "home_advantage": 60.0,
+    "scale": 400.0,
+}
+
+# Day-number range of the (id, day) keys used by as-of joins
+DAY_SPAN = 1_000_000
+
+
+# ----------------------------------------------------------
+# ELO PASS
+# ----------------------------------------------------------
+
+def margin_multiplier(goal_diff):
+    """1 for a one-goal margin (or a draw), 1.5 for two goals, (11 + N) / 8 beyond."""
+    gd = np.abs(goal_diff)
+    return np.where(gd <= 1, 1.0, np.where(gd == 2, 1.5, (11.0 + gd) / 8.0))
+
+
+def elo_pass(rating, home_ids, away_ids, home_goals, away_goals, params=ELO_PARAMS):
+    """Post-match (home, away) ratings of date-ordered matches; `rating` is updated in place.
+
+    Scores and margin multipliers are computed up front; the loop itself
+    only reads two ratings, computes the expected score and writes back,
+    on plain Python lists.
+    """
+    goal_diff = np.asarray(home_goals, dtype=np.float64) - np.asarray(away_goals, dtype=np.float64)
+    score = ((np.sign(goal_diff) + 1.0) / 2.0).tolist()
+    k_match = (params["k"] * margin_multiplier(goal_diff)).tolist()
+    hfa, scale = params["home_advantage"], params["scale"]
+
+    r = rating.tolist()
+    post_home, post_away = [], []
+    for h, a, s, k in zip(home_ids.tolist(), away_ids.tolist(), score, k_match):
+        rh, ra = r[h], r[a]
+        delta = k * (s - 1.0 / (1.0 + 10.0 ** ((ra - rh - hfa) / scale)))
+        r[h] = rh + delta
+        r[a] = ra - delta
+        post_home.append(r[h])
+        post_away.append(r[a])
+
+    rating[:] = r
+    return np.array(post_home), np.array(post_away)
+
+
+# ----------------------------------------------------------
+# CHECKPOINTED ENGINE
+# ----------------------------------------------------------
+
+def day_numbers(dates):
+    """Day numbers since the epoch (-1 for missing dates)."""
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors="coerce")
+    days = dates.to_numpy().astype("datetime64[D]")
+    return np.where(np.isnat(days), -1, days.astype(np.int64))
+
+
+class EloRatings:
+    """Team ratings replayed match by match and checkpointed between runs.
+
+    The state holds every team's current rating and the post-match rating
+    history as (team, day, rating) rows sorted by team then day. An update
+    only replays the played matches dated after the checkpoint; when a match
+    at or before it was added, changed or removed (its digest moved), the
+    whole history is replayed.
+    """
+
+    def __init__(self, state_path, params=ELO_PARAMS):
+        self.state_path = state_path
+        self.params = dict(params)
+        self.state = pd.read_pickle(state_path) if os.path.exists(state_path) else None
+        if self.state is not None and self.state["params"] != self.params:
+            log("Elo parameters changed → full replay")
+            self.state = None
+
+    def save(self):
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        pd.to_pickle(self.state, self.state_path + ".tmp")
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    # ------------------------------------------------------
+
+    def update(self, dates, homes, aways, home_goals, away_goals):
+        """Replay the played matches not in the checkpoint (rows without a score are skipped)."""
+        matches = pd.DataFrame({
+            "day": day_numbers(dates),
+            "home": pd.Series(homes).astype(str).to_numpy(),
+            "away": pd.Series(aways).astype(str).to_numpy(),
+            "home_goals": pd.to_numeric(pd.Series(home_goals), errors="coerce").to_numpy(),
+            "away_goals": pd.to_numeric(pd.Series(away_goals), errors="coerce").to_numpy(),
+        })
+        matches = matches[matches["day"] >= 0].dropna()
+        matches = matches.sort_values("day", kind="stable").reset_index(drop=True)
+        row_hash = pd.util.hash_pandas_object(matches, index=False).to_numpy()
+
+        prev = self.state
+        if prev is not None:
+            old = matches["day"].to_numpy() <= prev["last_day"]
+            # uint64 sums wrap around: an order-insensitive digest of the replayed matches
+            if old.sum() != prev["n_matches"] or int(row_hash[old].sum()) != prev["digest"]:
+                log("Matches before the Elo checkpoint changed → full replay")
+                prev = None
+
+        if prev is None:
+            new = matches
+            teams, rating = [], np.empty(0)
+            hist_team = np.empty(0, dtype=np.int64)
+            hist_day = np.empty(0, dtype=np.int64)
+            hist_rating = np.empty(0)
+        else:
+            new = matches[~old]
+            teams, rating = list(prev["teams"]), prev["rating"].copy()
+            hist_team, hist_day, hist_rating = prev["hist_team"], prev["hist_day"], prev["hist_rating"]
+
+        new_teams = pd.Index(pd.unique(np.r_[new["home"].to_numpy(), new["away"].to_numpy()]))
+        new_teams = new_teams.difference(pd.Index(teams), sort=False)
+        teams += list(new_teams)
+        rating = np.r_[rating, np.full(len(new_teams), self.params["initial"])]
+
+        index = pd.Index(teams)
+        home_ids = index.get_indexer(new["home"])
+        away_ids = index.get_indexer(new["away"])
+        post_home, post_away = elo_pass(
+            rating, home_ids, away_ids, new["home_goals"].to_numpy(), new["away_goals"].to_numpy(), self.params
+        )
+
+        day = new["day"].to_numpy()
+        hist_team = np.r_[hist_team, home_ids, away_ids]
+        hist_day = np.r_[hist_day, day, day]
+        hist_rating = np.r_[hist_rating, post_home, post_away]
+        order = np.lexsort((hist_day, hist_team))
+
+        self.state = {
+            "params": self.params,
+            "teams": teams,
+            "rating": rating,
+            "hist_team": hist_team[order],
+            "hist_day": hist_day[order],
+            "hist_rating": hist_rating[order],
+            "last_day": int(matches["day"].max()) if len(matches) else -1,
+            "n_matches": len(matches),
+            "digest": int(row_hash.sum()),
+        }
+        log(f"Elo: {len(new)} matches replayed, {len(matches)} in history, {len(teams)} teams")
+        return len(new)
+
+    def as_of(self, teams, dates):
+        """Rating of each team before `dates` (its last rating from an earlier day).
+
+        Vectorized as-of join: one searchsorted of the (team, day) keys into
+        the sorted history. Teams without an earlier match get the initial
+        rating, rows without a date NaN.
+        """
+        s = self.state
+        days = day_numbers(dates)
+        ids = pd.Index(s["teams"]).get_indexer(pd.Series(teams).astype(str))
+        out = np.full(len(days), self.params["initial"])
+
+        if len(s["hist_team"]):
+            key_hist = s["hist_team"] * DAY_SPAN + s["hist_day"]
+            pos = np.searchsorted(key_hist, ids * DAY_SPAN + days, side="left") - 1
+            found = (pos >= 0) & (ids >= 0)
+            found[found] = s["hist_team"][pos[found]] == ids[found]
+            out[found] = s["hist_rating"][pos[found]]
+
+        out[days < 0] = np.nan
+        return out
+
+    def features(self, homes, aways, dates):
+        home = self.as_of(homes, dates)
+        away = self.as_of(aways, dates)
+        return pd.DataFrame({"home_elo": home, "away_elo": away, "elo_diff": home - away})
+
+    def current(self):
+        return pd.Series(self.state["rating"], index=self.state["teams"], name="elo")
+
+
+# ----------------------------------------------------------
+# PIPELINE HELPERS
+# ----------------------------------------------------------
+
+def add_rating_features(df, state_path, home_col, away_col, home_goals_col, away_goals_col,
+                        date_col="date"):
+    """Bring the checkpoint up to date with df's played matches and add the as-of RATING_FEATURES."""
+    engine = EloRatings(state_path)
+    engine.update(df[date_col], df[home_col], df[away_col], df[home_goals_col], df[away_goals_col])
+    engine.save()
+
+    features = engine.features(df[home_col], df[away_col], df[date_col])
+    for col in RATING_FEATURES:
+        df[col] = features[col].to_numpy()
+    return df
+
+
+_CURRENT = {}
+
+
+def current_ratings(state_path):
+    """team → latest rating from a checkpoint ({} when there is none), reloaded when the file changes."""
+    if not os.path.exists(state_path):
+        return {}
+    stat = os.stat(state_path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _CURRENT.get(state_path)
+    if cached is None or cached[0] != stamp:
+        state = pd.read_pickle(state_path)
+        _CURRENT[state_path] = (stamp, dict(zip(state["teams"], state["rating"].tolist())))
+    return _CURRENT[state_path][1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Elo ratings: update the checkpoint and show the top teams")
+    parser.add_argument("--model", choices=["1", "2"], default="1")
+    parser.add_argument("--full", action="store_true", help="ignore the checkpoint and replay every match")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.model == "1":
+        state_path = MODEL1_RATINGS_PATH
+        df = pd.read_csv("data/processed/clean_matches.csv")
+        cols = ("home_team", "away_team", "home_goals", "away_goals")
+    else:
+        state_path = MODEL2_RATINGS_PATH
+        df = pd.read_csv("data/processed/model2_preprocessed.csv")
+        cols = ("home_team_clean", "away_team_clean", "home_score", "away_score")
+
+    if args.full and os.path.exists(state_path):
+        os.remove(state_path)
+
+    start = time.perf_counter()
+    engine = EloRatings(state_path)
+    engine.update(df["date"], *(df[c] for c in cols))
+    engine.save()
+    log(f"Updated in {time.perf_counter() - start:.2f} s → {state_path}")
+
+    print(engine.current().sort_values(ascending=False).head(args.top).round(1).to_string())
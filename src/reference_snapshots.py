@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_ROOT = "data/references"
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+# Retention: always keep the last KEEP_LAST snapshots, drop older ones past MAX_AGE_DAYS
+KEEP_LAST = 12
+MAX_AGE_DAYS = 180
+
+
+# ----------------------------------------------------------
+# LAYOUT
+# ----------------------------------------------------------
+# data/references/<dataset>/
+#     columns/<sha256>.npz         one compressed column, shared by snapshots
+#     snapshots/<timestamp>.json   manifest: row count + (name, hash) per column
+
+def _dataset_dir(dataset, root=SNAPSHOT_ROOT):
+    return os.path.join(root, dataset)
+
+
+def _column_path(dataset, digest, root=SNAPSHOT_ROOT):
+    return os.path.join(_dataset_dir(dataset, root), "columns", f"{digest}.npz")
+
+
+def _snapshot_dir(dataset, root=SNAPSHOT_ROOT):
+    return os.path.join(_dataset_dir(dataset, root), "snapshots")
+
+
+# ----------------------------------------------------------
+# COLUMN ENCODING
+# ----------------------------------------------------------
+
+def _encode_column(series):
+    """Column as plain arrays: numeric values as-is, anything else as unicode + null mask."""
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return {"values": series.to_numpy()}
+    mask = series.isna().to_numpy()
+    values = series.astype(object).where(~mask, "").astype(str).to_numpy(dtype=str)
+    return {"values": values, "mask": mask}
+
+
+def _decode_column(arrays):
+    values = arrays["values"]
+    if "mask" not in arrays:
+        return values
+    out = values.astype(object)
+    out[arrays["mask"]] = np.nan
+    return out
+
+
+def column_digest(arrays):
+    h = hashlib.sha256()
+    for key in sorted(arrays):
+        arr = np.ascontiguousarray(arrays[key])
+        h.update(f"{key}:{arr.dtype.str}:{arr.shape}".encode("utf-8"))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+# ----------------------------------------------------------
+# WRITE
+# ----------------------------------------------------------
+
+def save_snapshot(df, dataset, timestamp=None, root=SNAPSHOT_ROOT):
+    """Store df as a snapshot; columns already stored by any snapshot are not rewritten."""
+    timestamp = timestamp or datetime.now()
+    os.makedirs(os.path.join(_dataset_dir(dataset, root), "columns"), exist_ok=True)
+    os.makedirs(_snapshot_dir(dataset, root), exist_ok=True)
+
+    columns, written = [], 0
+    for name in df.columns:
+        arrays = _encode_column(df[name])
+        digest = column_digest(arrays)
+        path = _column_path(dataset, digest, root)
+
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp.npz"
+            np.savez_compressed(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+            written += 1
+
+        columns.append({"name": str(name), "hash": digest})
+
+    manifest = {
+        "dataset": dataset,
+        "timestamp": timestamp.strftime(TIMESTAMP_FORMAT),
+        "n_rows": len(df),
+        "columns": columns,
+    }
+    manifest_path = os.path.join(_snapshot_dir(dataset, root), f"{manifest['timestamp']}.json")
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    return manifest_path, written
+
+
+# ----------------------------------------------------------
+# READ
+# ----------------------------------------------------------
+
+def list_snapshots(dataset, root=SNAPSHOT_ROOT):
+    """Snapshot timestamps, oldest first."""
+    path = _snapshot_dir(dataset, root)
+    if not os.path.isdir(path):
+        return []
+    return sorted(
+        datetime.strptime(f[:-len(".json")], TIMESTAMP_FORMAT)
+        for f in os.listdir(path) if f.endswith(".json")
+    )
+
+
+def load_snapshot(dataset, at=None, root=SNAPSHOT_ROOT):
+    """Reference as it was at `at` (latest snapshot not after it), or the latest one."""
+    stamps = list_snapshots(dataset, root)
+    if at is not None:
+        stamps = [s for s in stamps if s <= at]
+    if not stamps:
+        raise FileNotFoundError(f"No reference snapshot for {dataset}" + (f" at {at}" if at else ""))
+
+    name = stamps[-1].strftime(TIMESTAMP_FORMAT)
+    with open(os.path.join(_snapshot_dir(dataset, root), f"{name}.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    data = {}
+    for col in manifest["columns"]:
+        with np.load(_column_path(dataset, col["hash"], root)) as arrays:
+            data[col["name"]] = _decode_column({k: arrays[k] for k in arrays.files})
+
+    return pd.DataFrame(data, columns=[c["name"] for c in manifest["columns"]])
+
+
+# ----------------------------------------------------------
+# RETENTION
+# ----------------------------------------------------------
+
+def apply_retention(dataset, keep_last=KEEP_LAST, max_age_days=MAX_AGE_DAYS, now=None,
+                    root=SNAPSHOT_ROOT):
+    """Drop expired snapshots, then the column files no snapshot references anymore."""
+    now = now or datetime.now()
+    stamps = list_snapshots(dataset, root)
+    snapshot_dir = _snapshot_dir(dataset, root)
+
+    expired = [
+        s for s in stamps[:max(len(stamps) - keep_last, 0)]
+        if now - s > timedelta(days=max_age_days)
+    ]
+    for s in expired:
+        os.remove(os.path.join(snapshot_dir, f"{s.strftime(TIMESTAMP_FORMAT)}.json"))
+
+    referenced = set()
+    for f in os.listdir(snapshot_dir) if os.path.isdir(snapshot_dir) else []:
+        if f.endswith(".json"):
+            with open(os.path.join(snapshot_dir, f), "r", encoding="utf-8") as fh:
+                referenced.update(c["hash"] for c in json.load(fh)["columns"])
+
+    columns_dir = os.path.join(_dataset_dir(dataset, root), "columns")
+    removed_columns = 0
+    for f in os.listdir(columns_dir) if os.path.isdir(columns_dir) else []:
+        if f.endswith(".npz") and not f.endswith(".tmp.npz") and f[:-len(".npz")] not in referenced:
+            os.remove(os.path.join(columns_dir, f))
+            removed_columns += 1
+
+    return len(expired), removed_columns
@@ -0,0 +1,271 @@
+import argparse
+import json
+import os
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import log
+from pair_table import file_md5
+
+FINGERPRINT_PATH = "data/processed/retrain_fingerprints.json"
+
+# Network stages: their outputs are what the plan is computed from
+FETCH_STAGES = [
+    "fetch_data",
+    "extract_matches_model2",
+    "extract_player_stats_model2",
+    "extract_team_stats_model2",
+]
+
+# Non-interactive stages retrained per model family, in dvc.yaml order
+MODELS = {
+    "model1": ["preprocess", "train", "predict", "backtest_model1"],
+    "model2": ["preprocess_model2", "train_model2", "build_pair_table_model2", "simulate_season_model2",
+               "backtest_model2"],
+    # Built from the model-1 and model-2 preprocessed tables
+    "unified": ["unify_matches", "backtest_unified"],
+    "players": ["build_player_strengths"],
+}
+
+DRIFT_STAGE = "data_drift"
+
+PARTITION_COLS = ["league", "season"]
+
+
+def load_stages(path="dvc.yaml"):
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)["stages"]
+
+
+def _paths(entries):
+    # outs can be plain paths or {path: options}
+    return [next(iter(e)) if isinstance(e, dict) else e for e in entries or []]
+
+
+def model_inputs(stages, model):
+    """(code deps, data deps, data produced by the model's own stages)."""
+    code, data, produced = [], [], set()
+    for name in MODELS[model]:
+        for dep in _paths(stages[name].get("deps")):
+            target = code if dep.endswith(".py") else data
+            if dep not in target:
+                target.append(dep)
+        produced.update(_paths(stages[name].get("outs")))
+    return code, data, produced
+
+
+# ----------------------------------------------------------
+# FINGERPRINTS
+# ----------------------------------------------------------
+# A CSV is fingerprinted per (league, season) partition when it has those
+# columns: order-insensitive content hash + row count, so the plan can say
+# which partitions changed. Other files (models, tables) are one md5.
+
+def csv_fingerprint(path):
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    if all(c in df.columns for c in PARTITION_COLS):
+        keys = df[PARTITION_COLS[0]].str.cat(df[PARTITION_COLS[1:]], sep="/")
+    else:
+        keys = pd.Series("*", index=df.index)
+
+    codes, names = pd.factorize(keys, sort=True)
+    if len(codes) == 0:
+        return {}
+    order = np.argsort(codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+
+    # uint64 sums wrap around: a commutative digest of the partition rows
+    sums = np.add.reduceat(row_hash[order], starts)
+    counts = np.diff(np.r_[starts, len(codes)])
+    return {
+        str(name): [f"{int(s):016x}", int(n)]
+        for name, s, n in zip(names, sums, counts)
+    }
+
+
+def path_fingerprint(path):
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        return {
+            f: [file_md5(os.path.join(path, f)), None]
+            for f in sorted(os.listdir(path))
+            if os.path.isfile(os.path.join(path, f))
+        }
+    if path.endswith(".csv"):
+        return csv_fingerprint(path)
+    return {"*": [file_md5(path), None]}
+
+
+def model_fingerprint(stages, model):
+    code, data, _ = model_inputs(stages, model)
+    return {
+        "code": {p: file_md5(p) if os.path.exists(p) else None for p in code},
+        "data": {p: path_fingerprint(p) for p in data},
+    }
+
+
+def load_fingerprints(path=FINGERPRINT_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fingerprints(fingerprints, path=FINGERPRINT_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+# ----------------------------------------------------------
+# PLAN
+# ----------------------------------------------------------
+
+def diff_partitions(old, new):
+    """Readable list of partition changes between two data fingerprints."""
+    old, new = old or {}, new or {}
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        if key not in old:
+            changes.append(f"+{key} ({new[key][1] or 'new'} rows)")
+        elif key not in new:
+            changes.append(f"-{key}")
+        elif old[key] != new[key]:
+            rows = (f" {old[key][1]}→{new[key][1]} rows"
+                    if old[key][1] is not None and old[key][1] != new[key][1] else "")
+            changes.append(f"~{key}{rows}")
+    return changes
+
+
+def plan_model(stages, model, previous):
+    """(retrain?, reasons, fingerprint) for one model family."""
+    _, _, produced = model_inputs(stages, model)
+    current = model_fingerprint(stages, model)
+
+    missing_raw = [p for p, fp in current["data"].items() if fp is None and p not in produced]
+    if missing_raw:
+        return False, [f"missing input, cannot run: {p}" for p in missing_raw], current
+
+    if not previous:
+        return True, ["no previous fingerprint"], current
+
+    reasons = [f"code changed: {p}" for p, md5 in current["code"].items()
+               if previous["code"].get(p) != md5]
+    for p, fp in current["data"].items():
+        if fp is None:
+            reasons.append(f"missing artifact: {p}")
+            continue
+        changes = diff_partitions(previous["data"].get(p), fp)
+        if changes:
+            shown = ", ".join(changes[:5]) + (f", … ({len(changes)} partitions)" if len(changes) > 5 else "")
+            reasons.append(f"{p}: {shown}")
+    return bool(reasons), reasons, current
+
+
+def make_plan(models, fingerprints, stages):
+    plan = {}
+    for model in models:
+        retrain, reasons, current = plan_model(stages, model, fingerprints.get(model))
+
+        # Data another family rebuilds in this run changes under this one too
+        runnable = not any(r.startswith("missing input") for r in reasons)
+        if runnable and not retrain:
+            _, data, _ = model_inputs(stages, model)
+            upstream = [m for m, entry in plan.items()
+                        if entry["retrain"] and not model_inputs(stages, m)[2].isdisjoint(data)]
+            if upstream:
+                retrain, reasons = True, [f"upstream retrained: {', '.join(upstream)}"]
+        plan[model] = {"retrain": retrain, "reasons": reasons, "fingerprint": current}
+    return plan
+
+
+def print_plan(plan, dry_run):
+    print("\n=== RETRAIN PLAN" + (" (dry run)" if dry_run else "") + " ===")
+    for model, entry in plan.items():
+        status = "RETRAIN" if entry["retrain"] else "skip"
+        print(f"  {model:<8} {status:<8} {' '.join(MODELS[model])}")
+        for reason in entry["reasons"] or ["inputs and code unchanged"]:
+            print(f"           - {reason}")
+
+    stages = planned_stages(plan)
+    print(f"  stages: {' '.join(stages) if stages else '(none)'}\n")
+
+
+def planned_stages(plan):
+    stages = [s for model, entry in plan.items() if entry["retrain"] for s in MODELS[model]]
+    if stages:
+        stages.append(DRIFT_STAGE)
+    return stages
+
+
+# ----------------------------------------------------------
+# RUN
+# ----------------------------------------------------------
+
+def dvc_repro(stages):
+    """Run exactly these stages (forced, no upstream) and record them in dvc.lock."""
+    subprocess.run(["dvc", "repro", "--force", "--single-item", *stages], check=True)
+
+
+def main(models=None, fetch=False, dry_run=False, force=False):
+    models = models or list(MODELS)
+    stages = load_stages()
+
+    if fetch:
+        if dry_run:
+            log(f"Dry run: would fetch with {' '.join(FETCH_STAGES)}")
+        else:
+            log("Fetching raw data...")
+            dvc_repro(FETCH_STAGES)
+
+    fingerprints = load_fingerprints()
+    plan = make_plan(models, fingerprints, stages)
+    if force:
+        for entry in plan.values():
+            runnable = not any(r.startswith("missing input") for r in entry["reasons"])
+            if runnable and not entry["retrain"]:
+                entry["retrain"] = True
+                entry["reasons"].insert(0, "forced")
+    print_plan(plan, dry_run)
+
+    to_run = planned_stages(plan)
+    if dry_run or not to_run:
+        if not to_run:
+            log("Nothing to retrain.")
+        return plan
+
+    dvc_repro(to_run)
+
+    # Fingerprints of what the retrained models were built from (and now produce)
+    for model, entry in plan.items():
+        if entry["retrain"]:
+            fingerprints[model] = model_fingerprint(stages, model)
+    save_fingerprints(fingerprints)
+    log(f"Fingerprints saved → {FINGERPRINT_PATH}")
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain only the models whose inputs changed")
+    parser.add_argument("models", nargs="*", default=list(MODELS),
+                        help=f"model families to consider, among {', '.join(MODELS)} (default: all)")
+    parser.add_argument("--fetch", action="store_true",
+                        help="re-run the fetch/extract stages first")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan, run nothing")
+    parser.add_argument("--force", action="store_true", help="retrain every runnable model")
+    args = parser.parse_args()
+
+    unknown = [m for m in args.models if m not in MODELS]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    main(args.models, args.fetch, args.dry_run, args.force)
@@ -0,0 +1,169 @@
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+from instrumentation import log, span
+
+# ----------------------------------------------------------
+# IN-PROCESS STAGES
+# ----------------------------------------------------------
+# Each stage runs the same code as its dvc.yaml command and writes the same
+# outputs, but takes its inputs from `ctx` when an upstream stage of the
+# same run already produced them, instead of re-reading the CSV it wrote.
+
+CHAINS = {
+    "model1": ["preprocess", "train", "predict"],
+    "model2": ["preprocess_model2", "train_model2", "build_pair_table_model2"],
+    "players": ["build_player_strengths"],
+}
+
+PREDICT_CHUNKSIZE = 50_000
+
+
+def _preprocess(ctx):
+    import preprocess
+    ctx["clean_matches"] = preprocess.main()
+
+
+def _train(ctx):
+    import train
+    ctx["home_model"], ctx["away_model"] = train.main(data=ctx.get("clean_matches"))
+
+
+def _predict(ctx):
+    import predict
+    models = (ctx["home_model"], ctx["away_model"]) if "home_model" in ctx else None
+    predict.main_streaming(PREDICT_CHUNKSIZE, data=ctx.get("clean_matches"), models=models)
+
+
+def _preprocess_model2(ctx):
+    import preprocess_model2
+    ctx["model2_preprocessed"] = preprocess_model2.main(incremental=True)
+
+
+def _train_model2(ctx):
+    import train_model2
+    ctx["model2"], ctx["model2_training_dataset"] = train_model2.main(
+        pre=ctx.get("model2_preprocessed")
+    )
+
+
+def _build_pair_table(ctx):
+    import pair_table
+    pair_table.main(model=ctx.get("model2"), df_train=ctx.get("model2_training_dataset"))
+
+
+def _build_player_strengths(ctx):
+    import build_player_strengths
+    ctx["player_strengths"] = build_player_strengths.main(incremental=True)
+
+
+STAGES = {
+    "preprocess": _preprocess,
+    "train": _train,
+    "predict": _predict,
+    "preprocess_model2": _preprocess_model2,
+    "train_model2": _train_model2,
+    "build_pair_table_model2": _build_pair_table,
+    "build_player_strengths": _build_player_strengths,
+}
+
+
+def run_in_process(stages):
+    """Stage spans nest under one `pipeline` trace instead of one file per stage."""
+    ctx, timings = {}, {}
+    start = time.perf_counter()
+    with span("pipeline"):
+        for stage in stages:
+            log(f"▶ {stage} (in-process)")
+            t0 = time.perf_counter()
+            STAGES[stage](ctx)
+            timings[stage] = time.perf_counter() - t0
+    # Imports are paid once, by the first stage that needs them
+    return timings, time.perf_counter() - start
+
+
+# ----------------------------------------------------------
+# BASELINE: ONE PROCESS PER STAGE, AS DVC REPRO DOES
+# ----------------------------------------------------------
+
+def dvc_commands(path="dvc.yaml"):
+    import yaml
+
+    with open(path, "r", encoding="utf-8") as f:
+        return {name: spec["cmd"] for name, spec in yaml.safe_load(f)["stages"].items()}
+
+
+def run_as_subprocesses(stages):
+    commands = dvc_commands()
+    timings = {}
+    start = time.perf_counter()
+    for stage in stages:
+        cmd = shlex.split(commands[stage])
+        if cmd[0] == "python":
+            cmd[0] = sys.executable
+        log(f"▶ {stage} (subprocess: {commands[stage]})")
+        t0 = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        timings[stage] = time.perf_counter() - t0
+    return timings, time.perf_counter() - start
+
+
+def dvc_commit(stages):
+    """Record the outputs written here in dvc.lock, as `dvc repro` would."""
+    subprocess.run(["dvc", "commit", "--force", *stages], check=True)
+
+
+# ----------------------------------------------------------
+# MAIN
+# ----------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pipeline stages in a single process")
+    parser.add_argument("chains", nargs="*", default=list(CHAINS),
+                        help=f"stage chains to run, among {', '.join(CHAINS)} (default: all)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES),
+                        help="explicit stage list, overrides the chains")
+    parser.add_argument("--compare", action="store_true",
+                        help="also time the same stages as separate processes (dvc.yaml commands)")
+    parser.add_argument("--dvc-commit", action="store_true",
+                        help="run `dvc commit` on the executed stages afterwards")
+    args = parser.parse_args()
+
+    unknown = [c for c in args.chains if c not in CHAINS]
+    if unknown:
+        parser.error(f"unknown chain(s): {', '.join(unknown)}")
+
+    stages = args.stages or [s for chain in args.chains for s in CHAINS[chain]]
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    baseline = None
+    if args.compare:
+        baseline = run_as_subprocesses(stages)
+
+    timings, total = run_in_process(stages)
+
+    print("\n=== PIPELINE TIMINGS ===")
+    if baseline is None:
+        for stage in stages:
+            print(f"  {stage:<26} {timings[stage]:7.2f}s")
+        print(f"  {'total':<26} {total:7.2f}s")
+    else:
+        base_timings, base_total = baseline
+        print(f"  {'stage':<26} {'subprocess':>10} {'in-process':>10}")
+        for stage in stages:
+            print(f"  {stage:<26} {base_timings[stage]:9.2f}s {timings[stage]:9.2f}s")
+        print(f"  {'total':<26} {base_total:9.2f}s {total:9.2f}s")
+        print(f"  saved vs one process per stage: {base_total - total:.2f}s "
+              f"({(base_total - total) / base_total:.0%})")
+
+    if args.dvc_commit:
+        dvc_commit(stages)
+        log("dvc.lock updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+MAX_GOALS = 10
+MIN_RATE = 1e-3
+
+
+def poisson_pmf(rates, max_goals=MAX_GOALS):
+    """P(k goals) for k = 0..max_goals, shape (n_matches, max_goals + 1)."""
+    rates = np.clip(np.asarray(rates, dtype=np.float64), MIN_RATE, None)[:, None]
+    k = np.arange(max_goals + 1)
+    log_fact = np.array([math.lgamma(i + 1) for i in k])
+    return np.exp(k * np.log(rates) - rates - log_fact)
+
+
+def dixon_coles_adjust(grid, home_rates, away_rates, rho):
+    """Dixon–Coles low-score correction of an independent-Poisson grid (in place)."""
+    lam = np.clip(np.asarray(home_rates, dtype=np.float64), MIN_RATE, None)
+    mu = np.clip(np.asarray(away_rates, dtype=np.float64), MIN_RATE, None)
+
+    tau = np.ones((len(lam), 2, 2))
+    tau[:, 0, 0] = 1 - lam * mu * rho
+    tau[:, 0, 1] = 1 + lam * rho
+    tau[:, 1, 0] = 1 + mu * rho
+    tau[:, 1, 1] = 1 - rho
+
+    grid[:, :2, :2] *= np.clip(tau, 0, None)
+    return grid
+
+
+def scoreline_grid(home_rates, away_rates, rho=0.0, max_goals=MAX_GOALS):
+    """(n_matches, home goals, away goals) probabilities, renormalized after truncation."""
+    grid = (
+        poisson_pmf(home_rates, max_goals)[:, :, None]
+        * poisson_pmf(away_rates, max_goals)[:, None, :]
+    )
+    if rho:
+        grid = dixon_coles_adjust(grid, home_rates, away_rates, rho)
+
+    grid /= grid.sum(axis=(1, 2), keepdims=True)
+    return grid
+
+
+def scoreline_summary(grid, line=2.5):
+    """Win/draw/loss, over/under, BTTS and most likely score for every grid."""
+    n, size, _ = grid.shape
+    i, j = np.indices((size, size))
+
+    # Every market is a sum over a fixed set of cells: one matmul for all of them
+    masks = np.column_stack([
+        (i > j).ravel(),
+        (i == j).ravel(),
+        (i < j).ravel(),
+        ((i + j) > line).ravel(),
+        ((i > 0) & (j > 0)).ravel(),
+    ]).astype(grid.dtype)
+
+    flat = grid.reshape(n, size * size)
+    p_home, p_draw, p_away, p_over, p_btts = (flat @ masks).T
+
+    best = flat.argmax(axis=1)
+    best_home, best_away = np.divmod(best, size)
+    labels = np.array(["Home Win", "Draw", "Away Win"])
+
+    return pd.DataFrame({
+        "proba_home_win": p_home,
+        "proba_draw": p_draw,
+        "proba_away_win": p_away,
+        f"proba_over_{line}": p_over,
+        f"proba_under_{line}": 1 - p_over,
+        "proba_btts": p_btts,
+        "most_likely_score": pd.Series(best_home).astype(str) + "-" + pd.Series(best_away).astype(str),
+        "most_likely_score_proba": flat[np.arange(n), best],
+        "predicted_result_scoreline": labels[np.column_stack([p_home, p_draw, p_away]).argmax(axis=1)],
+    })
@@ -0,0 +1,249 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features_model2 import fixture_features, latest_side_rows
+from instrumentation import instrumented, log, span
+from pair_table import open_pair_table
+from preprocess_model2 import apply_mapping, prepare_schedule
+
+SCHEDULE_PATH = "data/raw/schedule_model2.csv"
+MAPPING_PATH = "data/team_name_mapping.csv"
+MODEL_PATH = "models/model2_xgb.json"
+TRAINING_DATASET_PATH = "data/processed/model2_training_dataset.csv"
+OUTPUT_PATH = "data/predictions/season_simulation.csv"
+
+# Points for (away win, draw, home win), the model-2 class order
+HOME_POINTS = np.array([0, 1, 3], dtype=np.float32)
+AWAY_POINTS = np.array([3, 1, 0], dtype=np.float32)
+
+BLOCK_SIZE = 10_000
+
+
+# ----------------------------------------------------------
+# FIXTURES & PROBABILITIES
+# ----------------------------------------------------------
+
+def load_current_season():
+    schedule = pd.read_csv(SCHEDULE_PATH)
+    mapping = pd.read_csv(MAPPING_PATH)
+
+    schedule = prepare_schedule(schedule)
+    schedule = apply_mapping(schedule, mapping)
+    schedule = schedule.dropna(subset=["home_team_clean", "away_team_clean"])
+
+    if "league" not in schedule.columns:
+        schedule["league"] = "ALL"
+    # International tournaments have no league table
+    schedule = schedule[~schedule["league"].astype(str).str.startswith("INT-")]
+
+    if "season" in schedule.columns:
+        schedule = schedule[schedule["season"] == schedule["season"].max()]
+
+    return schedule
+
+
+def fixture_probabilities(fixtures, played):
+    """(F, 3) outcome probabilities for unplayed fixtures from the model-2 classifier."""
+    homes = fixtures["home_team_clean"].to_numpy()
+    aways = fixtures["away_team_clean"].to_numpy()
+
+    table = open_pair_table()
+    if table is not None:
+        proba = table.lookup_many(homes, aways)
+    else:
+        from xgboost import XGBClassifier
+
+        model = XGBClassifier()
+        model.load_model(MODEL_PATH)
+        home_side, away_side = latest_side_rows(pd.read_csv(TRAINING_DATASET_PATH))
+
+        known = np.isin(homes, home_side.index) & np.isin(aways, away_side.index)
+        proba = np.full((len(fixtures), 3), np.nan, dtype=np.float32)
+        if known.any():
+            X = fixture_features(
+                home_side.loc[homes[known]], away_side.loc[aways[known]], homes[known], aways[known]
+            )
+            proba[known] = model.predict_proba(X)
+
+    # Teams without history (e.g. promoted): league-wide outcome frequencies
+    missing = np.isnan(proba).any(axis=1)
+    if missing.any():
+        prior = (
+            played["result"].map({-1: 0, 0: 1, 1: 2})
+            .value_counts(normalize=True).reindex([0, 1, 2]).fillna(1 / 3).to_numpy()
+        )
+        proba[missing] = prior
+        log(f"⚠️ {int(missing.sum())} fixtures without history, using league outcome frequencies")
+
+    return proba / proba.sum(axis=1, keepdims=True)
+
+
+# ----------------------------------------------------------
+# SIMULATION
+# ----------------------------------------------------------
+
+def _simulate_block(args):
+    """Position counts (T, T) for one block of simulations."""
+    seed_seq, n_sims, proba, home_idx, away_idx, base_points, base_gd = args
+    rng = np.random.default_rng(seed_seq)
+    n_teams = len(base_points)
+    n_fixtures = len(proba)
+
+    # Fixture -> team incidence matrices turn the table update into two matmuls
+    home_onehot = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    away_onehot = np.zeros((n_fixtures, n_teams), dtype=np.float32)
+    home_onehot[np.arange(n_fixtures), home_idx] = 1
+    away_onehot[np.arange(n_fixtures), away_idx] = 1
+
+    cum = np.cumsum(proba, axis=1, dtype=np.float32)
+    counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    team_ids = np.arange(n_teams)
+
+    for start in range(0, n_sims, BLOCK_SIZE):
+        size = min(BLOCK_SIZE, n_sims - start)
+
+        u = rng.random((size, n_fixtures), dtype=np.float32)
+        outcome = (u >= cum[:, 0]).astype(np.int8) + (u >= cum[:, 1])
+
+        points = (
+            base_points
+            + HOME_POINTS[outcome] @ home_onehot
+            + AWAY_POINTS[outcome] @ away_onehot
+        )
+
+        # Sort by points, then current goal difference, then a random draw
+        key = points * 1e4 + base_gd + rng.random((size, n_teams))
+        order = np.argsort(-key, axis=1)
+        positions = np.empty_like(order)
+        np.put_along_axis(positions, order, team_ids[None, :], axis=1)
+
+        counts += np.bincount(
+            (team_ids[None, :] * n_teams + positions).ravel(), minlength=n_teams * n_teams
+        ).reshape(n_teams, n_teams)
+
+    return counts
+
+
+def simulate_league(played, fixtures, proba, n_sims, seed, jobs):
+    teams = sorted(
+        set(played["home_team_clean"]) | set(played["away_team_clean"])
+        | set(fixtures["home_team_clean"]) | set(fixtures["away_team_clean"])
+    )
+    team_index = {t: i for i, t in enumerate(teams)}
+    n_teams = len(teams)
+
+    # Current table from played matches
+    h = played["home_team_clean"].map(team_index).to_numpy()
+    a = played["away_team_clean"].map(team_index).to_numpy()
+    outcome = (played["result"].to_numpy() + 1).astype(int)
+    gd = (played["home_score"] - played["away_score"]).to_numpy()
+
+    base_points = (
+        np.bincount(h, HOME_POINTS[outcome], minlength=n_teams)
+        + np.bincount(a, AWAY_POINTS[outcome], minlength=n_teams)
+    ).astype(np.float32)
+    base_gd = (
+        np.bincount(h, gd, minlength=n_teams) - np.bincount(a, gd, minlength=n_teams)
+    ).astype(np.float32)
+
+    home_idx = fixtures["home_team_clean"].map(team_index).to_numpy()
+    away_idx = fixtures["away_team_clean"].map(team_index).to_numpy()
+
+    # Independent streams per worker keep results reproducible for a given seed/jobs
+    jobs = max(1, min(jobs, n_sims))
+    splits = np.array_split(np.arange(n_sims), jobs)
+    seeds = np.random.SeedSequence(seed).spawn(jobs)
+    tasks = [
+        (s, len(split), proba, home_idx, away_idx, base_points, base_gd)
+        for s, split in zip(seeds, splits)
+    ]
+
+    if jobs == 1:
+        counts = _simulate_block(tasks[0])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            counts = sum(pool.map(_simulate_block, tasks))
+
+    position_proba = counts / n_sims
+    expected_points = base_points + (
+        np.bincount(home_idx, proba @ HOME_POINTS, minlength=n_teams)
+        + np.bincount(away_idx, proba @ AWAY_POINTS, minlength=n_teams)
+    )
+
+    return teams, position_proba, expected_points, base_points
+
+
+def summarize(league, teams, position_proba, expected_points, base_points, relegation_spots):
+    n_teams = len(teams)
+    out = pd.DataFrame({
+        "league": league,
+        "team": teams,
+        "current_points": base_points,
+        "expected_points": expected_points.round(2),
+        "p_title": position_proba[:, 0],
+        "p_top4": position_proba[:, :4].sum(axis=1),
+        "p_relegation": position_proba[:, n_teams - relegation_spots:].sum(axis=1),
+    })
+    for pos in range(n_teams):
+        out[f"pos_{pos + 1}"] = position_proba[:, pos]
+
+    return out.sort_values("expected_points", ascending=False)
+
+
+# ----------------------------------------------------------
+# MAIN
+# ----------------------------------------------------------
+
+@instrumented("simulate_season_model2")
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of the remaining fixtures")
+    parser.add_argument("--n-sims", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--relegation-spots", type=int, default=3)
+    args = parser.parse_args()
+
+    schedule = load_current_season()
+    results = []
+
+    for league, games in schedule.groupby("league"):
+        played = games[games["home_score"].notna()]
+        fixtures = games[games["home_score"].isna()]
+
+        if fixtures.empty:
+            log(f"{league}: season complete, nothing to simulate")
+            continue
+
+        log(f"{league}: {len(played)} played, {len(fixtures)} remaining → {args.n_sims} simulations")
+        with span(f"simulate_{league}", rows_in=len(fixtures)) as s:
+            proba = fixture_probabilities(fixtures, played)
+
+            teams, position_proba, expected_points, base_points = simulate_league(
+                played, fixtures, proba, args.n_sims, args.seed, args.jobs
+            )
+            s.set(n_sims=args.n_sims)
+            s.rows(rows_out=len(teams))
+        results.append(summarize(
+            league, teams, position_proba, expected_points, base_points, args.relegation_spots
+        ))
+
+    if not results:
+        log("No unplayed fixtures found.")
+        return
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    output = pd.concat(results, ignore_index=True)
+    output.to_csv(OUTPUT_PATH, index=False)
+
+    print("\n=== TITLE / TOP 4 / RELEGATION ===")
+    print(output[["league", "team", "expected_points", "p_title", "p_top4", "p_relegation"]]
+          .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    log(f"Saved → {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
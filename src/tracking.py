@@ -0,0 +1,249 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+try:
+    from instrumentation import log
+except ImportError:  # imported as src.tracking (python -m src.data_extraction.*)
+    from .instrumentation import log
+
+EXPERIMENT = "football_prediction_mlops"
+
+# async: buffered, sent by a background thread (default)
+# sync:  same batching, sent inline (debugging)
+# off:   no-op, mlflow is never imported
+TRACKING_MODE = os.environ.get("FOOTBALL_TRACKING", "async")
+
+# MLflow log_batch limits
+MAX_BATCH_METRICS = 1000
+MAX_BATCH_PARAMS = 100
+
+# Buffered metrics that trigger a flush before the run ends
+FLUSH_EVERY = 500
+
+# Longest a run's end waits for its queued requests to be sent
+END_TIMEOUT = 60
+
+_local = threading.local()
+
+
+# ----------------------------------------------------------
+# BACKGROUND SENDER
+# ----------------------------------------------------------
+
+class _Sender:
+    """Single worker thread that owns the MlflowClient and runs every request in order."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.client = None
+        self.experiment_ids = {}
+
+    def submit(self, fn, *args):
+        if TRACKING_MODE == "sync":
+            self._call(fn, *args)
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="mlflow-sender", daemon=True)
+                self.thread.start()
+        self.queue.put((fn, args))
+
+    def _loop(self):
+        while True:
+            fn, args = self.queue.get()
+            try:
+                self._call(fn, *args)
+            finally:
+                self.queue.task_done()
+
+    def _call(self, fn, *args):
+        # Tracking must never break a training or prediction run
+        try:
+            fn(self, *args)
+        except Exception as e:
+            log(f"⚠️ MLflow tracking failed ({fn.__name__}): {e}")
+
+    def get_client(self):
+        if self.client is None:
+            from mlflow.tracking import MlflowClient
+            self.client = MlflowClient()
+        return self.client
+
+    def experiment_id(self, name):
+        if name not in self.experiment_ids:
+            client = self.get_client()
+            experiment = client.get_experiment_by_name(name)
+            self.experiment_ids[name] = (
+                experiment.experiment_id if experiment is not None else client.create_experiment(name)
+            )
+        return self.experiment_ids[name]
+
+    def wait(self, timeout=None):
+        """Block until everything submitted so far has been sent (or `timeout` seconds)."""
+        if self.thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+
+_sender = _Sender()
+
+
+# Executed on the sender thread
+
+def _create_run(sender, run, experiment):
+    created = sender.get_client().create_run(sender.experiment_id(experiment), run_name=run.name)
+    run.run_id = created.info.run_id
+
+
+def _send_batch(sender, run, params, metrics):
+    from mlflow.entities import Metric, Param
+
+    client = sender.get_client()
+    params = [Param(k, str(v)) for k, v in params]
+    metrics = [Metric(k, float(v), ts, step) for k, v, ts, step in metrics]
+    for i in range(0, len(params), MAX_BATCH_PARAMS):
+        client.log_batch(run.run_id, params=params[i:i + MAX_BATCH_PARAMS])
+    for i in range(0, len(metrics), MAX_BATCH_METRICS):
+        client.log_batch(run.run_id, metrics=metrics[i:i + MAX_BATCH_METRICS])
+
+
+def _send_artifact(sender, run, path, artifact_path):
+    sender.get_client().log_artifact(run.run_id, path, artifact_path)
+
+
+def _end_run(sender, run, status):
+    sender.get_client().set_terminated(run.run_id, status)
+
+
+# ----------------------------------------------------------
+# RUNS
+# ----------------------------------------------------------
+
+class TrackedRun:
+    """Buffers params / metrics / artifacts of one MLflow run.
+
+    log_* calls only append to in-memory buffers; they are sent with
+    log_batch by the sender thread when the buffer fills up and when the
+    run ends. Only the end of the run waits on the tracking server, for
+    the requests queued so far.
+    """
+
+    def __init__(self, name, experiment=EXPERIMENT):
+        self.name = name
+        self.run_id = None
+        self._params = []
+        self._metrics = []
+        _sender.submit(_create_run, self, experiment)
+
+    def log_param(self, key, value):
+        self._params.append((key, value))
+
+    def log_params(self, params):
+        self._params.extend(params.items())
+
+    def log_metric(self, key, value, step=0):
+        self._metrics.append((key, value, int(time.time() * 1000), step))
+        if len(self._metrics) >= FLUSH_EVERY:
+            self.flush()
+
+    def log_metrics(self, metrics, step=0):
+        ts = int(time.time() * 1000)
+        self._metrics.extend((k, v, ts, step) for k, v in metrics.items() if v is not None)
+        if len(self._metrics) >= FLUSH_EVERY:
+            self.flush()
+
+    def log_artifact(self, path, artifact_path=None):
+        # Artifacts are sent after the buffered values, in submission order
+        self.flush()
+        _sender.submit(_send_artifact, self, path, artifact_path)
+
+    def flush(self):
+        if self._params or self._metrics:
+            _sender.submit(_send_batch, self, self._params, self._metrics)
+            self._params, self._metrics = [], []
+
+    def end(self, status="FINISHED"):
+        self.flush()
+        _sender.submit(_end_run, self, status)
+        # Runs mostly end in a script's last lines: left to the atexit hook, the
+        # sender would call MLflow after interpreter shutdown has started, when
+        # it can no longer start its own threads, and the run would be lost
+        if not _sender.wait(timeout=END_TIMEOUT):
+            log(f"⚠️ MLflow tracking: run {self.name} still sending after {END_TIMEOUT} s")
+
+    def __enter__(self):
+        _local.run = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _local.run = None
+        self.end("FAILED" if exc_type is not None else "FINISHED")
+        return False
+
+
+class NullRun:
+    """Offline mode: same interface, does nothing."""
+
+    name = None
+    run_id = None
+
+    def log_param(self, key, value):
+        pass
+
+    def log_params(self, params):
+        pass
+
+    def log_metric(self, key, value, step=0):
+        pass
+
+    def log_metrics(self, metrics, step=0):
+        pass
+
+    def log_artifact(self, path, artifact_path=None):
+        pass
+
+    def flush(self):
+        pass
+
+    def end(self, status="FINISHED"):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def start_run(name, experiment=EXPERIMENT):
+    if TRACKING_MODE == "off":
+        return NullRun()
+    return TrackedRun(name, experiment)
+
+
+def active_run():
+    """The run whose `with` block is executing on this thread, if any."""
+    return getattr(_local, "run", None)
+
+
+def wait(timeout=None):
+    return _sender.wait(timeout)
+
+
+@atexit.register
+def _drain():
+    # Runs left open (no `with`, no end()): last chance for their batches
+    if not _sender.wait(timeout=60):
+        log("⚠️ MLflow tracking: pending batches dropped at exit")
@@ -1,24 +1,44 @@
 import pandas as pd
-import xgboost as xgb
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import mlflow
-import mlflow.xgboost
 import os
 
-def main():
+from form import MODEL1_FORM_FEATURES
+from instrumentation import instrumented, span
+from tracking import start_run
+
+FEATURES = [
+    "home_matches_played", "home_goals_for", "home_goals_against", "home_goals_diff",
+    "away_matches_played", "away_goals_for", "away_goals_against", "away_goals_diff",
+    "home_elo", "away_elo", "elo_diff",
+    "h2h_matches", "h2h_wins", "h2h_draws", "h2h_goal_diff",
+    *MODEL1_FORM_FEATURES
+]
+
+# Hyperparamètres communs aux deux régresseurs (buts domicile / extérieur)
+XGB_PARAMS = dict(
+    objective="reg:squarederror",
+    random_state=42,
+    n_estimators=100,
+    learning_rate=0.1,
+    max_depth=5
+)
+
+@instrumented("train")
+def main(data=None):
+    # Imported here: predict.py imports FEATURES from this module
+    import xgboost as xgb
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
     print("🚀 Démarrage de l’entraînement des modèles XGBoost...")
 
-    # 1️⃣ Charger les données prétraitées
+    # 1️⃣ Charger les données prétraitées (sauf si déjà en mémoire)
     data_path = "data/processed/clean_matches.csv"
-    data = pd.read_csv(data_path)
+    if data is None:
+        data = pd.read_csv(data_path)
     print(f"✅ Données chargées : {data.shape[0]} matchs, {data.shape[1]} colonnes")
 
     # 2️⃣ Sélection des features numériques pertinentes
-    features = [
-        "home_matches_played", "home_goals_for", "home_goals_against", "home_goals_diff",
-        "away_matches_played", "away_goals_for", "away_goals_against", "away_goals_diff"
-    ]
+    features = FEATURES
 
     for f in features:
         if f not in data.columns:
@@ -36,35 +56,26 @@ def main():
         X, y_away, test_size=0.2, random_state=42
     )
 
-    # 4️⃣ Configuration MLflow
-    mlflow.set_experiment("football_prediction_mlops")
-    with mlflow.start_run(run_name="xgboost_multi_leagues"):
-        mlflow.log_param("model_type", "XGBRegressor")
-        mlflow.log_param("features", features)
-        mlflow.log_param("test_size", 0.2)
+    # 4️⃣ Configuration MLflow (envoi en arrière-plan, par lots)
+    with start_run("xgboost_multi_leagues") as run:
+        run.log_params({
+            "model_type": "XGBRegressor",
+            "features": features,
+            "test_size": 0.2,
+        })
 
         # 5️⃣ Entraînement des modèles
-        model_home = xgb.XGBRegressor(
-            objective="reg:squarederror",
-            random_state=42,
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5
-        )
-        model_away = xgb.XGBRegressor(
-            objective="reg:squarederror",
-            random_state=42,
-            n_estimators=100,
-            learning_rate=0.1,
-            max_depth=5
-        )
-
-        model_home.fit(X_train, y_home_train)
-        model_away.fit(X_train, y_away_train)
+        model_home = xgb.XGBRegressor(**XGB_PARAMS)
+        model_away = xgb.XGBRegressor(**XGB_PARAMS)
+
+        with span("fit", rows_in=len(X_train)):
+            model_home.fit(X_train, y_home_train)
+            model_away.fit(X_train, y_away_train)
 
         # 6️⃣ Évaluation
-        y_home_pred = model_home.predict(X_test)
-        y_away_pred = model_away.predict(X_test)
+        with span("evaluate", rows_in=len(X_test)):
+            y_home_pred = model_home.predict(X_test)
+            y_away_pred = model_away.predict(X_test)
 
         metrics = {
             "mse_home": mean_squared_error(y_home_test, y_home_pred),
@@ -75,8 +86,7 @@ def main():
             "r2_away": r2_score(y_away_test, y_away_pred)
         }
 
-        for k, v in metrics.items():
-            mlflow.log_metric(k, v)
+        run.log_metrics(metrics)
 
         print("📊 Résultats du modèle :")
         for k, v in metrics.items():
@@ -89,10 +99,12 @@ def main():
         model_home.save_model(home_model_path)
         model_away.save_model(away_model_path)
 
-        mlflow.log_artifact(home_model_path)
-        mlflow.log_artifact(away_model_path)
+        run.log_artifact(home_model_path)
+        run.log_artifact(away_model_path)
 
         print("✅ Modèles sauvegardés et enregistrés dans MLflow.")
 
+    return model_home, model_away
+
 if __name__ == "__main__":
     main()
@@ -1,7 +1,6 @@
 import os
 import pandas as pd
 import numpy as np
-from datetime import datetime
 
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
@@ -13,22 +12,30 @@ from sklearn.metrics import (
 )
 from xgboost import XGBClassifier
 
-
-# ---------------------------------------------------------------
-# UTILS
-# ---------------------------------------------------------------
-def log(msg: str):
-    now = datetime.now().strftime("[%Y-%m-%d %H:%M:%S]")
-    print(f"{now} {msg}")
+from features_model2 import MODEL2_FEATURES
+from instrumentation import instrumented, log, span
+from tracking import start_run
+
+XGB_PARAMS = dict(
+    n_estimators=400,
+    learning_rate=0.05,
+    max_depth=6,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    objective="multi:softprob",
+    num_class=3,
+    eval_metric="mlogloss"
+)
 
 
 # ---------------------------------------------------------------
 # LOAD DATA
 # ---------------------------------------------------------------
-def load_data():
+def load_data(pre=None):
     log("Loading datasets...")
 
-    pre = pd.read_csv("data/processed/model2_preprocessed.csv")
+    if pre is None:
+        pre = pd.read_csv("data/processed/model2_preprocessed.csv")
     team_stats = pd.read_csv("data/raw/team_stats_multi_leagues.csv")
 
     log(f"Preprocessed: {pre.shape}")
@@ -69,16 +76,7 @@ def create_features(pre, team_stats):
 def select_model_features(df):
     log("Selecting features...")
 
-    features = [
-        "home_strength", "away_strength", "strength_diff",
-        "home_goals_for", "away_goals_for",
-        "home_goals_against", "away_goals_against",
-        "goals_for_diff", "goals_against_diff",
-        "matches_played_diff",
-        "home_xg", "away_xg",
-    ]
-
-    features = [c for c in features if c in df.columns]
+    features = [c for c in MODEL2_FEATURES if c in df.columns]
 
     log(f"Using {len(features)} features")
 
@@ -88,10 +86,15 @@ def select_model_features(df):
 # ---------------------------------------------------------------
 # MAIN TRAINING PIPELINE
 # ---------------------------------------------------------------
-def main():
-    pre, team_stats = load_data()
+@instrumented("train_model2")
+def main(pre=None):
+    with span("load_data") as s:
+        pre, team_stats = load_data(pre)
+        s.rows(rows_out=len(pre))
 
-    df = create_features(pre, team_stats)
+    with span("create_features", rows_in=len(pre)) as s:
+        df = create_features(pre, team_stats)
+        s.rows(rows_out=len(df))
 
     df = df[df["result"].notna()]  # remove empty
 
@@ -109,23 +112,16 @@ def main():
 
     log("Training XGBoost...")
 
-    model = XGBClassifier(
-        n_estimators=400,
-        learning_rate=0.05,
-        max_depth=6,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        objective="multi:softprob",
-        num_class=3,
-        eval_metric="mlogloss"
-    )
+    model = XGBClassifier(**XGB_PARAMS)
 
-    model.fit(X_train, y_train)
+    with span("fit", rows_in=len(X_train)):
+        model.fit(X_train, y_train)
 
     log("Evaluating...")
 
-    y_pred = model.predict(X_test)
-    y_proba = model.predict_proba(X_test)  # needed for metrics
+    with span("evaluate", rows_in=len(X_test)):
+        y_pred = model.predict(X_test)
+        y_proba = model.predict_proba(X_test)  # needed for metrics
 
     # CLASSIFICATION METRICS
     accuracy = accuracy_score(y_test, y_pred)
@@ -156,12 +152,25 @@ def main():
     print(f"  r2_away:   {r2_away:.4f}")
 
     # SAVE FILES
-    os.makedirs("models", exist_ok=True)
-    model.save_model("models/model2_xgb.json")
-    log("Saved model → models/model2_xgb.json")
-
-    df.to_csv("data/processed/model2_training_dataset.csv", index=False)
-    log("Saved dataset → data/processed/model2_training_dataset.csv")
+    with span("save", rows_in=len(df)):
+        os.makedirs("models", exist_ok=True)
+        model.save_model("models/model2_xgb.json")
+        log("Saved model → models/model2_xgb.json")
+
+        df.to_csv("data/processed/model2_training_dataset.csv", index=False)
+        log("Saved dataset → data/processed/model2_training_dataset.csv")
+
+    # MLFLOW (buffered, sent by a background thread)
+    with start_run("xgboost_model2") as run:
+        run.log_params({**XGB_PARAMS, "features": list(X.columns), "test_size": 0.2})
+        run.log_metrics({
+            "accuracy": accuracy, "f1_macro": f1,
+            "mse_home": mse_home, "mae_home": mae_home, "r2_home": r2_home,
+            "mse_away": mse_away, "mae_away": mae_away, "r2_away": r2_away,
+        })
+        run.log_artifact("models/model2_xgb.json")
+
+    return model, df
 
 
 if __name__ == "__main__":
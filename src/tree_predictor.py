@@ -0,0 +1,329 @@
+import json
+import sys
+import time
+
+import numpy as np
+
+from instrumentation import log
+
+
+# Objectives whose base_score is stored in probability space and must be
+# mapped back to a margin before the trees are added on top of it.
+LOGIT_OBJECTIVES = {"binary:logistic", "reg:logistic", "binary:logitraw"}
+LOG_OBJECTIVES = {"count:poisson", "reg:gamma", "reg:tweedie"}
+SUPPORTED_OBJECTIVES = (
+    {"reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror",
+     "multi:softprob", "multi:softmax"}
+    | LOGIT_OBJECTIVES
+    | LOG_OBJECTIVES
+)
+
+
+# Constants of glibc's expf (sysdeps/ieee754/flt-32/e_expf.c). NumPy's float32
+# exp may differ from libm by one ulp, XGBoost calls expf from libm.
+_EXPF_N = 32
+_EXPF_SHIFT = float.fromhex("0x1.8p+52")
+_EXPF_INVLN2N = float.fromhex("0x1.71547652b82fep+0") * _EXPF_N
+_EXPF_POLY = (
+    float.fromhex("0x1.c6af84b912394p-5") / _EXPF_N ** 3,
+    float.fromhex("0x1.ebfce50fac4f3p-3") / _EXPF_N ** 2,
+    float.fromhex("0x1.62e42ff0c52d6p-1") / _EXPF_N,
+)
+_EXPF_TABLE = np.array(
+    [np.float64(2.0 ** (i / _EXPF_N)).view(np.uint64) - np.uint64(i << 47) for i in range(_EXPF_N)],
+    dtype=np.uint64,
+)
+
+
+# ----------------------------------------------------------
+# COMPILED PREDICTOR
+# ----------------------------------------------------------
+
+class CompiledTreePredictor:
+    """XGBoost gbtree model flattened into contiguous NumPy node arrays.
+
+    Evaluates rows without building a DMatrix. Leaf values are accumulated
+    in float32, tree by tree, starting from the base margin, which is the
+    order XGBoost's CPU predictor uses, so outputs match `predict` /
+    `predict_proba` bit for bit.
+    """
+
+    def __init__(self, model_json):
+        learner = model_json["learner"]
+        booster = learner["gradient_booster"]
+
+        if booster["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster: {booster['name']}")
+
+        self.objective = learner["objective"]["name"]
+        if self.objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {self.objective}")
+
+        params = learner["learner_model_param"]
+        self.num_feature = int(params["num_feature"])
+        self.num_class = max(int(params.get("num_class", "0")), 1)
+        self.feature_names = learner.get("feature_names") or None
+
+        model = booster["model"]
+        trees = model["trees"]
+        tree_info = np.asarray(model["tree_info"], dtype=np.int64)
+
+        self._flatten(trees)
+
+        per_class = len(trees) // self.num_class
+        if per_class * self.num_class != len(trees):
+            raise ValueError("Trees are not evenly distributed across classes")
+        self.trees_per_class = per_class
+
+        # Roots grouped per output, keeping the boosting order inside a group
+        self.roots = self.roots[np.argsort(tree_info, kind="stable")]
+
+        self.base_margin = self._base_margin(params["base_score"])
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # ------------------------------------------------------
+    # MODEL PARSING
+    # ------------------------------------------------------
+
+    def _flatten(self, trees):
+        lefts, rights, features, thresholds, defaults, values = [], [], [], [], [], []
+        roots = []
+        offset = 0
+        max_depth = 0
+
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported")
+
+            left = np.asarray(tree["left_children"], dtype=np.int64)
+            right = np.asarray(tree["right_children"], dtype=np.int64)
+            n = len(left)
+            node_ids = np.arange(n, dtype=np.int64)
+            is_leaf = left == -1
+
+            # Leaves point to themselves so extra traversal steps are no-ops
+            lefts.append(np.where(is_leaf, node_ids, left) + offset)
+            rights.append(np.where(is_leaf, node_ids, right) + offset)
+            features.append(np.where(is_leaf, 0, tree["split_indices"]))
+            thresholds.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            defaults.append(np.asarray(tree["default_left"], dtype=bool))
+            # For leaves XGBoost stores the leaf weight in split_conditions
+            values.append(np.where(is_leaf, thresholds[-1], np.float32(0)))
+
+            roots.append(offset)
+            max_depth = max(max_depth, _tree_depth(left, right))
+            offset += n
+
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.column_stack(
+            [np.concatenate(lefts), np.concatenate(rights)]
+        ).ravel().astype(np.int32)
+        self.feature = np.concatenate(features).astype(np.int32)
+        self.threshold = np.concatenate(thresholds)
+        self.default_left = np.concatenate(defaults)
+        self.value = np.concatenate(values).astype(np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = max_depth
+
+    def _base_margin(self, raw):
+        raw = raw.strip()
+        if raw.startswith("["):
+            base = np.asarray([float(v) for v in raw.strip("[]").split(",")], dtype=np.float32)
+        else:
+            base = np.asarray([float(raw)], dtype=np.float32)
+
+        if base.size == 1:
+            base = np.repeat(base, self.num_class)
+
+        if self.objective in LOGIT_OBJECTIVES and self.objective != "binary:logitraw":
+            # Same expression as XGBoost's ProbToMargin: float32 ratio, log in double
+            base = -np.log((np.float32(1) / base - np.float32(1)).astype(np.float64))
+        elif self.objective in LOG_OBJECTIVES:
+            base = np.log(base.astype(np.float64))
+
+        return base.astype(np.float32)
+
+    # ------------------------------------------------------
+    # INFERENCE
+    # ------------------------------------------------------
+
+    def _as_matrix(self, X):
+        if hasattr(X, "columns"):
+            if self.feature_names is not None and list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32, na_value=np.nan)
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.num_feature:
+            raise ValueError(f"Expected {self.num_feature} features, got {X.shape[1]}")
+        return X
+
+    def leaf_values(self, X):
+        """Leaf weight reached in every tree, shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        n, n_feature = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n, dtype=np.int32) * n_feature)[:, None]
+        has_missing = np.isnan(flat_X).any()
+
+        idx = np.broadcast_to(self.roots, (n, self.roots.size))
+        for _ in range(self.max_depth):
+            x = flat_X.take(self.feature.take(idx) + row_offsets)
+            go_right = x >= self.threshold.take(idx)
+            if has_missing:
+                go_right |= np.isnan(x) & ~self.default_left.take(idx)
+            idx = self.children.take(2 * idx + go_right)
+
+        return self.value.take(idx)
+
+    def predict_margin(self, X):
+        leaves = self.leaf_values(X)
+        n = leaves.shape[0]
+
+        grouped = leaves.reshape(n, self.num_class, self.trees_per_class)
+        base = np.broadcast_to(self.base_margin[None, :, None], (n, self.num_class, 1))
+
+        # cumsum is strictly sequential, matching XGBoost's float32 accumulation
+        margin = np.cumsum(np.concatenate([base, grouped], axis=2), axis=2, dtype=np.float32)[:, :, -1]
+
+        if self.num_class == 1:
+            return margin[:, 0]
+        return margin
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+
+        if self.objective.startswith("multi:"):
+            e = expf(margin - margin.max(axis=1, keepdims=True))
+            # XGBoost sums the exponentials in double before dividing in float
+            total = e.sum(axis=1, keepdims=True, dtype=np.float64).astype(np.float32)
+            return e / total
+
+        if self.objective in LOGIT_OBJECTIVES and self.objective != "binary:logitraw":
+            p = _sigmoid(margin)
+            return np.column_stack([np.float32(1) - p, p])
+
+        raise ValueError(f"predict_proba is not defined for {self.objective}")
+
+    def predict(self, X):
+        if self.objective.startswith("multi:"):
+            return self.predict_proba(X).argmax(axis=1)
+        if self.objective == "binary:logistic":
+            return (self.predict_proba(X)[:, 1] > 0.5).astype(np.int64)
+
+        margin = self.predict_margin(X)
+        if self.objective in LOG_OBJECTIVES:
+            return expf(margin)
+        if self.objective == "reg:logistic":
+            return _sigmoid(margin)
+        return margin
+
+
+def expf(x):
+    """Vectorized float32 exp, bit-identical to glibc's expf."""
+    xd = np.asarray(x, dtype=np.float32).astype(np.float64)
+    z = _EXPF_INVLN2N * xd
+    kd = z + _EXPF_SHIFT
+    ki = kd.view(np.uint64)
+    r = z - (kd - _EXPF_SHIFT)
+    s = (_EXPF_TABLE[ki % np.uint64(_EXPF_N)] + (ki << np.uint64(47))).view(np.float64)
+    y = (_EXPF_POLY[0] * r + _EXPF_POLY[1]) * (r * r) + (_EXPF_POLY[2] * r + 1)
+    with np.errstate(over="ignore"):
+        out = (y * s).astype(np.float32)
+    # Outside the table range fall back to NumPy (overflow / underflow to 0)
+    wide = np.abs(xd) >= 88.0
+    if wide.any():
+        out[wide] = np.exp(xd[wide]).astype(np.float32)
+    return out
+
+
+def _sigmoid(margin):
+    return np.float32(1) / (np.float32(1) + expf(-margin))
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def load_predictor(path):
+    return CompiledTreePredictor.load(path)
+
+
+# ----------------------------------------------------------
+# BENCHMARK
+# ----------------------------------------------------------
+
+def _latency(fn, X, repeats):
+    fn(X)  # warm-up
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings[i] = time.perf_counter() - start
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+
+def benchmark(model_path, batch_sizes=(1, 16, 1024), repeats=500, seed=42):
+    import xgboost as xgb
+
+    compiled = CompiledTreePredictor.load(model_path)
+    if compiled.objective.startswith("multi:") or compiled.objective == "binary:logistic":
+        model = xgb.XGBClassifier()
+        model.load_model(model_path)
+        reference, fast = model.predict_proba, compiled.predict_proba
+    else:
+        model = xgb.XGBRegressor()
+        model.load_model(model_path)
+        reference, fast = model.predict, compiled.predict
+
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for batch in batch_sizes:
+        X = rng.normal(size=(batch, compiled.num_feature)).astype(np.float32)
+        if compiled.feature_names is not None:
+            import pandas as pd
+            X = pd.DataFrame(X, columns=compiled.feature_names)
+
+        identical = np.array_equal(np.asarray(reference(X), dtype=np.float32), fast(X))
+        n_repeats = max(repeats // max(batch // 16, 1), 20)
+
+        xgb_p50, xgb_p99 = _latency(reference, X, n_repeats)
+        np_p50, np_p99 = _latency(fast, X, n_repeats)
+
+        results.append({
+            "batch": batch,
+            "xgboost_p50_us": xgb_p50,
+            "xgboost_p99_us": xgb_p99,
+            "numpy_p50_us": np_p50,
+            "numpy_p99_us": np_p99,
+            "identical": identical,
+        })
+
+    return results
+
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "models/model2_xgb.json"
+    log(f"Benchmarking compiled predictor on {model_path}...")
+
+    print(f"\n{'batch':>6} | {'xgb p50':>10} {'xgb p99':>10} | {'np p50':>10} {'np p99':>10} | identical")
+    for r in benchmark(model_path):
+        print(
+            f"{r['batch']:>6} | {r['xgboost_p50_us']:>8.1f}us {r['xgboost_p99_us']:>8.1f}us | "
+            f"{r['numpy_p50_us']:>8.1f}us {r['numpy_p99_us']:>8.1f}us | {r['identical']}"
+        )
+
+
+if __name__ == "__main__":
+    main()